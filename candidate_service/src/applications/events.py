@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, List, Optional, Set
+from uuid import UUID
+
+from sqlalchemy import func, select
+
+from src.applications.models import JobApplication
+from src.applications.schemas import ApplicationRead
+from src.applications.service import ApplicationService
+from src.config import settings
+from src.database import async_session, engine
+
+logger = logging.getLogger(__name__)
+
+# Notified by the job_applications trigger with the changed row as JSON.
+CHANNEL = "application_changes"
+
+REPLAY_PAGE_SIZE = 500
+
+
+class Subscriber:
+    """One client's bounded event queue, optionally limited to a candidate.
+
+    A client that lets its queue fill up is dropped: it still receives what
+    was queued, then its stream ends and it resumes from its last event id.
+    """
+
+    __slots__ = ("queue", "candidate_id", "dropped")
+
+    def __init__(self, queue_size: int, candidate_id: Optional[UUID]):
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.candidate_id = candidate_id
+        self.dropped = False
+
+
+def _event(application: ApplicationRead) -> bytes:
+    return (
+        f"id: {application.change_seq}\n"
+        "event: application\n"
+        f"data: {application.model_dump_json()}\n\n"
+    ).encode()
+
+
+class ApplicationBroadcaster:
+    """Fans application changes out to this worker's SSE subscribers.
+
+    Each worker LISTENs on a single connection. Every change NOTIFYs from
+    the trigger that assigns its change_seq, so all workers see changes made
+    by any of them, at commit and hence in change_seq order. After a lost
+    connection the changes since the last one seen are read back from the
+    table, holding back notifications until the gap is filled.
+    """
+
+    def __init__(
+        self,
+        queue_size: int,
+        heartbeat: float,
+        max_stream_seconds: float,
+        reconnect_delay: float = 1.0,
+    ):
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.max_stream_seconds = max_stream_seconds
+        self.reconnect_delay = reconnect_delay
+        self.subscribers: Set[Subscriber] = set()
+        self.last_seq: Optional[int] = None
+        self.dropped = 0
+        self._held: Optional[List[ApplicationRead]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, candidate_id: Optional[UUID] = None) -> Subscriber:
+        subscriber = Subscriber(self.queue_size, candidate_id)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self.subscribers.discard(subscriber)
+
+    def publish(self, application: ApplicationRead) -> None:
+        if self._held is not None:
+            self._held.append(application)
+        else:
+            self._deliver(application)
+
+    def _deliver(self, application: ApplicationRead) -> None:
+        if self.last_seq is not None and application.change_seq <= self.last_seq:
+            return
+        self.last_seq = application.change_seq
+        for subscriber in list(self.subscribers):
+            if subscriber.candidate_id not in (None, application.candidate_id):
+                continue
+            try:
+                subscriber.queue.put_nowait(application)
+            except asyncio.QueueFull:
+                subscriber.dropped = True
+                self.subscribers.discard(subscriber)
+                self.dropped += 1
+
+    async def stream(
+        self, last_event_id: Optional[int], candidate_id: Optional[UUID]
+    ) -> AsyncIterator[bytes]:
+        """SSE body: changes after ``last_event_id`` from the table, then live
+        ones. Subscribing first means nothing committed during the replay is
+        missed; events it already covered are skipped. The replay carries
+        each application's latest state, so changes to one application made
+        while the client was away arrive as one event."""
+        subscriber = self.subscribe(candidate_id)
+        deadline = time.monotonic() + self.max_stream_seconds
+        try:
+            yield f"retry: {int(self.reconnect_delay * 1000)}\n\n".encode()
+            last = last_event_id
+            if last is not None:
+                async with async_session() as db:
+                    service = ApplicationService(db)
+                    while True:
+                        page = await service.list_changes(
+                            since=last,
+                            limit=REPLAY_PAGE_SIZE,
+                            candidate_id=candidate_id,
+                        )
+                        for application in page.items:
+                            yield _event(application)
+                        last = page.cursor
+                        if not page.has_more:
+                            break
+            # Streams are bounded so that clients spread over workers again
+            # and shutdown does not wait on them; they resume transparently.
+            while time.monotonic() < deadline:
+                try:
+                    application = await asyncio.wait_for(
+                        subscriber.queue.get(),
+                        min(self.heartbeat, deadline - time.monotonic()),
+                    )
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if application is None:
+                    return
+                if last is None or application.change_seq > last:
+                    last = application.change_seq
+                    yield _event(application)
+                if subscriber.dropped and subscriber.queue.empty():
+                    return
+        finally:
+            self.unsubscribe(subscriber)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for subscriber in list(self.subscribers):
+            subscriber.dropped = True
+            try:
+                subscriber.queue.put_nowait(None)
+            except asyncio.QueueFull:
+                pass
+        self.subscribers.clear()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except Exception:
+                logger.exception("Application change listener failed")
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _listen(self) -> None:
+        async with engine.connect() as conn:
+            raw = (await conn.get_raw_connection()).driver_connection
+            self._held = []
+            try:
+                await raw.add_listener(CHANNEL, self._on_notify)
+                await self._catch_up()
+            finally:
+                held, self._held = self._held, None
+            for application in held:
+                self._deliver(application)
+            # Notifications only arrive while the connection is alive, so it
+            # is probed rather than trusted to report its own loss.
+            while True:
+                await asyncio.sleep(self.heartbeat)
+                await raw.execute("SELECT 1")
+
+    async def _catch_up(self) -> None:
+        async with async_session() as db:
+            if self.last_seq is None:
+                self.last_seq = (
+                    await db.execute(
+                        select(func.coalesce(func.max(JobApplication.change_seq), 0))
+                    )
+                ).scalar_one()
+                return
+            service = ApplicationService(db)
+            while True:
+                page = await service.list_changes(
+                    since=self.last_seq, limit=REPLAY_PAGE_SIZE
+                )
+                for application in page.items:
+                    self._deliver(application)
+                if not page.has_more:
+                    break
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        try:
+            self.publish(ApplicationRead.model_validate_json(payload))
+        except ValueError:
+            logger.exception("Malformed application change notification")
+
+
+application_broadcaster = ApplicationBroadcaster(
+    queue_size=settings.APPLICATION_EVENTS_QUEUE_SIZE,
+    heartbeat=settings.APPLICATION_EVENTS_HEARTBEAT_SECONDS,
+    max_stream_seconds=settings.APPLICATION_EVENTS_MAX_STREAM_SECONDS,
+)
@@ -1,15 +1,29 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import ForeignKey, Enum, DateTime, Integer, func
+from sqlalchemy import (
+    BigInteger,
+    DateTime,
+    Enum,
+    Float,
+    ForeignKey,
+    Index,
+    Sequence,
+    func,
+)
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.database import Base
 
+change_seq = Sequence("job_applications_change_seq", metadata=Base.metadata)
+
 
 class JobApplication(Base):
     __tablename__ = "job_applications"
+    __table_args__ = (
+        Index("ix_job_applications_change_seq", "change_seq", unique=True),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         PG_UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -32,7 +46,9 @@ class JobApplication(Base):
     test_session_id: Mapped[uuid.UUID] = mapped_column(
         PG_UUID(as_uuid=True), nullable=True
     )
-    test_score: Mapped[int] = mapped_column(Integer, nullable=True)
+    test_score: Mapped[float] = mapped_column(Float, nullable=True)
+    test_score_percent: Mapped[float] = mapped_column(Float, nullable=True)
+    test_score_percentile: Mapped[float] = mapped_column(Float, nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, server_default=func.now()
@@ -43,6 +59,11 @@ class JobApplication(Base):
         server_default=func.now(),
         onupdate=func.now(),
     )
+    # Reassigned on every insert and update by a trigger (see migration
+    # 0003), in commit order, so it doubles as a change feed cursor.
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default=change_seq.next_value()
+    )
 
     candidate = relationship("Candidate", back_populates="applications")
     vacancy = relationship("Vacancy", back_populates="applications")
@@ -1,26 +1,44 @@
 import httpx
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    status,
+)
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
-from uuid import UUID
+from uuid import UUID, uuid4
 
 from src.applications.schemas import (
+    ApplicationChanges,
     ApplicationCreate,
     ApplicationRead,
     TestResultPayload,
     AssignTestPayload,
+    BulkTestResultPayload,
+    BulkTestResultRead,
 )
 from src.applications.dependencies import get_application_service, valid_application_id
+from src.applications.events import application_broadcaster
 from src.auth.dependencies import authenticated_user, authenticated_admin
 from src.auth.models import User
 
 from src.applications.service import ApplicationService
 from src.candidates.dependencies import get_candidate_service
 from src.candidates.service import CandidateService
+from src import interservice
 from src.config import settings
 from src.vacancies.dependencies import get_vacancy_service
 from src.vacancies.service import VacancyService
+from src.timing import TimedRoute
+from src.tracing import current_context, parse_traceparent, start_span
 
-router = APIRouter(prefix="/applications", tags=["applications"])
+router = APIRouter(
+    prefix="/applications", tags=["applications"], route_class=TimedRoute
+)
 
 
 @router.post("/", response_model=ApplicationRead, status_code=status.HTTP_201_CREATED)
@@ -53,6 +71,33 @@ async def create_application(
         )
 
 
+@router.get("/events")
+async def application_events(
+    last_event_id: Optional[int] = Header(default=None),
+    current_user: User = Depends(authenticated_user),
+):
+    if not settings.APPLICATION_EVENTS_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Events are disabled"
+        )
+    candidate_id = None if current_user.role == "admin" else current_user.id
+    return StreamingResponse(
+        application_broadcaster.stream(last_event_id, candidate_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/changes", response_model=ApplicationChanges)
+async def list_application_changes(
+    since: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=1000),
+    current_user: User = Depends(authenticated_admin),
+    service: ApplicationService = Depends(get_application_service),
+):
+    return await service.list_changes(since=since, limit=limit)
+
+
 @router.get("/{application_id}", response_model=ApplicationRead)
 async def read_application(
     application: dict = Depends(valid_application_id),
@@ -114,34 +159,35 @@ async def assign_test(
             "candidate_email": candidate.email,
         }
 
-        async with httpx.AsyncClient() as client:
-            try:
-                resp = await client.post(
-                    f"{settings.TEST_SERVICE_URL}/sessions/",
-                    json=session_payload,
-                    timeout=10.0,
-                    follow_redirects=True,
-                )
-                resp.raise_for_status()
-                session_data = resp.json()
-
-                updated_app = await service.update_application_status(
-                    application_id=application_id,
-                    new_status="applied",
-                    test_session_id=UUID(session_data["id"]),
-                )
-                if not updated_app:
-                    raise HTTPException(
-                        status_code=500,
-                        detail="Failed to update application with test session",
-                    )
+        try:
+            resp = await interservice.request(
+                "POST",
+                f"{settings.TEST_SERVICE_URL}/sessions/",
+                peer="test_service",
+                headers={"Idempotency-Key": str(uuid4())},
+                json=session_payload,
+                timeout=10.0,
+                follow_redirects=True,
+            )
+            resp.raise_for_status()
+            session_data = resp.json()
+        except httpx.HTTPError as e:
+            raise HTTPException(
+                status_code=502, detail=f"Failed to assign test: {str(e)}"
+            )
 
-                return updated_app
+        updated_app = await service.update_application_status(
+            application_id=application_id,
+            new_status="applied",
+            test_session_id=UUID(session_data["id"]),
+        )
+        if not updated_app:
+            raise HTTPException(
+                status_code=500,
+                detail="Failed to update application with test session",
+            )
 
-            except httpx.HTTPError as e:
-                raise HTTPException(
-                    status_code=502, detail=f"Failed to assign test: {str(e)}"
-                )
+        return updated_app
     except HTTPException:
         raise
     except Exception as e:
@@ -151,25 +197,48 @@ async def assign_test(
         )
 
 
+@router.post("/test-results", response_model=BulkTestResultRead)
+async def receive_test_results(
+    payload: BulkTestResultPayload,
+    service: ApplicationService = Depends(get_application_service),
+):
+    origin = parse_traceparent(payload.traceparent)
+    context = current_context()
+    if origin and context and origin.trace_id == context.trace_id:
+        origin = None
+    with start_span("receive_test_results", parent=origin) as span:
+        span.attributes["results"] = len(payload.results)
+        updated = await service.bulk_update_test_scores(payload.results)
+    return BulkTestResultRead(received=len(payload.results), updated=updated)
+
+
 @router.post("/{application_id}/test-result", response_model=ApplicationRead)
 async def receive_test_result(
     application_id: UUID,
     payload: TestResultPayload,
     service: ApplicationService = Depends(get_application_service),
 ):
+    origin = parse_traceparent(payload.traceparent)
+    context = current_context()
+    if origin and context and origin.trace_id == context.trace_id:
+        origin = None
     try:
-        app_obj = await service.get_application(application_id)
-        if not app_obj:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Application not found"
-            )
+        with start_span("receive_test_result", parent=origin):
+            app_obj = await service.get_application(application_id)
+            if not app_obj:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Application not found",
+                )
 
-        updated = await service.update_application_status(
-            application_id,
-            new_status="tested",
-            test_session_id=payload.session_id,
-            test_score=payload.score,
-        )
+            updated = await service.update_application_status(
+                application_id,
+                new_status="tested",
+                test_session_id=payload.session_id,
+                test_score=payload.score,
+                test_score_percent=payload.score_percent,
+                test_score_percentile=payload.score_percentile,
+            )
         return updated
     except HTTPException:
         raise
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 
 
@@ -21,13 +21,46 @@ class ApplicationRead(ApplicationBase):
     id: UUID
     status: str
     test_session_id: Optional[UUID]
-    test_score: Optional[int]
+    test_score: Optional[float]
+    test_score_percent: Optional[float] = None
+    test_score_percentile: Optional[float] = None
     created_at: datetime
     updated_at: Optional[datetime]
+    change_seq: Optional[int] = None
 
     model_config = {"from_attributes": True}
 
 
+class ApplicationChanges(BaseModel):
+    items: List[ApplicationRead]
+    # Pass back as ``since`` to continue after the last change returned.
+    cursor: int
+    has_more: bool
+
+
 class TestResultPayload(BaseModel):
     session_id: UUID
-    score: int
+    score: float
+    max_score: Optional[float] = None
+    score_percent: Optional[float] = None
+    score_percentile: Optional[float] = None
+    traceparent: Optional[str] = None
+
+
+class TestResultItem(BaseModel):
+    application_id: UUID
+    session_id: UUID
+    score: float
+    max_score: Optional[float] = None
+    score_percent: Optional[float] = None
+    score_percentile: Optional[float] = None
+
+
+class BulkTestResultPayload(BaseModel):
+    results: List[TestResultItem] = Field(max_length=1000)
+    traceparent: Optional[str] = None
+
+
+class BulkTestResultRead(BaseModel):
+    received: int
+    updated: int
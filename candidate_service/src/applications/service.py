@@ -1,5 +1,6 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import Float, cast, column, func, select, update, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from typing import List, Optional
 from uuid import UUID
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
@@ -7,9 +8,11 @@ from fastapi import HTTPException, status
 
 from src.applications.models import JobApplication
 from src.applications.schemas import (
+    ApplicationChanges,
     ApplicationCreate,
     ApplicationRead,
     TestResultPayload,
+    TestResultItem,
 )
 
 
@@ -70,12 +73,40 @@ class ApplicationService:
                 detail=f"Database error: {str(e)}",
             )
 
+    async def list_changes(
+        self, since: int = 0, limit: int = 100, candidate_id: Optional[UUID] = None
+    ) -> ApplicationChanges:
+        """Applications created or updated after change ``since``, oldest
+        change first."""
+        try:
+            query = select(JobApplication).where(JobApplication.change_seq > since)
+            if candidate_id is not None:
+                query = query.where(JobApplication.candidate_id == candidate_id)
+            result = await self.db.execute(
+                query.order_by(JobApplication.change_seq).limit(limit + 1)
+            )
+            items = result.scalars().all()
+            has_more = len(items) > limit
+            items = items[:limit]
+            return ApplicationChanges(
+                items=[ApplicationRead.model_validate(item) for item in items],
+                cursor=items[-1].change_seq if items else since,
+                has_more=has_more,
+            )
+        except SQLAlchemyError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}",
+            )
+
     async def update_application_status(
         self,
         application_id: UUID,
         new_status: str,
         test_session_id: Optional[UUID] = None,
-        test_score: Optional[int] = None,
+        test_score: Optional[float] = None,
+        test_score_percent: Optional[float] = None,
+        test_score_percentile: Optional[float] = None,
     ) -> Optional[ApplicationRead]:
         try:
             result = await self.db.execute(
@@ -100,6 +131,10 @@ class ApplicationService:
                 obj.test_session_id = test_session_id
             if test_score is not None:
                 obj.test_score = test_score
+            if test_score_percent is not None:
+                obj.test_score_percent = test_score_percent
+            if test_score_percentile is not None:
+                obj.test_score_percentile = test_score_percentile
 
             await self.db.commit()
             await self.db.refresh(obj)
@@ -117,6 +152,57 @@ class ApplicationService:
                 detail=f"Database error: {str(e)}",
             )
 
+    async def bulk_update_test_scores(self, results: List[TestResultItem]) -> int:
+        if not results:
+            return 0
+        try:
+            rows = values(
+                column("application_id", PG_UUID(as_uuid=True)),
+                column("session_id", PG_UUID(as_uuid=True)),
+                column("score", Float),
+                column("score_percent", Float),
+                column("score_percentile", Float),
+                name="v",
+            ).data(
+                [
+                    (
+                        r.application_id,
+                        r.session_id,
+                        r.score,
+                        r.score_percent,
+                        r.score_percentile,
+                    )
+                    for r in results
+                ]
+            )
+            result = await self.db.execute(
+                update(JobApplication)
+                .where(JobApplication.id == rows.c.application_id)
+                .where(JobApplication.test_session_id == rows.c.session_id)
+                .values(
+                    test_score=rows.c.score,
+                    # NULL values are sent untyped and read back as text.
+                    test_score_percent=func.coalesce(
+                        cast(rows.c.score_percent, Float),
+                        JobApplication.test_score_percent,
+                    ),
+                    test_score_percentile=func.coalesce(
+                        cast(rows.c.score_percentile, Float),
+                        JobApplication.test_score_percentile,
+                    ),
+                    updated_at=func.now(),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await self.db.commit()
+            return result.rowcount
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}",
+            )
+
     async def get_application(self, application_id: UUID) -> Optional[ApplicationRead]:
         result = await self.db.execute(
             select(JobApplication).where(JobApplication.id == application_id)
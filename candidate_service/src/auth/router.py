@@ -13,8 +13,9 @@ from src.auth.service import (
 from src.auth.dependencies import authenticated_user, authenticated_admin, get_db
 from src.auth.models import User
 from src.config import settings
+from src.timing import TimedRoute
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=TimedRoute)
 
 
 @router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
@@ -10,6 +10,7 @@ from fastapi import HTTPException, status
 from src.auth.models import User
 from src.auth.schemas import TokenData
 from src.config import settings
+from src.timing import span
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -53,9 +54,10 @@ async def get_current_user(token: str, db: AsyncSession) -> User:
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(
-            token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
-        )
+        with span("jwt"):
+            payload = jwt.decode(
+                token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
+            )
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
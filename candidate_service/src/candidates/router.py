@@ -10,10 +10,12 @@ from src.candidates.schemas import CandidateCreate, CandidateRead
 from src.candidates.dependencies import get_candidate_service, valid_candidate_id
 from src.candidates.service import CandidateService
 from src.config import settings
+from src.utils import parse_id_list
 from src.auth.dependencies import authenticated_user, authenticated_admin
 from src.auth.models import User
+from src.timing import TimedRoute
 
-router = APIRouter(prefix="/candidates", tags=["candidates"])
+router = APIRouter(prefix="/candidates", tags=["candidates"], route_class=TimedRoute)
 
 
 @router.post("/", response_model=CandidateRead, status_code=status.HTTP_201_CREATED)
@@ -31,6 +33,17 @@ async def create_candidate(
         )
 
 
+@router.get("/batch", response_model=List[CandidateRead])
+async def read_candidates_batch(
+    ids: str = Query(description="Comma-separated candidate ids"),
+    current_user: User = Depends(authenticated_admin),
+    service: CandidateService = Depends(get_candidate_service),
+):
+    return await service.get_candidates_by_ids(
+        parse_id_list(ids, settings.BATCH_MAX_IDS)
+    )
+
+
 @router.get("/{candidate_id}", response_model=CandidateRead)
 async def read_candidate(
     candidate: dict = Depends(valid_candidate_id),
@@ -1,5 +1,6 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
 from typing import List, Optional
 from uuid import UUID
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
@@ -57,6 +58,30 @@ class CandidateService:
                 detail=f"Database error: {str(e)}",
             )
 
+    async def get_candidates_by_ids(
+        self, candidate_ids: List[UUID]
+    ) -> List[CandidateRead]:
+        try:
+            result = await self.db.execute(
+                select(Candidate).where(
+                    Candidate.id
+                    == any_(
+                        bindparam("ids", candidate_ids, ARRAY(PG_UUID(as_uuid=True)))
+                    )
+                )
+            )
+            by_id = {item.id: item for item in result.scalars().all()}
+            return [
+                CandidateRead.model_validate(by_id[candidate_id])
+                for candidate_id in candidate_ids
+                if candidate_id in by_id
+            ]
+        except SQLAlchemyError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}",
+            )
+
     async def list_candidates(
         self, limit: int = 10, offset: int = 0
     ) -> List[CandidateRead]:
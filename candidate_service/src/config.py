@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from typing import Optional
 from datetime import timedelta
 
 
@@ -17,6 +18,49 @@ class Settings(BaseSettings):
 
     TEST_SERVICE_URL: str
 
+    SERVER_TIMING_ENABLED: bool = False
+
+    TRACE_BUFFER_TRACES: int = 1000
+    TRACE_EXPORT_PATH: Optional[str] = None
+
+    LOAD_SHEDDING_ENABLED: bool = True
+    CHEAP_CONCURRENCY_LIMIT: int = 100
+    EXPENSIVE_CONCURRENCY_LIMIT: int = 10
+    LOAD_SHEDDING_QUEUE_SIZE: int = 50
+    LOAD_SHEDDING_QUEUE_TIMEOUT: float = 1.0
+
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_MAX_ENTRIES: int = 100000
+
+    INTERSERVICE_MAX_RETRIES: int = 2
+    INTERSERVICE_RETRY_BASE_DELAY: float = 0.05
+    INTERSERVICE_RETRY_BUDGET_RATIO: float = 0.2
+    INTERSERVICE_RETRY_MIN_PER_SECOND: float = 5.0
+    INTERSERVICE_BREAKER_FAILURES: int = 5
+    INTERSERVICE_BREAKER_RESET_SECONDS: float = 15.0
+
+    BATCH_MAX_IDS: int = 200
+
+    APPLICATION_EVENTS_ENABLED: bool = True
+    APPLICATION_EVENTS_QUEUE_SIZE: int = 1000
+    APPLICATION_EVENTS_HEARTBEAT_SECONDS: float = 15.0
+    APPLICATION_EVENTS_MAX_STREAM_SECONDS: float = 300.0
+
+    WEBHOOKS_ENABLED: bool = True
+    WEBHOOK_POLL_INTERVAL_SECONDS: float = 1.0
+    WEBHOOK_CLAIM_SIZE: int = 500
+    WEBHOOK_BATCH_SIZE: int = 100
+    WEBHOOK_CONCURRENCY: int = 20
+    WEBHOOK_ENDPOINT_CONCURRENCY: int = 2
+    WEBHOOK_MAX_CONNECTIONS: int = 50
+    WEBHOOK_TIMEOUT_SECONDS: float = 10.0
+    # Must cover sending a whole claim, or its rows may be sent twice.
+    WEBHOOK_LEASE_SECONDS: float = 300.0
+    WEBHOOK_MAX_ATTEMPTS: int = 10
+    WEBHOOK_RETRY_BASE_SECONDS: float = 5.0
+    WEBHOOK_RETRY_MAX_SECONDS: float = 3600.0
+    WEBHOOK_RETENTION_HOURS: float = 168.0
+
     @property
     def access_token_expire_timedelta(self) -> timedelta:
         return timedelta(minutes=self.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -4,6 +4,7 @@ from sqlalchemy.pool import NullPool
 from sqlalchemy import text
 
 from src.config import settings
+from src.migrations import run_migrations
 
 SQLALCHEMY_DATABASE_URL = (
     f"postgresql+asyncpg://"
@@ -42,3 +43,4 @@ async def init_db():
     async with engine.begin() as conn:
         await conn.execute(text("SET search_path = public"))
         await conn.run_sync(Base.metadata.create_all)
+        await run_migrations(conn)
@@ -0,0 +1,192 @@
+# Kept identical in candidate_service/src and test_service/src, since each
+# service is built from its own directory; change both copies together.
+# test_service/tests/test_shared_modules.py fails while they differ.
+
+import asyncio
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Pattern, Tuple
+
+from starlette.responses import JSONResponse, Response
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+REPLAYED_HEADER = "idempotent-replayed"
+
+
+class StoredResponse:
+    __slots__ = ("fingerprint", "status", "content_type", "body", "expires", "done")
+
+    def __init__(self, fingerprint: bytes, expires: float):
+        self.fingerprint = fingerprint
+        self.status = 0
+        self.content_type: Optional[str] = None
+        self.body = b""
+        self.expires = expires
+        self.done: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class IdempotencyStore:
+    def __init__(self, ttl: float = 86400.0, max_entries: int = 100_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, StoredResponse]" = OrderedDict()
+
+    def _evict(self, now: float) -> None:
+        # Entries are kept in reservation order, which is also expiry order.
+        # Requests still in flight are skipped rather than waited for, so a
+        # slow one cannot keep everything reserved after it alive.
+        entries = self._entries
+        excess = len(entries) - self.max_entries
+        evicted = []
+        for key, entry in entries.items():
+            if entry.expires > now and excess <= 0:
+                break
+            if entry.done.done():
+                evicted.append(key)
+                excess -= 1
+        for key in evicted:
+            del entries[key]
+
+    def get(self, key: bytes) -> Optional[StoredResponse]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires <= time.monotonic():
+            if entry.done.done():
+                del self._entries[key]
+                return None
+        return entry
+
+    def reserve(self, key: bytes, fingerprint: bytes) -> StoredResponse:
+        now = time.monotonic()
+        self._evict(now)
+        entry = self._entries[key] = StoredResponse(fingerprint, now + self.ttl)
+        return entry
+
+    def complete(self, key: bytes, entry: StoredResponse, keep: bool) -> None:
+        if not keep and self._entries.get(key) is entry:
+            del self._entries[key]
+        if not entry.done.done():
+            entry.done.set_result(None)
+
+
+class IdempotencyMiddleware:
+    def __init__(
+        self,
+        app,
+        store: IdempotencyStore,
+        routes: Iterable[Tuple[str, str]],
+        wait_timeout: float = 30.0,
+    ):
+        self.app = app
+        self.store = store
+        self.wait_timeout = wait_timeout
+        self.routes: List[Tuple[str, Pattern]] = [
+            (method, re.compile(pattern)) for method, pattern in routes
+        ]
+
+    def _applies(self, method: str, path: str) -> bool:
+        return any(m == method and p.match(path) for m, p in self.routes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._applies(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        idempotency_key = headers.get(IDEMPOTENCY_HEADER.encode())
+        if not idempotency_key:
+            await self.app(scope, receive, send)
+            return
+
+        body = bytearray()
+        more_body = True
+        while more_body:
+            message = await receive()
+            body.extend(message.get("body", b""))
+            more_body = message.get("more_body", False)
+
+        key = hashlib.blake2b(
+            b"\0".join(
+                (
+                    scope["method"].encode(),
+                    scope["path"].encode(),
+                    headers.get(b"authorization", b""),
+                    idempotency_key,
+                )
+            ),
+            digest_size=16,
+        ).digest()
+        fingerprint = hashlib.blake2b(bytes(body), digest_size=16).digest()
+
+        while True:
+            entry = self.store.get(key)
+            if entry is None:
+                break
+            if entry.fingerprint != fingerprint:
+                response = JSONResponse(
+                    status_code=422,
+                    content={
+                        "detail": "Idempotency-Key was already used with a different request body"
+                    },
+                )
+                await response(scope, receive, send)
+                return
+            try:
+                await asyncio.wait_for(asyncio.shield(entry.done), self.wait_timeout)
+            except asyncio.TimeoutError:
+                response = JSONResponse(
+                    status_code=409,
+                    content={
+                        "detail": "A request with this Idempotency-Key is in progress"
+                    },
+                    headers={"Retry-After": "1"},
+                )
+                await response(scope, receive, send)
+                return
+            if entry.status:
+                await self._replay(entry, scope, receive, send)
+                return
+
+        entry = self.store.reserve(key, fingerprint)
+        body_sent = False
+
+        async def receive_body():
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {"type": "http.request", "body": bytes(body), "more_body": False}
+
+        chunks = []
+
+        async def send_and_record(message):
+            if message["type"] == "http.response.start":
+                entry.status = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name.lower() == b"content-type":
+                        entry.content_type = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, send_and_record)
+        except BaseException:
+            entry.status = 0
+            self.store.complete(key, entry, keep=False)
+            raise
+        entry.body = b"".join(chunks)
+        keep = 0 < entry.status < 500
+        if not keep:
+            entry.status = 0
+        self.store.complete(key, entry, keep=keep)
+
+    async def _replay(self, entry: StoredResponse, scope, receive, send):
+        response = Response(
+            content=entry.body,
+            status_code=entry.status,
+            media_type=entry.content_type,
+            headers={REPLAYED_HEADER: "true"},
+        )
+        await response(scope, receive, send)
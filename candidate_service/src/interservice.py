@@ -0,0 +1,252 @@
+# Kept identical in candidate_service/src and test_service/src, since each
+# service is built from its own directory; change both copies together.
+# test_service/tests/test_shared_modules.py fails while they differ.
+
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from src.config import settings
+from src.timing import span
+from src.tracing import client_span
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class CircuitOpenError(httpx.RequestError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout: float,
+        half_open_max_calls: int = 1,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.times_opened = 0
+        self.short_circuited = 0
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.short_circuited += 1
+                return False
+            self.state = "half_open"
+            self.half_open_calls = 0
+        if self.state == "half_open":
+            if self.half_open_calls >= self.half_open_max_calls:
+                self.short_circuited += 1
+                return False
+            self.half_open_calls += 1
+        return True
+
+    def release(self) -> None:
+        if self.state == "half_open" and self.half_open_calls > 0:
+            self.half_open_calls -= 1
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+            "short_circuited": self.short_circuited,
+        }
+
+
+class RetryBudget:
+    """Token bucket shared by all outbound calls.
+
+    Every original request deposits ``ratio`` tokens and a steady
+    ``min_per_second`` trickle keeps low-traffic retries possible; each retry
+    or hedge spends one token, so retries can add at most ~ratio extra load.
+    """
+
+    def __init__(self, ratio: float, min_per_second: float, max_balance: float = 100):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_balance = max_balance
+        self.balance = max_balance
+        self.exhausted = 0
+        self._last_refill = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.balance = min(
+            self.max_balance,
+            self.balance + (now - self._last_refill) * self.min_per_second,
+        )
+        self._last_refill = now
+
+    def deposit(self) -> None:
+        self._refill()
+        self.balance = min(self.max_balance, self.balance + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        self._refill()
+        if self.balance >= 1:
+            self.balance -= 1
+            return True
+        self.exhausted += 1
+        return False
+
+
+retry_budget = RetryBudget(
+    settings.INTERSERVICE_RETRY_BUDGET_RATIO,
+    settings.INTERSERVICE_RETRY_MIN_PER_SECOND,
+)
+breakers: Dict[str, CircuitBreaker] = {}
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        )
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def breaker_for(host: str) -> CircuitBreaker:
+    breaker = breakers.get(host)
+    if breaker is None:
+        breaker = breakers[host] = CircuitBreaker(
+            settings.INTERSERVICE_BREAKER_FAILURES,
+            settings.INTERSERVICE_BREAKER_RESET_SECONDS,
+        )
+    return breaker
+
+
+def resilience_stats() -> dict:
+    return {
+        "circuit_breakers": {host: b.stats() for host, b in breakers.items()},
+        "retry_budget": {
+            "balance": round(retry_budget.balance, 2),
+            "exhausted": retry_budget.exhausted,
+        },
+    }
+
+
+async def _hedged(
+    send_once: Callable[[], Awaitable[httpx.Response]], delay: float
+) -> httpx.Response:
+    first = asyncio.ensure_future(send_once())
+    done, _ = await asyncio.wait({first}, timeout=delay)
+    if done or not retry_budget.try_withdraw():
+        return await first
+
+    pending = {first, asyncio.ensure_future(send_once())}
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None and task.result().status_code < 500:
+                    return task.result()
+                error = error or task.exception()
+                last = task
+        if error is not None:
+            raise error
+        return last.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def request(
+    method: str,
+    url: str,
+    peer: str,
+    idempotent: Optional[bool] = None,
+    hedge_after: Optional[float] = None,
+    **kwargs,
+) -> httpx.Response:
+    headers = kwargs.pop("headers", None) or {}
+    if idempotent is None:
+        idempotent = method in IDEMPOTENT_METHODS or any(
+            name.lower() == "idempotency-key" for name in headers
+        )
+    name = f"{method} {urlsplit(url).path}"
+    breaker = breaker_for(urlsplit(url).netloc)
+    client = get_client()
+    retry_budget.deposit()
+
+    async def send_once() -> httpx.Response:
+        with client_span(name, peer) as trace_headers:
+            return await client.request(
+                method, url, headers={**trace_headers, **headers}, **kwargs
+            )
+
+    attempt = 0
+    with span("remote", peer):
+        while True:
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit breaker for {peer} is open")
+
+            response: Optional[httpx.Response] = None
+            error: Optional[httpx.TransportError] = None
+            try:
+                if hedge_after is not None and method in ("GET", "HEAD"):
+                    response = await _hedged(send_once, hedge_after)
+                else:
+                    response = await send_once()
+            except httpx.TransportError as e:
+                error = e
+            except BaseException:
+                # Cancelled, or failed before the peer answered: nothing is
+                # known about its health, so a half-open probe gives back its
+                # slot instead of holding it forever.
+                breaker.release()
+                raise
+
+            if response is not None and response.status_code < 500:
+                breaker.record_success()
+                return response
+            breaker.record_failure()
+
+            if (
+                not idempotent
+                or attempt >= settings.INTERSERVICE_MAX_RETRIES
+                or not retry_budget.try_withdraw()
+            ):
+                if response is not None:
+                    return response
+                raise error
+
+            attempt += 1
+            backoff = min(2.0, settings.INTERSERVICE_RETRY_BASE_DELAY * 2**attempt)
+            await asyncio.sleep(random.uniform(0, backoff))
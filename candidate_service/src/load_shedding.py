@@ -0,0 +1,174 @@
+# Kept identical in candidate_service/src and test_service/src, since each
+# service is built from its own directory; change both copies together.
+# test_service/tests/test_shared_modules.py fails while they differ.
+
+import asyncio
+import math
+import re
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Pattern, Tuple
+
+from starlette.responses import JSONResponse
+
+
+class AdaptiveLimiter:
+    """Concurrency limiter with a bounded FIFO wait queue.
+
+    The limit follows a gradient rule: it shrinks when the short-term latency
+    drifts above the long-term baseline and grows by roughly sqrt(limit) while
+    latency stays flat. Failed requests (5xx) shrink it multiplicatively.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int = 1,
+        max_limit: int = 1000,
+        max_queue: int = 100,
+        queue_timeout: float = 1.0,
+        backoff_ratio: float = 0.9,
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.backoff_ratio = backoff_ratio
+        self.in_flight = 0
+        self.rejected = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._short_rtt: Optional[float] = None
+        self._long_rtt: Optional[float] = None
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        rtt = self._short_rtt or self.queue_timeout
+        return max(1, math.ceil(rtt * (self.queued + 1) / max(self.limit, 1.0)))
+
+    async def acquire(self) -> bool:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                return True
+            waiter.cancel()
+            self.rejected += 1
+            return False
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.in_flight -= 1
+                self._wake_waiters()
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self, rtt: float, failed: bool = False) -> None:
+        self.in_flight -= 1
+        self._update_limit(rtt, failed)
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _update_limit(self, rtt: float, failed: bool) -> None:
+        if failed:
+            self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+            return
+
+        if self._short_rtt is None:
+            self._short_rtt = self._long_rtt = rtt
+            return
+        self._short_rtt += (rtt - self._short_rtt) * 0.2
+        self._long_rtt += (rtt - self._long_rtt) * 0.01
+        if self._long_rtt / self._short_rtt > 2:
+            self._long_rtt *= 0.95
+
+        if self.in_flight + 1 < self.limit / 2:
+            return
+
+        gradient = max(0.5, min(1.0, self._long_rtt / self._short_rtt))
+        new_limit = self.limit * gradient + math.sqrt(self.limit)
+        new_limit = self.limit * 0.8 + new_limit * 0.2
+        self.limit = max(self.min_limit, min(self.max_limit, new_limit))
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "rejected": self.rejected,
+        }
+
+
+class LoadSheddingMiddleware:
+    def __init__(
+        self,
+        app,
+        buckets: Dict[str, AdaptiveLimiter],
+        routes: Iterable[Tuple[str, str, str]] = (),
+        default_bucket: str = "default",
+        exempt_paths: Iterable[str] = ("/health",),
+    ):
+        self.app = app
+        self.buckets = buckets
+        self.default_bucket = default_bucket
+        self.exempt_paths = set(exempt_paths)
+        self.routes: List[Tuple[str, Pattern, str]] = [
+            (method, re.compile(pattern), bucket) for method, pattern, bucket in routes
+        ]
+
+    def bucket_for(self, method: str, path: str) -> AdaptiveLimiter:
+        for route_method, pattern, bucket in self.routes:
+            if route_method in (method, "*") and pattern.match(path):
+                return self.buckets[bucket]
+        return self.buckets[self.default_bucket]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.bucket_for(scope["method"], scope["path"])
+        if not await limiter.acquire():
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Service overloaded, retry later"},
+                headers={"Retry-After": str(limiter.retry_after())},
+            )
+            await response(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            limiter.release(time.perf_counter() - started, status_code >= 500)
@@ -1,17 +1,29 @@
+import logging
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from src import interservice
 from src.config import settings
-from src.database import init_db
+from src.database import engine, init_db
+from src.idempotency import IdempotencyMiddleware, IdempotencyStore
+from src.load_shedding import AdaptiveLimiter, LoadSheddingMiddleware
+from src.timing import ServerTimingMiddleware, instrument_engine
+from src.tracing import TracingMiddleware, exporter
 from src.auth.router import router as auth_router
 from src.candidates.router import router as candidates_router
 from src.vacancies.router import router as vacancies_router
+from src.applications.events import application_broadcaster
 from src.applications.router import router as applications_router
+from src.traces.router import router as traces_router
+from src.webhooks.delivery import webhook_dispatcher
+from src.webhooks.router import router as webhooks_router
 
 from src.auth.models import User  # noqa: F401
 from src.candidates.models import Candidate  # noqa: F401
 from src.vacancies.models import Vacancy  # noqa: F401
 from src.applications.models import JobApplication  # noqa: F401
+from src.webhooks.models import WebhookSubscription  # noqa: F401
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -19,6 +31,40 @@ app = FastAPI(
     version="1.0.0",
 )
 
+if settings.LOAD_SHEDDING_ENABLED:
+    app.add_middleware(
+        LoadSheddingMiddleware,
+        buckets={
+            "default": AdaptiveLimiter(
+                settings.CHEAP_CONCURRENCY_LIMIT,
+                max_queue=settings.LOAD_SHEDDING_QUEUE_SIZE,
+                queue_timeout=settings.LOAD_SHEDDING_QUEUE_TIMEOUT,
+            ),
+            "expensive": AdaptiveLimiter(
+                settings.EXPENSIVE_CONCURRENCY_LIMIT,
+                max_queue=settings.LOAD_SHEDDING_QUEUE_SIZE,
+                queue_timeout=settings.LOAD_SHEDDING_QUEUE_TIMEOUT,
+            ),
+        },
+        routes=[
+            ("POST", r"^/applications/[^/]+/assign-test$", "expensive"),
+            ("POST", r"^/auth/(login|register)$", "expensive"),
+            ("GET", r"^/traces/", "expensive"),
+        ],
+        # Event streams stay open for minutes; they would pin a slot and
+        # skew the latency the limits adapt to.
+        exempt_paths=("/health", "/applications/events"),
+    )
+
+app.add_middleware(
+    IdempotencyMiddleware,
+    store=IdempotencyStore(
+        ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+        max_entries=settings.IDEMPOTENCY_MAX_ENTRIES,
+    ),
+    routes=[("POST", r"^/applications/?$")],
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -26,19 +72,44 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(TracingMiddleware)
+
+if settings.SERVER_TIMING_ENABLED:
+    logging.basicConfig(level=logging.INFO)
+    instrument_engine(engine)
+    app.add_middleware(ServerTimingMiddleware)
 
 
 @app.on_event("startup")
 async def on_startup():
     await init_db()
+    if settings.APPLICATION_EVENTS_ENABLED:
+        application_broadcaster.start()
+    if settings.WEBHOOKS_ENABLED:
+        webhook_dispatcher.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await application_broadcaster.stop()
+    await webhook_dispatcher.stop()
+    await interservice.close_client()
+    exporter.close()
 
 
 app.include_router(auth_router)
 app.include_router(candidates_router)
 app.include_router(vacancies_router)
 app.include_router(applications_router)
+app.include_router(traces_router)
+app.include_router(webhooks_router)
 
 
 @app.get("/health", tags=["Health"])
 async def health_check():
     return {"status": "ok", "service": settings.PROJECT_NAME}
+
+
+@app.get("/health/interservice", tags=["Health"])
+async def interservice_health():
+    return interservice.resilience_stats()
@@ -0,0 +1,148 @@
+from typing import Awaitable, Callable, List, Tuple, Union
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# create_all() only creates missing tables, so columns and indexes added to
+# existing tables are applied here. Every step must be idempotent because a
+# fresh database already gets them from the models.
+Step = Union[str, Callable[[AsyncConnection], Awaitable[None]]]
+
+MIGRATIONS: List[Tuple[str, List[Step]]] = [
+    (
+        "0001_fractional_test_score",
+        [
+            "ALTER TABLE job_applications ALTER COLUMN test_score TYPE DOUBLE PRECISION",
+            "ALTER TABLE job_applications ADD COLUMN IF NOT EXISTS test_score_percent DOUBLE PRECISION",
+        ],
+    ),
+    (
+        "0002_test_score_percentile",
+        [
+            "ALTER TABLE job_applications ADD COLUMN IF NOT EXISTS test_score_percentile DOUBLE PRECISION",
+        ],
+    ),
+    (
+        "0003_application_change_seq",
+        [
+            "ALTER TABLE job_applications ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+            "CREATE SEQUENCE IF NOT EXISTS job_applications_change_seq",
+            """
+            ALTER TABLE job_applications ADD COLUMN IF NOT EXISTS change_seq BIGINT
+            NOT NULL DEFAULT nextval('job_applications_change_seq')
+            """,
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS ix_job_applications_change_seq
+            ON job_applications (change_seq)
+            """,
+            # Writers take the lock before drawing a number and hold it until
+            # commit, so numbers become visible in increasing order and a
+            # reader that has seen n never later finds a change below n.
+            """
+            CREATE OR REPLACE FUNCTION job_applications_track_change() RETURNS trigger AS $$
+            BEGIN
+                PERFORM pg_advisory_xact_lock(hashtext('job_applications_change_seq'));
+                NEW.change_seq := nextval('job_applications_change_seq');
+                IF TG_OP = 'UPDATE' THEN
+                    NEW.updated_at := now();
+                END IF;
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+            """,
+            """
+            CREATE OR REPLACE TRIGGER job_applications_track_change
+            BEFORE INSERT OR UPDATE ON job_applications
+            FOR EACH ROW EXECUTE FUNCTION job_applications_track_change()
+            """,
+        ],
+    ),
+    (
+        "0004_application_change_notify",
+        [
+            # Delivered at commit, so listeners get changes in change_seq order.
+            """
+            CREATE OR REPLACE FUNCTION job_applications_notify_change() RETURNS trigger AS $$
+            BEGIN
+                PERFORM pg_notify('application_changes', row_to_json(NEW)::text);
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+            """,
+            """
+            CREATE OR REPLACE TRIGGER job_applications_notify_change
+            AFTER INSERT OR UPDATE ON job_applications
+            FOR EACH ROW EXECUTE FUNCTION job_applications_notify_change()
+            """,
+        ],
+    ),
+    (
+        "0005_webhook_deliveries",
+        [
+            # Queued in the transaction that changes the status, so no change
+            # is lost and none is sent unless it commits.
+            """
+            CREATE OR REPLACE FUNCTION job_applications_enqueue_webhooks() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'UPDATE' AND NEW.status = OLD.status THEN
+                    RETURN NULL;
+                END IF;
+                INSERT INTO webhook_deliveries (id, subscription_id, payload)
+                SELECT gen_random_uuid(), s.id, jsonb_build_object(
+                    'type', 'application.status_changed',
+                    'previous_status', CASE WHEN TG_OP = 'UPDATE' THEN OLD.status END,
+                    'application', to_jsonb(NEW)
+                )
+                FROM webhook_subscriptions s
+                WHERE s.active AND (s.statuses IS NULL OR NEW.status::text = ANY (s.statuses));
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+            """,
+            """
+            CREATE OR REPLACE TRIGGER job_applications_enqueue_webhooks
+            AFTER INSERT OR UPDATE ON job_applications
+            FOR EACH ROW EXECUTE FUNCTION job_applications_enqueue_webhooks()
+            """,
+        ],
+    ),
+    (
+        "0006_webhook_delivery_order",
+        [
+            "DROP INDEX IF EXISTS ix_webhook_deliveries_due",
+            """
+            CREATE INDEX IF NOT EXISTS ix_webhook_deliveries_subscription_pending
+            ON webhook_deliveries (subscription_id, created_at, id)
+            WHERE status = 'pending'
+            """,
+        ],
+    ),
+]
+
+
+async def run_migrations(conn: AsyncConnection) -> None:
+    await conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "name VARCHAR(100) PRIMARY KEY, "
+            "applied_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+        )
+    )
+    # Serialize concurrent workers starting up against the same database.
+    await conn.execute(
+        text("SELECT pg_advisory_xact_lock(hashtext('schema_migrations'))")
+    )
+    applied = set(
+        (await conn.execute(text("SELECT name FROM schema_migrations"))).scalars()
+    )
+    for name, steps in MIGRATIONS:
+        if name in applied:
+            continue
+        for step in steps:
+            if isinstance(step, str):
+                await conn.execute(text(step))
+            else:
+                await step(conn)
+        await conn.execute(
+            text("INSERT INTO schema_migrations (name) VALUES (:name)"), {"name": name}
+        )
@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+
+class TraceSpan(BaseModel):
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    service: str
+    name: str
+    kind: str
+    start: float
+    duration_ms: float
+    attributes: Dict[str, Any] = {}
+
+
+class CriticalPathSpan(TraceSpan):
+    self_ms: float
+
+
+class TraceRead(BaseModel):
+    trace_id: str
+    duration_ms: float
+    spans: List[TraceSpan]
+    critical_path: List[CriticalPathSpan]
@@ -1,4 +1,8 @@
 import re
+from typing import List
+from uuid import UUID
+
+from fastapi import HTTPException, status
 
 
 def is_valid_uuid4(s: str) -> bool:
@@ -12,3 +16,24 @@ def is_valid_uuid4(s: str) -> bool:
         re.I,
     )
     return bool(regex.match(s))
+
+
+def parse_id_list(raw: str, max_items: int) -> List[UUID]:
+    parts = [part.strip() for part in raw.split(",") if part.strip()]
+    if not parts:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="At least one id is required",
+        )
+    if len(parts) > max_items:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"At most {max_items} ids are allowed per request",
+        )
+    try:
+        return list(dict.fromkeys(UUID(part) for part in parts))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Invalid UUID in id list",
+        )
@@ -7,8 +7,9 @@ from src.vacancies.dependencies import get_vacancy_service, valid_vacancy_id
 from src.vacancies.service import VacancyService
 from src.auth.dependencies import authenticated_user, authenticated_admin
 from src.auth.models import User
+from src.timing import TimedRoute
 
-router = APIRouter(prefix="/vacancies", tags=["vacancies"])
+router = APIRouter(prefix="/vacancies", tags=["vacancies"], route_class=TimedRoute)
 
 
 @router.post("/", response_model=VacancyRead, status_code=status.HTTP_201_CREATED)
@@ -0,0 +1,359 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import random
+import time
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+from uuid import UUID
+
+import httpx
+from sqlalchemy import case, cast, delete, func, select, update
+from sqlalchemy.engine import Row
+
+from src.config import settings
+from src.database import async_session
+from src.webhooks.models import WebhookDelivery, WebhookSubscription
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_HEADER = "X-Webhook-Timestamp"
+SIGNATURE_HEADER = "X-Webhook-Signature"
+
+_delivery_status = WebhookDelivery.__table__.c.status.type
+
+
+def sign(secret: str, timestamp: int, body: bytes) -> str:
+    """HMAC-SHA256 of ``"<timestamp>.<body>"``, as receivers should verify it.
+
+    Signing the timestamp lets receivers reject replayed requests.
+    """
+    digest = hmac.new(
+        secret.encode(), str(timestamp).encode() + b"." + body, hashlib.sha256
+    ).hexdigest()
+    return f"sha256={digest}"
+
+
+def _head_attempt(subscription_id):
+    """When the subscription's oldest pending delivery is next due.
+
+    Events are sent in order, so a subscription is only claimed once its
+    oldest one is due; the lease or retry delay on it holds back the rest.
+    """
+    return (
+        select(WebhookDelivery.next_attempt_at)
+        .where(WebhookDelivery.subscription_id == subscription_id)
+        .where(WebhookDelivery.status == "pending")
+        .order_by(WebhookDelivery.created_at, WebhookDelivery.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+class WebhookDispatcher:
+    """Sends queued webhook deliveries from every worker.
+
+    Subscriptions whose oldest pending delivery is due are claimed with
+    ``FOR NO KEY UPDATE SKIP LOCKED`` and their pending deliveries leased by
+    pushing ``next_attempt_at`` forward, so workers never send the same rows
+    at once and rows of a worker that dies are sent again once the lease
+    runs out. Delivery is therefore at least once; events carry ids for
+    receivers to deduplicate on.
+
+    A subscription's events go out oldest first, ``batch_size`` per
+    request, through one shared client. Requests to the same host are
+    limited to ``endpoint_concurrency`` at a time and all requests to
+    ``concurrency``. A failed batch is retried with exponential backoff
+    together with the events behind it; events still failing after
+    ``max_attempts`` are dead-lettered until redelivered through the API.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        claim_size: int,
+        batch_size: int,
+        concurrency: int,
+        endpoint_concurrency: int,
+        max_connections: int,
+        timeout: float,
+        lease: float,
+        max_attempts: int,
+        retry_base: float,
+        retry_max: float,
+        retention: float,
+    ):
+        self.interval = interval
+        self.claim_size = claim_size
+        self.batch_size = batch_size
+        self.endpoint_concurrency = endpoint_concurrency
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.retention = retention
+        self._concurrency = asyncio.Semaphore(concurrency)
+        self._endpoints: Dict[str, asyncio.Semaphore] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._next_purge = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                timeout=self.timeout,
+            )
+        return self._client
+
+    async def _run(self) -> None:
+        while True:
+            claimed = 0
+            try:
+                claimed = await self.dispatch()
+                if claimed < self.claim_size and time.monotonic() >= self._next_purge:
+                    self._next_purge = time.monotonic() + 60
+                    await self.purge()
+            except Exception:
+                logger.exception("Webhook dispatch failed")
+            # A full claim means more are due; go straight back for them.
+            if claimed < self.claim_size:
+                await asyncio.sleep(self.interval)
+
+    async def dispatch(self) -> int:
+        claimed, subscriptions = await self._claim()
+        by_subscription: Dict[UUID, List[Row]] = defaultdict(list)
+        for row in sorted(claimed, key=lambda row: (row.created_at, row.id)):
+            by_subscription[row.subscription_id].append(row)
+        await asyncio.gather(
+            *(
+                self._send(subscriptions[subscription_id], rows)
+                for subscription_id, rows in by_subscription.items()
+            )
+        )
+        return len(claimed)
+
+    async def purge(self) -> int:
+        """Delete delivered events past their retention, a claim at a time."""
+        async with async_session() as db:
+            expired = (
+                select(WebhookDelivery.id)
+                .where(WebhookDelivery.status == "delivered")
+                .where(
+                    WebhookDelivery.delivered_at
+                    < func.now() - timedelta(hours=self.retention)
+                )
+                .limit(self.claim_size)
+                .with_for_update(skip_locked=True)
+                .cte("expired")
+            )
+            result = await db.execute(
+                delete(WebhookDelivery).where(
+                    WebhookDelivery.id.in_(select(expired.c.id))
+                )
+            )
+            await db.commit()
+            return result.rowcount
+
+    async def _claim(self) -> Tuple[Sequence[Row], Dict[UUID, Row]]:
+        async with async_session() as db:
+            # Deliveries of inactive subscriptions stay queued until they are
+            # reactivated. Locking a subscription keeps other workers from
+            # claiming it until this claim commits; the trigger's foreign key
+            # checks only take a key share lock, so enqueueing never waits.
+            subscriptions = {
+                row.id: row
+                for row in await db.execute(
+                    select(
+                        WebhookSubscription.id,
+                        WebhookSubscription.url,
+                        WebhookSubscription.secret,
+                    )
+                    .where(WebhookSubscription.active)
+                    .where(_head_attempt(WebhookSubscription.id) <= func.now())
+                    .with_for_update(skip_locked=True, key_share=True)
+                )
+            }
+            claimed: List[Row] = []
+            for subscription_id in subscriptions:
+                queued = (
+                    select(WebhookDelivery.id)
+                    .where(WebhookDelivery.subscription_id == subscription_id)
+                    .where(WebhookDelivery.status == "pending")
+                    .order_by(WebhookDelivery.created_at, WebhookDelivery.id)
+                    .limit(self.claim_size)
+                )
+                # Checked again now that the lock is held, as a worker that
+                # held it before may have committed a claim since.
+                claimed.extend(
+                    await db.execute(
+                        update(WebhookDelivery)
+                        .where(WebhookDelivery.id.in_(queued.scalar_subquery()))
+                        .where(_head_attempt(subscription_id) <= func.now())
+                        .values(
+                            next_attempt_at=func.now() + timedelta(seconds=self.lease)
+                        )
+                        .returning(
+                            WebhookDelivery.id,
+                            WebhookDelivery.subscription_id,
+                            WebhookDelivery.payload,
+                            WebhookDelivery.attempts,
+                            WebhookDelivery.created_at,
+                        )
+                        .execution_options(synchronize_session=False)
+                    )
+                )
+            await db.commit()
+            return claimed, subscriptions
+
+    async def _send(self, subscription: Row, rows: List[Row]) -> None:
+        url, secret = subscription.url, subscription.secret
+        host = urlsplit(url).netloc
+        endpoint = self._endpoints.get(host)
+        if endpoint is None:
+            endpoint = self._endpoints[host] = asyncio.Semaphore(
+                self.endpoint_concurrency
+            )
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start : start + self.batch_size]
+            async with endpoint, self._concurrency:
+                status_code, error = await self._post(url, secret, batch)
+            if error is None:
+                await self._delivered(batch, status_code)
+                continue
+            delay = await self._failed(batch, status_code, error)
+            # Sending later events first would only reorder them further.
+            await self._postpone(rows[start + self.batch_size :], delay)
+            return
+
+    async def _post(
+        self, url: str, secret: str, batch: List[Row]
+    ) -> Tuple[Optional[int], Optional[str]]:
+        body = json.dumps(
+            {
+                "events": [
+                    {
+                        "id": str(row.id),
+                        "created_at": row.created_at.isoformat(),
+                        **row.payload,
+                    }
+                    for row in batch
+                ]
+            }
+        ).encode()
+        timestamp = int(time.time())
+        try:
+            response = await self._get_client().post(
+                url,
+                content=body,
+                headers={
+                    "Content-Type": "application/json",
+                    TIMESTAMP_HEADER: str(timestamp),
+                    SIGNATURE_HEADER: sign(secret, timestamp, body),
+                },
+            )
+        except httpx.HTTPError as e:
+            return None, f"{type(e).__name__}: {e}"
+        if response.is_success:
+            return response.status_code, None
+        return response.status_code, f"HTTP {response.status_code}"
+
+    async def _delivered(self, batch: List[Row], status_code: int) -> None:
+        async with async_session() as db:
+            await db.execute(
+                update(WebhookDelivery)
+                .where(WebhookDelivery.id.in_([row.id for row in batch]))
+                .values(
+                    status="delivered",
+                    attempts=WebhookDelivery.attempts + 1,
+                    delivered_at=func.now(),
+                    last_status_code=status_code,
+                    last_error=None,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+    async def _failed(
+        self, batch: List[Row], status_code: Optional[int], error: str
+    ) -> float:
+        attempts = max(row.attempts for row in batch)
+        delay = min(self.retry_max, self.retry_base * 2**attempts)
+        delay = random.uniform(delay / 2, delay)
+        async with async_session() as db:
+            await db.execute(
+                update(WebhookDelivery)
+                .where(WebhookDelivery.id.in_([row.id for row in batch]))
+                .values(
+                    status=cast(
+                        case(
+                            (
+                                WebhookDelivery.attempts + 1 >= self.max_attempts,
+                                "dead",
+                            ),
+                            else_="pending",
+                        ),
+                        _delivery_status,
+                    ),
+                    attempts=WebhookDelivery.attempts + 1,
+                    next_attempt_at=func.now() + timedelta(seconds=delay),
+                    last_status_code=status_code,
+                    last_error=error[:1000],
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        return delay
+
+    async def _postpone(self, rows: List[Row], delay: float) -> None:
+        if not rows:
+            return
+        async with async_session() as db:
+            await db.execute(
+                update(WebhookDelivery)
+                .where(WebhookDelivery.id.in_([row.id for row in rows]))
+                .values(next_attempt_at=func.now() + timedelta(seconds=delay))
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+
+webhook_dispatcher = WebhookDispatcher(
+    interval=settings.WEBHOOK_POLL_INTERVAL_SECONDS,
+    claim_size=settings.WEBHOOK_CLAIM_SIZE,
+    batch_size=settings.WEBHOOK_BATCH_SIZE,
+    concurrency=settings.WEBHOOK_CONCURRENCY,
+    endpoint_concurrency=settings.WEBHOOK_ENDPOINT_CONCURRENCY,
+    max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+    timeout=settings.WEBHOOK_TIMEOUT_SECONDS,
+    lease=settings.WEBHOOK_LEASE_SECONDS,
+    max_attempts=settings.WEBHOOK_MAX_ATTEMPTS,
+    retry_base=settings.WEBHOOK_RETRY_BASE_SECONDS,
+    retry_max=settings.WEBHOOK_RETRY_MAX_SECONDS,
+    retention=settings.WEBHOOK_RETENTION_HOURS,
+)
@@ -0,0 +1,23 @@
+from fastapi import HTTPException, status, Depends
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.database import get_db
+from src.webhooks.schemas import WebhookRead
+from src.webhooks.service import WebhookService
+
+
+async def get_webhook_service(db: AsyncSession = Depends(get_db)) -> WebhookService:
+    return WebhookService(db)
+
+
+async def valid_webhook_id(
+    webhook_id: UUID,
+    service: WebhookService = Depends(get_webhook_service),
+) -> WebhookRead:
+    webhook = await service.get_webhook(webhook_id)
+    if not webhook:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Webhook not found"
+        )
+    return webhook
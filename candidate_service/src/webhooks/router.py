@@ -0,0 +1,150 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import List, Literal, Optional
+from uuid import UUID
+
+from src.webhooks.schemas import (
+    WebhookCreate,
+    WebhookCreated,
+    WebhookDeliveryRead,
+    WebhookRead,
+    WebhookRedelivery,
+)
+from src.webhooks.dependencies import get_webhook_service, valid_webhook_id
+from src.webhooks.service import WebhookService
+from src.auth.dependencies import authenticated_admin
+from src.auth.models import User
+from src.timing import TimedRoute
+
+router = APIRouter(prefix="/webhooks", tags=["webhooks"], route_class=TimedRoute)
+
+
+@router.post("/", response_model=WebhookCreated, status_code=status.HTTP_201_CREATED)
+async def create_webhook(
+    data: WebhookCreate,
+    current_user: User = Depends(authenticated_admin),
+    service: WebhookService = Depends(get_webhook_service),
+):
+    try:
+        return await service.create_webhook(data)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create webhook: {str(e)}",
+        )
+
+
+@router.get("/", response_model=List[WebhookRead])
+async def list_webhooks(
+    limit: int = Query(default=10, ge=1),
+    offset: int = Query(default=0, ge=0),
+    current_user: User = Depends(authenticated_admin),
+    service: WebhookService = Depends(get_webhook_service),
+):
+    try:
+        return await service.list_webhooks(limit=limit, offset=offset)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to list webhooks: {str(e)}",
+        )
+
+
+@router.get("/{webhook_id}", response_model=WebhookRead)
+async def read_webhook(
+    current_user: User = Depends(authenticated_admin),
+    webhook: WebhookRead = Depends(valid_webhook_id),
+):
+    return webhook
+
+
+@router.put("/{webhook_id}", response_model=WebhookRead)
+async def update_webhook(
+    webhook_id: UUID,
+    data: WebhookCreate,
+    current_user: User = Depends(authenticated_admin),
+    service: WebhookService = Depends(get_webhook_service),
+):
+    try:
+        updated = await service.update_webhook(webhook_id, data)
+        if not updated:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Webhook not found"
+            )
+        return updated
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to update webhook: {str(e)}",
+        )
+
+
+@router.delete("/{webhook_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_webhook(
+    webhook_id: UUID,
+    current_user: User = Depends(authenticated_admin),
+    service: WebhookService = Depends(get_webhook_service),
+):
+    try:
+        deleted = await service.delete_webhook(webhook_id)
+        if not deleted:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Webhook not found"
+            )
+        return None
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to delete webhook: {str(e)}",
+        )
+
+
+@router.get("/{webhook_id}/deliveries", response_model=List[WebhookDeliveryRead])
+async def list_deliveries(
+    delivery_status: Optional[Literal["pending", "delivered", "dead"]] = Query(
+        default=None, alias="status"
+    ),
+    limit: int = Query(default=10, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
+    current_user: User = Depends(authenticated_admin),
+    webhook: WebhookRead = Depends(valid_webhook_id),
+    service: WebhookService = Depends(get_webhook_service),
+):
+    try:
+        return await service.list_deliveries(
+            webhook.id, delivery_status=delivery_status, limit=limit, offset=offset
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to list webhook deliveries: {str(e)}",
+        )
+
+
+@router.post("/{webhook_id}/deliveries/redeliver", response_model=WebhookRedelivery)
+async def redeliver(
+    delivery_id: Optional[UUID] = Query(default=None),
+    current_user: User = Depends(authenticated_admin),
+    webhook: WebhookRead = Depends(valid_webhook_id),
+    service: WebhookService = Depends(get_webhook_service),
+):
+    """Requeue the webhook's dead-lettered deliveries, or just one of them."""
+    try:
+        requeued = await service.redeliver(webhook.id, delivery_id)
+        return WebhookRedelivery(requeued=requeued)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to redeliver webhook deliveries: {str(e)}",
+        )
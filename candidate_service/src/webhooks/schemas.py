@@ -0,0 +1,49 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Literal, Optional
+from uuid import UUID
+
+ApplicationStatus = Literal["applied", "tested", "hired"]
+
+
+class WebhookBase(BaseModel):
+    url: str = Field(min_length=1, max_length=2048, pattern=r"^https?://")
+    statuses: Optional[List[ApplicationStatus]] = Field(default=None, min_length=1)
+    active: bool = True
+
+
+class WebhookCreate(WebhookBase):
+    # Generated when omitted; on update, omitting it keeps the current one.
+    secret: Optional[str] = Field(default=None, min_length=16, max_length=128)
+
+
+class WebhookRead(WebhookBase):
+    id: UUID
+    created_at: datetime
+    updated_at: Optional[datetime]
+
+    model_config = {"from_attributes": True}
+
+
+class WebhookCreated(WebhookRead):
+    # The only response that carries the signing secret.
+    secret: str
+
+
+class WebhookDeliveryRead(BaseModel):
+    id: UUID
+    subscription_id: UUID
+    payload: dict
+    status: Literal["pending", "delivered", "dead"]
+    attempts: int
+    next_attempt_at: datetime
+    last_status_code: Optional[int]
+    last_error: Optional[str]
+    created_at: datetime
+    delivered_at: Optional[datetime]
+
+    model_config = {"from_attributes": True}
+
+
+class WebhookRedelivery(BaseModel):
+    requeued: int
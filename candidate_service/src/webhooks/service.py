@@ -0,0 +1,176 @@
+import secrets
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, update
+from typing import List, Optional
+from uuid import UUID
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from fastapi import HTTPException, status
+
+from src.webhooks.models import WebhookDelivery, WebhookSubscription
+from src.webhooks.schemas import (
+    WebhookCreate,
+    WebhookCreated,
+    WebhookDeliveryRead,
+    WebhookRead,
+)
+
+
+class WebhookService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create_webhook(self, data: WebhookCreate) -> WebhookCreated:
+        try:
+            values = data.model_dump()
+            if values["secret"] is None:
+                values["secret"] = secrets.token_urlsafe(32)
+            new_item = WebhookSubscription(**values)
+            self.db.add(new_item)
+            await self.db.commit()
+            await self.db.refresh(new_item)
+            return WebhookCreated.model_validate(new_item)
+        except IntegrityError as e:
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Failed to create webhook: {str(e)}",
+            )
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}",
+            )
+
+    async def get_webhook(self, webhook_id: UUID) -> Optional[WebhookRead]:
+        try:
+            result = await self.db.execute(
+                select(WebhookSubscription).where(WebhookSubscription.id == webhook_id)
+            )
+            obj = result.scalar_one_or_none()
+            if not obj:
+                return None
+            return WebhookRead.model_validate(obj)
+        except SQLAlchemyError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}",
+            )
+
+    async def list_webhooks(
+        self, limit: int = 10, offset: int = 0
+    ) -> List[WebhookRead]:
+        try:
+            result = await self.db.execute(
+                select(WebhookSubscription)
+                .order_by(WebhookSubscription.created_at, WebhookSubscription.id)
+                .limit(limit)
+                .offset(offset)
+            )
+            return [WebhookRead.model_validate(item) for item in result.scalars()]
+        except SQLAlchemyError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}",
+            )
+
+    async def update_webhook(
+        self, webhook_id: UUID, data: WebhookCreate
+    ) -> Optional[WebhookRead]:
+        try:
+            result = await self.db.execute(
+                select(WebhookSubscription).where(WebhookSubscription.id == webhook_id)
+            )
+            obj = result.scalar_one_or_none()
+            if not obj:
+                return None
+            for field, value in data.model_dump().items():
+                if field == "secret" and value is None:
+                    continue
+                setattr(obj, field, value)
+            await self.db.commit()
+            await self.db.refresh(obj)
+            return WebhookRead.model_validate(obj)
+        except IntegrityError as e:
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Failed to update webhook: {str(e)}",
+            )
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}",
+            )
+
+    async def delete_webhook(self, webhook_id: UUID) -> bool:
+        try:
+            result = await self.db.execute(
+                select(WebhookSubscription).where(WebhookSubscription.id == webhook_id)
+            )
+            obj = result.scalar_one_or_none()
+            if not obj:
+                return False
+            await self.db.delete(obj)
+            await self.db.commit()
+            return True
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}",
+            )
+
+    async def list_deliveries(
+        self,
+        webhook_id: UUID,
+        delivery_status: Optional[str] = None,
+        limit: int = 10,
+        offset: int = 0,
+    ) -> List[WebhookDeliveryRead]:
+        try:
+            stmt = select(WebhookDelivery).where(
+                WebhookDelivery.subscription_id == webhook_id
+            )
+            if delivery_status is not None:
+                stmt = stmt.where(WebhookDelivery.status == delivery_status)
+            result = await self.db.execute(
+                stmt.order_by(
+                    WebhookDelivery.created_at.desc(), WebhookDelivery.id.desc()
+                )
+                .limit(limit)
+                .offset(offset)
+            )
+            return [
+                WebhookDeliveryRead.model_validate(item) for item in result.scalars()
+            ]
+        except SQLAlchemyError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}",
+            )
+
+    async def redeliver(
+        self, webhook_id: UUID, delivery_id: Optional[UUID] = None
+    ) -> int:
+        """Queue dead-lettered deliveries again with a fresh set of attempts."""
+        try:
+            stmt = (
+                update(WebhookDelivery)
+                .where(WebhookDelivery.subscription_id == webhook_id)
+                .where(WebhookDelivery.status == "dead")
+                .values(status="pending", attempts=0, next_attempt_at=func.now())
+                .execution_options(synchronize_session=False)
+            )
+            if delivery_id is not None:
+                stmt = stmt.where(WebhookDelivery.id == delivery_id)
+            result = await self.db.execute(stmt)
+            await self.db.commit()
+            return result.rowcount
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}",
+            )
@@ -0,0 +1,103 @@
+"""
+Questions served and measurement quality, full test vs adaptive.
+
+Simulates candidates of known ability answering a Rasch item bank:
+calibrates difficulties from full-test responses, then gives new
+candidates either every question, adaptive tests stopping at a few
+standard error targets, or random fixed forms as long as the adaptive
+tests were on average, and compares ability recovery. No database is
+needed.
+
+Run from test_service/:  python -m benchmarks.adaptive_testing
+"""
+
+import time
+
+import numpy as np
+
+from src.adaptive import ItemBank, fit_rasch
+
+QUESTIONS = 60
+CALIBRATION_SESSIONS = 5000
+CANDIDATES = 2000
+TARGETS = (0.5, 0.4, 0.3)
+
+rng = np.random.default_rng(7)
+
+
+def respond(ability, difficulty):
+    p = 1.0 / (1.0 + np.exp(difficulty[None, :] - ability[:, None]))
+    return rng.random(p.shape) < p
+
+
+def adaptive_test(bank, ability, difficulty, select_times):
+    """Answered flags and responses of one simulated adaptive session."""
+    answered = np.zeros(QUESTIONS, dtype=bool)
+    correct = np.zeros(QUESTIONS, dtype=bool)
+    while True:
+        estimate, se, _ = bank.estimate(correct[None], answered[None])
+        if bank.done(se[0], answered.sum()):
+            return correct, answered
+        started = time.perf_counter()
+        question = bank.next_question(estimate[0], answered)
+        select_times.append(time.perf_counter() - started)
+        if question is None:
+            return correct, answered
+        answered[question] = True
+        correct[question] = respond(np.array([ability]), difficulty[[question]])[0, 0]
+
+
+def report(label, served, estimates, abilities):
+    error = estimates - abilities
+    print(
+        f"{label:<16} {served.mean():6.1f} questions/session  "
+        f"RMSE {np.sqrt(np.mean(error**2)):.3f}  "
+        f"corr {np.corrcoef(estimates, abilities)[0, 1]:.3f}"
+    )
+
+
+def main():
+    difficulty = rng.normal(0, 1.2, QUESTIONS)
+    history = rng.normal(0, 1, CALIBRATION_SESSIONS)
+    started = time.perf_counter()
+    fitted, _, iterations = fit_rasch(
+        respond(history, difficulty), np.ones((CALIBRATION_SESSIONS, QUESTIONS), bool)
+    )
+    print(
+        f"calibration: {CALIBRATION_SESSIONS} sessions x {QUESTIONS} questions in "
+        f"{time.perf_counter() - started:.2f}s ({iterations} iterations), "
+        f"difficulty RMSE "
+        f"{np.sqrt(np.mean((fitted - fitted.mean() - difficulty + difficulty.mean()) ** 2)):.3f}"
+    )
+
+    abilities = rng.normal(0, 1, CANDIDATES)
+    question_max = np.ones(QUESTIONS)
+    full = ItemBank(fitted, question_max, target_se=0.0)
+    responses = respond(abilities, difficulty)
+    everything = np.ones_like(responses)
+    estimates, _, _ = full.estimate(responses, everything)
+    report("full test", everything.sum(axis=1), estimates, abilities)
+
+    for target in TARGETS:
+        bank = ItemBank(fitted, question_max, target_se=target)
+        select_times = []
+        sessions = [
+            adaptive_test(bank, ability, difficulty, select_times)
+            for ability in abilities
+        ]
+        correct = np.array([c for c, _ in sessions])
+        answered = np.array([a for _, a in sessions])
+        estimates, _, _ = bank.estimate(correct, answered)
+        served = answered.sum(axis=1)
+        report(f"adaptive se<={target}", served, estimates, abilities)
+
+        # A fixed form of the same length, drawn at random per candidate.
+        length = int(round(served.mean()))
+        drawn = np.argsort(rng.random((CANDIDATES, QUESTIONS)), axis=1) < length
+        estimates, _, _ = full.estimate(responses, drawn)
+        report(f"fixed {length}", drawn.sum(axis=1), estimates, abilities)
+        print(f"{'':<16} next question p50 {np.median(select_times) * 1e6:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Disk footprint and read latency of per-answer rows vs compacted sessions.
+
+Seeds finished sessions of a scratch template, measures the answers stored
+as session_answers rows (heap plus both indexes) and the reads used by the
+answers listing and by scoring, then compacts the sessions and measures the
+packed arrays the same way. Reads run warm, on one connection.
+
+Needs the service's database settings in the environment.
+Run from test_service/:  python -m benchmarks.answer_storage
+"""
+
+import asyncio
+import random
+import statistics
+import time
+import uuid
+
+from sqlalchemy import delete, select, text
+
+from src.answers.models import AnswerOption
+from src.database import async_session, engine
+from src.questions.models import Question
+from src.scoring import score_sessions
+from src.sessions.models import TestSession
+from src.sessions.service import SessionService
+from src.sessions.storage import compact_finished_sessions
+from src.templates.models import TestTemplate
+
+SESSIONS = 5000
+QUESTIONS = 30
+OPTIONS = 4
+READS = 500
+SCORE_BATCH = 200
+
+
+async def create_template():
+    async with async_session() as db:
+        template = TestTemplate(title=f"bench-{uuid.uuid4().hex[:8]}")
+        db.add(template)
+        await db.flush()
+        for i in range(QUESTIONS):
+            question = Question(template_id=template.id, text=f"q{i}")
+            db.add(question)
+            await db.flush()
+            db.add_all(
+                AnswerOption(question_id=question.id, text=f"o{j}", correct=j == 0)
+                for j in range(OPTIONS)
+            )
+        await db.commit()
+        return template.id
+
+
+async def seed(template_id):
+    async with async_session() as db:
+        await db.execute(
+            text(
+                "INSERT INTO test_sessions (id, application_id, template_id, "
+                "candidate_email, status, started_at, finished_at) "
+                "SELECT gen_random_uuid(), gen_random_uuid(), :t, "
+                "'bench@example.com', 'finished', now(), now() "
+                "FROM generate_series(1, :n)"
+            ),
+            {"t": template_id, "n": SESSIONS},
+        )
+        await db.execute(
+            text(
+                "INSERT INTO session_answers "
+                "(id, session_id, question_id, answer_id, created_at) "
+                "SELECT gen_random_uuid(), s.id, q.id, "
+                "q.options[1 + floor(random() * array_length(q.options, 1))::int], "
+                "s.started_at + q.n * interval '20 seconds' "
+                "FROM test_sessions s CROSS JOIN ("
+                "  SELECT o.question_id AS id, array_agg(o.id) AS options, "
+                "  row_number() OVER () AS n "
+                "  FROM answer_options o JOIN questions q ON q.id = o.question_id "
+                "  WHERE q.template_id = :t GROUP BY o.question_id"
+                ") q WHERE s.template_id = :t"
+            ),
+            {"t": template_id},
+        )
+        await db.commit()
+        result = await db.execute(
+            select(TestSession.id).where(TestSession.template_id == template_id)
+        )
+        return result.scalars().all()
+
+
+async def footprint(template_id) -> int:
+    """Bytes of a copy of the template's answer storage, indexes included."""
+    async with engine.connect() as conn:
+        await conn.execute(
+            text(
+                "CREATE TEMP TABLE bench_rows AS SELECT a.* FROM session_answers a "
+                "JOIN test_sessions s ON s.id = a.session_id WHERE s.template_id = :t"
+            ),
+            {"t": template_id},
+        )
+        await conn.execute(text("ALTER TABLE bench_rows ADD PRIMARY KEY (id)"))
+        await conn.execute(
+            text("CREATE UNIQUE INDEX ON bench_rows (session_id, question_id)")
+        )
+        await conn.execute(
+            text(
+                "CREATE TEMP TABLE bench_packed AS SELECT answer_question_ids, "
+                "answer_option_ids, answer_times FROM test_sessions "
+                "WHERE template_id = :t AND answer_option_ids IS NOT NULL"
+            ),
+            {"t": template_id},
+        )
+        size = (
+            await conn.execute(
+                text(
+                    "SELECT pg_total_relation_size('bench_rows') "
+                    "+ pg_total_relation_size('bench_packed')"
+                )
+            )
+        ).scalar_one()
+        await conn.rollback()
+        return size
+
+
+async def reads(session_ids, template_id):
+    sample = random.sample(session_ids, READS)
+    async with async_session() as db:
+        service = SessionService(db)
+        await service.list_answers_for_session(sample[0], limit=QUESTIONS)
+        listing = []
+        for session_id in sample:
+            started = time.perf_counter()
+            await service.list_answers_for_session(session_id, limit=QUESTIONS)
+            listing.append((time.perf_counter() - started) * 1e3)
+
+        started = time.perf_counter()
+        for start in range(0, len(session_ids), SCORE_BATCH):
+            batch = session_ids[start : start + SCORE_BATCH]
+            await score_sessions(db, batch, [template_id] * len(batch))
+        scoring = len(session_ids) / (time.perf_counter() - started)
+    listing.sort()
+    return listing, scoring
+
+
+async def measure(label, session_ids, template_id):
+    size = await footprint(template_id)
+    listing, scoring = await reads(session_ids, template_id)
+    print(
+        f"{label:<8} {size / (SESSIONS * QUESTIONS):6.1f} bytes/answer  "
+        f"list p50={statistics.median(listing):6.2f}ms "
+        f"p99={listing[int(len(listing) * 0.99)]:6.2f}ms  "
+        f"scoring {scoring:8.0f} sessions/s"
+    )
+
+
+async def main():
+    engine.echo = False
+    template_id = await create_template()
+    try:
+        session_ids = await seed(template_id)
+        await measure("rows", session_ids, template_id)
+
+        started = time.perf_counter()
+        compacted = 0
+        while True:
+            async with async_session() as db:
+                batch = await compact_finished_sessions(db, 1000, template_id)
+                await db.commit()
+            compacted += batch
+            if not batch:
+                break
+        print(
+            f"compacted {compacted} sessions in "
+            f"{time.perf_counter() - started:.2f}s"
+        )
+        await measure("packed", session_ids, template_id)
+    finally:
+        async with async_session() as db:
+            await db.execute(
+                delete(TestSession).where(TestSession.template_id == template_id)
+            )
+            await db.execute(delete(TestTemplate).where(TestTemplate.id == template_id))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
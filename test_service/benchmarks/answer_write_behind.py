@@ -0,0 +1,125 @@
+"""
+Sustained POST /sessions/answers throughput, direct inserts vs write-behind.
+
+Every candidate answers all questions of a template one after another, as
+the service layer sees it. Write-behind time includes the final flush, so
+both runs end with every answer in the database.
+
+Needs the service's database settings in the environment.
+Run from test_service/:  python -m benchmarks.answer_write_behind
+"""
+
+import asyncio
+import statistics
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import delete
+
+from src.answers.models import AnswerOption
+from src.database import async_session, engine
+from src.questions.models import Question
+from src.sessions.answer_buffer import answer_buffer
+from src.sessions.models import TestSession
+from src.sessions.schemas import SessionAnswerCreate
+from src.sessions.service import SessionService
+from src.templates.models import TestTemplate
+from src.templates.versions import current_version
+
+CANDIDATES = 200
+QUESTIONS = 20
+# In-flight requests, as the load shedding middleware would cap them.
+CONCURRENCY = 50
+
+
+async def create_template():
+    async with async_session() as db:
+        template = TestTemplate(title=f"bench-{uuid.uuid4().hex[:8]}")
+        db.add(template)
+        await db.flush()
+        pairs = []
+        for i in range(QUESTIONS):
+            question = Question(template_id=template.id, text=f"q{i}")
+            db.add(question)
+            await db.flush()
+            option = AnswerOption(question_id=question.id, text="a", correct=True)
+            db.add(option)
+            await db.flush()
+            pairs.append((question.id, option.id))
+        await db.commit()
+        return template.id, pairs
+
+
+async def create_sessions(template_id):
+    async with async_session() as db:
+        # Pinned like SessionService.create_session does.
+        version = await current_version(db, template_id)
+        sessions = [
+            TestSession(
+                application_id=uuid.uuid4(),
+                template_id=template_id,
+                template_version_id=version.id,
+                candidate_email="bench@example.com",
+            )
+            for _ in range(CANDIDATES)
+        ]
+        db.add_all(sessions)
+        await db.commit()
+        return [s.id for s in sessions]
+
+
+async def candidate(session_id, pairs, samples, slots):
+    for question_id, option_id in pairs:
+        started = time.perf_counter()
+        async with slots, async_session() as db:
+            await SessionService(db).create_answer(
+                SessionAnswerCreate(
+                    session_id=session_id, question_id=question_id, answer_id=option_id
+                )
+            )
+        samples.append((time.perf_counter() - started) * 1e3)
+
+
+async def measure(label, template_id, pairs):
+    session_ids = await create_sessions(template_id)
+    samples = []
+    slots = asyncio.Semaphore(CONCURRENCY)
+    started = time.perf_counter()
+    await asyncio.gather(*(candidate(s, pairs, samples, slots) for s in session_ids))
+    if answer_buffer.enabled:
+        await answer_buffer.flush()
+    elapsed = time.perf_counter() - started
+    samples.sort()
+    print(
+        f"{label:<14} {len(samples) / elapsed:9.0f} answers/s "
+        f"p50={statistics.median(samples):7.2f}ms "
+        f"p99={samples[int(len(samples) * 0.99)]:7.2f}ms"
+    )
+
+
+async def main():
+    engine.echo = False
+    template_id, pairs = await create_template()
+    try:
+        await measure("direct", template_id, pairs)
+        with tempfile.TemporaryDirectory() as journal_dir:
+            answer_buffer.enabled = True
+            answer_buffer.journal_path = f"{journal_dir}/answers"
+            await answer_buffer.start()
+            try:
+                await measure("write-behind", template_id, pairs)
+            finally:
+                await answer_buffer.stop()
+    finally:
+        async with async_session() as db:
+            await db.execute(
+                delete(TestSession).where(TestSession.template_id == template_id)
+            )
+            await db.execute(delete(TestTemplate).where(TestTemplate.id == template_id))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
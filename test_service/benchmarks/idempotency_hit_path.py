@@ -0,0 +1,96 @@
+"""
+Hit-path latency of IdempotencyMiddleware.
+
+Run from test_service/:  python -m benchmarks.idempotency_hit_path
+"""
+
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+from fastapi import FastAPI
+
+from src.idempotency import IdempotencyMiddleware, IdempotencyStore
+
+HANDLER_DELAY = 0.002
+ITERATIONS = 5000
+
+
+def build_app():
+    app = FastAPI()
+
+    @app.post("/sessions/answers", status_code=201)
+    async def create_answer(payload: dict):
+        await asyncio.sleep(HANDLER_DELAY)
+        return {"id": str(uuid.uuid4()), **payload}
+
+    return IdempotencyMiddleware(
+        app, store=IdempotencyStore(), routes=[("POST", r"^/sessions/answers$")]
+    )
+
+
+async def call(app, body: bytes, key: bytes = None) -> int:
+    headers = [(b"content-type", b"application/json")]
+    if key:
+        headers.append((b"idempotency-key", key))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/sessions/answers",
+        "raw_path": b"/sessions/answers",
+        "query_string": b"",
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 1),
+        "server": ("127.0.0.1", 80),
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def measure(label: str, app, body: bytes, key_for) -> None:
+    samples = []
+    for i in range(ITERATIONS):
+        started = time.perf_counter()
+        await call(app, body, key_for(i))
+        samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    print(
+        f"{label:<28} p50={statistics.median(samples):8.1f}us "
+        f"p99={samples[int(len(samples) * 0.99)]:8.1f}us"
+    )
+
+
+async def main():
+    app = build_app()
+    body = json.dumps(
+        {
+            "session_id": str(uuid.uuid4()),
+            "question_id": str(uuid.uuid4()),
+            "answer_id": str(uuid.uuid4()),
+        }
+    ).encode()
+
+    await call(app, body, b"hot-key")
+    await measure("no key (handler)", app, body, lambda i: None)
+    await measure("first use (handler+store)", app, body, lambda i: f"k{i}".encode())
+    await measure("replay (hit path)", app, body, lambda i: b"hot-key")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
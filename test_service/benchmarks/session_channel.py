@@ -0,0 +1,188 @@
+"""
+Concurrent test-taking channels held by one service worker.
+
+Starts the service as a single uvicorn worker, opens one channel per
+candidate and reads the template push, then measures the worker's resident
+memory per idle connection. Every candidate then answers all questions one
+after another, waiting for each ack as a client would, and then finishes.
+
+Needs the service's database settings in the environment.
+Run from test_service/:  python -m benchmarks.session_channel
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+import websockets
+from sqlalchemy import delete
+
+from src.answers.models import AnswerOption
+from src.database import async_session, engine
+from src.questions.models import Question
+from src.sessions.models import TestSession
+from src.templates.models import TestTemplate
+
+CONNECTIONS = 1000
+QUESTIONS = 20
+PORT = 8092
+
+
+async def create_template():
+    async with async_session() as db:
+        template = TestTemplate(title=f"bench-{uuid.uuid4().hex[:8]}")
+        db.add(template)
+        await db.flush()
+        pairs = []
+        for i in range(QUESTIONS):
+            question = Question(template_id=template.id, text=f"q{i}")
+            db.add(question)
+            await db.flush()
+            option = AnswerOption(question_id=question.id, text="a", correct=True)
+            db.add(option)
+            await db.flush()
+            pairs.append((str(question.id), str(option.id)))
+        await db.commit()
+        return template.id, pairs
+
+
+async def create_sessions(template_id):
+    async with async_session() as db:
+        sessions = [
+            TestSession(
+                application_id=uuid.uuid4(),
+                template_id=template_id,
+                candidate_email="bench@example.com",
+            )
+            for _ in range(CONNECTIONS)
+        ]
+        db.add_all(sessions)
+        await db.commit()
+        return [s.id for s in sessions]
+
+
+def rss_kib(pid) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    raise RuntimeError("VmRSS not found")
+
+
+async def start_worker():
+    worker = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(PORT)],
+        env={**os.environ, "SESSION_SWEEPER_ENABLED": "false"},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    async with httpx.AsyncClient() as client:
+        for _ in range(300):
+            try:
+                await client.get(f"http://127.0.0.1:{PORT}/health")
+                return worker
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    worker.kill()
+    raise RuntimeError("worker did not start")
+
+
+async def connect(session_id):
+    ws = await websockets.connect(
+        f"ws://127.0.0.1:{PORT}/sessions/{session_id}/ws", max_size=None
+    )
+    await ws.recv()
+    return ws
+
+
+async def candidate(ws, pairs, samples):
+    for seq, (question_id, option_id) in enumerate(pairs):
+        started = time.perf_counter()
+        await ws.send(
+            json.dumps(
+                {
+                    "type": "answer",
+                    "seq": seq,
+                    "question_id": question_id,
+                    "answer_id": option_id,
+                }
+            )
+        )
+        reply = json.loads(await ws.recv())
+        if reply["type"] != "ack":
+            raise RuntimeError(reply)
+        samples.append((time.perf_counter() - started) * 1e3)
+
+
+async def finish(ws):
+    await ws.send(json.dumps({"type": "finish"}))
+    while json.loads(await ws.recv())["type"] != "finished":
+        pass
+    await ws.close()
+
+
+async def main():
+    engine.echo = False
+    template_id, pairs = await create_template()
+    worker = None
+    try:
+        session_ids = await create_sessions(template_id)
+        worker = await start_worker()
+        # Warm the answer key and template caches before the baseline.
+        await (await connect(session_ids[0])).close()
+        baseline = rss_kib(worker.pid)
+
+        started = time.perf_counter()
+        sockets = []
+        for start in range(0, CONNECTIONS, 100):
+            sockets += await asyncio.gather(
+                *(connect(s) for s in session_ids[start : start + 100])
+            )
+        opened = time.perf_counter() - started
+        await asyncio.sleep(1)
+        idle = rss_kib(worker.pid)
+        print(
+            f"{CONNECTIONS} channels opened in {opened:.2f}s  "
+            f"worker RSS {baseline / 1024:.0f} -> {idle / 1024:.0f} MiB  "
+            f"({(idle - baseline) / CONNECTIONS:.1f} KiB/connection)"
+        )
+
+        samples = []
+        started = time.perf_counter()
+        await asyncio.gather(*(candidate(ws, pairs, samples) for ws in sockets))
+        elapsed = time.perf_counter() - started
+        samples.sort()
+        print(
+            f"answering      {len(samples) / elapsed:9.0f} answers/s "
+            f"ack p50={statistics.median(samples):7.2f}ms "
+            f"p99={samples[int(len(samples) * 0.99)]:7.2f}ms  "
+            f"worker RSS {rss_kib(worker.pid) / 1024:.0f} MiB"
+        )
+
+        started = time.perf_counter()
+        await asyncio.gather(*(finish(ws) for ws in sockets))
+        print(
+            f"finishing      {CONNECTIONS / (time.perf_counter() - started):9.0f} "
+            f"sessions/s"
+        )
+    finally:
+        if worker is not None:
+            worker.terminate()
+            worker.wait()
+        async with async_session() as db:
+            await db.execute(
+                delete(TestSession).where(TestSession.template_id == template_id)
+            )
+            await db.execute(delete(TestTemplate).where(TestTemplate.id == template_id))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""
+Building a template item by item vs importing, exporting and cloning it.
+
+Creates a 200-question template through the per-item service calls the
+POST /questions/ and POST /answers/ routes use, then exports it, imports
+the document as a new template and clones the original, timing each and
+checking that all three copies have the same content.
+
+Needs the service's database settings in the environment.
+Run from test_service/:  python -m benchmarks.template_import
+"""
+
+import asyncio
+import time
+
+from sqlalchemy import delete
+
+from src.answers.schemas import AnswerOptionCreate
+from src.answers.service import AnswerOptionService
+from src.database import async_session, engine
+from src.questions.schemas import QuestionCreate
+from src.questions.service import QuestionService
+from src.templates.models import TestTemplate
+from src.templates.schemas import TemplateClone, TemplateCreate
+from src.templates.service import TemplateService
+
+QUESTIONS = 200
+OPTIONS = 4
+
+
+async def timed(label, call):
+    started = time.perf_counter()
+    result = await call
+    print(f"{label:<10} {(time.perf_counter() - started) * 1e3:8.1f} ms")
+    return result
+
+
+async def build_item_by_item() -> TestTemplate:
+    async with async_session() as db:
+        template = await TemplateService(db).create_template(
+            TemplateCreate(title="bench-import", shuffle_options=True)
+        )
+        questions, options = QuestionService(db), AnswerOptionService(db)
+        for i in range(QUESTIONS):
+            question = await questions.create_question(
+                QuestionCreate(template_id=template.id, text=f"q{i}", weight=1 + i % 3)
+            )
+            for j in range(OPTIONS):
+                await options.create_answer_option(
+                    AnswerOptionCreate(
+                        question_id=question.id, text=f"o{i}.{j}", correct=j == 0
+                    )
+                )
+        return template
+
+
+async def main():
+    engine.echo = False
+    created = []
+    try:
+        template = await timed("per item", build_item_by_item())
+        created.append(template.id)
+        async with async_session() as db:
+            service = TemplateService(db)
+            document = await timed("export", service.export_template(template.id))
+            imported = await timed("import", service.import_template(document))
+            created.append(imported.id)
+            cloned = await timed(
+                "clone", service.clone_template(template.id, TemplateClone())
+            )
+            created.append(cloned.id)
+            for label, template_id in (("import", imported.id), ("clone", cloned.id)):
+                copy = await service.export_template(template_id)
+                same = copy.model_dump() == document.model_dump()
+                print(f"{label} matches the original: {same}")
+    finally:
+        async with async_session() as db:
+            await db.execute(delete(TestTemplate).where(TestTemplate.id.in_(created)))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+# Abilities are estimated on a fixed grid under a standard normal prior.
+GRID_STEP = 0.05
+GRID = np.arange(-4.0, 4.0 + GRID_STEP / 2, GRID_STEP)
+_LOG_PRIOR = -0.5 * GRID**2
+# Prior variance of difficulties in calibration; wide, so it only keeps
+# questions everyone or no one got right finite.
+DIFFICULTY_PRIOR_VARIANCE = 10.0
+
+
+def _rasch(ability: np.ndarray, difficulty: np.ndarray) -> np.ndarray:
+    """Probability of full credit for every ability x difficulty pair."""
+    return 1.0 / (1.0 + np.exp(difficulty[None, :] - ability[:, None]))
+
+
+def fit_rasch(
+    correct: np.ndarray,
+    answered: np.ndarray,
+    max_iterations: int = 100,
+    tolerance: float = 1e-4,
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Rasch difficulties and abilities from sessions x questions matrices of
+    full-credit and answered flags.
+
+    Joint maximum likelihood with alternating Newton steps over all sessions
+    and all questions at once; questions a session did not answer are
+    missing, not wrong. Priors on abilities and difficulties keep perfect
+    and zero scores finite.
+    """
+    right = (correct & answered).astype(np.float64)
+    mask = answered.astype(np.float64)
+    ability = np.zeros(correct.shape[0])
+    difficulty = np.zeros(correct.shape[1])
+    for iteration in range(1, max_iterations + 1):
+        p = _rasch(ability, difficulty) * mask
+        step_ability = ((right - p).sum(axis=1) - ability) / (
+            (p * (1 - p)).sum(axis=1) + 1.0
+        )
+        ability += step_ability
+        p = _rasch(ability, difficulty) * mask
+        step_difficulty = (
+            (p - right).sum(axis=0) - difficulty / DIFFICULTY_PRIOR_VARIANCE
+        ) / ((p * (1 - p)).sum(axis=0) + 1.0 / DIFFICULTY_PRIOR_VARIANCE)
+        difficulty += step_difficulty
+        change = max(
+            np.abs(step_ability).max(initial=0), np.abs(step_difficulty).max(initial=0)
+        )
+        if change < tolerance:
+            break
+    return difficulty, ability, iteration
+
+
+class ItemBank:
+    """A template's calibrated questions tabulated on the ability grid.
+
+    For every grid point it holds the log-likelihood of a right and of a
+    wrong answer to each question, the questions ranked by Fisher
+    information and the expected score on the whole template. Estimating
+    abilities is then two matrix products and picking the next question a
+    lookup in one row of the ranking.
+    """
+
+    def __init__(
+        self,
+        difficulties: Sequence[float],
+        question_max: np.ndarray,
+        target_se: float,
+        max_questions: Optional[int] = None,
+    ):
+        self.difficulties = np.asarray(difficulties, dtype=np.float64)
+        self.target_se = target_se
+        self.max_questions = max_questions
+        p = _rasch(GRID, self.difficulties)
+        self.log_right = np.log(p)
+        self.log_wrong = np.log1p(-p)
+        self.ranking = np.argsort(-p * (1 - p), axis=1, kind="stable")
+        self.true_scores = p @ question_max
+
+    def estimate(
+        self, correct: np.ndarray, answered: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Expected a posteriori ability, its standard error and the
+        expected score on the whole template of each session."""
+        right = (correct & answered).astype(np.float64)
+        wrong = (~correct & answered).astype(np.float64)
+        log_post = right @ self.log_right.T + wrong @ self.log_wrong.T + _LOG_PRIOR
+        post = np.exp(log_post - log_post.max(axis=1, keepdims=True))
+        post /= post.sum(axis=1, keepdims=True)
+        ability = post @ GRID
+        variance = np.maximum(post @ GRID**2 - ability**2, 0.0)
+        return ability, np.sqrt(variance), post @ self.true_scores
+
+    def done(self, standard_error: float, answered: int) -> bool:
+        return standard_error <= self.target_se or (
+            self.max_questions is not None and answered >= self.max_questions
+        )
+
+    def next_question(self, ability: float, answered: np.ndarray) -> Optional[int]:
+        """Most informative unanswered question at ``ability``."""
+        row = int(round((ability - GRID[0]) / GRID_STEP))
+        ranking = self.ranking[min(max(row, 0), len(GRID) - 1)]
+        remaining = ranking[~answered[ranking]]
+        return int(remaining[0]) if len(remaining) else None
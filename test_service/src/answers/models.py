@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Text, Boolean, DateTime, func, ForeignKey
+from sqlalchemy import Text, Boolean, Float, DateTime, func, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -21,8 +21,11 @@ class AnswerOption(Base):
     )
     text: Mapped[str] = mapped_column(Text, nullable=False)
     correct: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    credit: Mapped[float] = mapped_column(Float, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, server_default=func.now()
     )
+    # See Question.retired_at.
+    retired_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
 
     question = relationship("Question", back_populates="answers")
@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List
+from typing import Dict, List, Optional, Union
 from uuid import UUID
 
 from src.answers.schemas import AnswerOptionCreate, AnswerOptionRead
 from src.answers.dependencies import get_answer_service, valid_answer_id
 from src.answers.service import AnswerOptionService
+from src.config import settings
+from src.utils import parse_id_list
+from src.timing import TimedRoute
 
-router = APIRouter(prefix="/answers", tags=["answers"])
+router = APIRouter(prefix="/answers", tags=["answers"], route_class=TimedRoute)
 
 
 @router.post("/", response_model=AnswerOptionRead, status_code=status.HTTP_201_CREATED)
@@ -24,18 +27,47 @@ async def read_answer_option(
     return answer
 
 
-@router.get("/", response_model=List[AnswerOptionRead])
+@router.get(
+    "/",
+    response_model=Union[List[AnswerOptionRead], Dict[UUID, List[AnswerOptionRead]]],
+)
 async def list_answer_options(
-    question_id: UUID,
+    question_id: Optional[UUID] = None,
+    question_ids: Optional[str] = Query(
+        default=None, description="Comma-separated question ids; groups by question"
+    ),
     limit: int = Query(default=10, ge=1),
     offset: int = Query(default=0, ge=0),
     service: AnswerOptionService = Depends(get_answer_service),
 ):
+    if question_ids is not None:
+        return await service.list_answer_options_for_questions(
+            parse_id_list(question_ids, settings.BATCH_MAX_IDS)
+        )
+    if question_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Either question_id or question_ids is required",
+        )
     return await service.list_answer_options(
         question_id=question_id, limit=limit, offset=offset
     )
 
 
+@router.put("/{answer_id}", response_model=AnswerOptionRead)
+async def update_answer_option(
+    answer_id: UUID,
+    data: AnswerOptionCreate,
+    service: AnswerOptionService = Depends(get_answer_service),
+):
+    updated = await service.update_answer_option(answer_id, data)
+    if not updated:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Answer not found"
+        )
+    return updated
+
+
 @router.delete("/{answer_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_answer_option(
     answer_id: UUID,
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional
 from uuid import UUID
@@ -8,6 +8,7 @@ class AnswerOptionBase(BaseModel):
     question_id: UUID
     text: str
     correct: bool = False
+    credit: Optional[float] = Field(default=None, ge=0, le=1)
 
 
 class AnswerOptionCreate(AnswerOptionBase):
@@ -1,13 +1,15 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import any_, bindparam, func, select
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from typing import List, Optional
-from uuid import UUID
+from typing import Dict, List, Optional
+from uuid import UUID, uuid4
 from fastapi import HTTPException, status
 
 from src.answers.models import AnswerOption
 from src.answers.schemas import AnswerOptionCreate, AnswerOptionRead
 from src.questions.models import Question
+from src.templates.service import bump_content_version
 
 
 class AnswerOptionService:
@@ -17,7 +19,9 @@ class AnswerOptionService:
     async def create_answer_option(self, data: AnswerOptionCreate) -> AnswerOptionRead:
         try:
             question_result = await self.db.execute(
-                select(Question).where(Question.id == data.question_id)
+                select(Question)
+                .where(Question.id == data.question_id)
+                .where(Question.retired_at.is_(None))
             )
             question = question_result.scalar_one_or_none()
             if not question:
@@ -28,6 +32,7 @@ class AnswerOptionService:
 
             new_item = AnswerOption(**data.model_dump(exclude_unset=True))
             self.db.add(new_item)
+            await bump_content_version(self.db, question.template_id)
             await self.db.commit()
             await self.db.refresh(new_item)
             return AnswerOptionRead.model_validate(new_item)
@@ -47,7 +52,9 @@ class AnswerOptionService:
     async def get_answer_option(self, answer_id: UUID) -> Optional[AnswerOptionRead]:
         try:
             result = await self.db.execute(
-                select(AnswerOption).where(AnswerOption.id == answer_id)
+                select(AnswerOption)
+                .where(AnswerOption.id == answer_id)
+                .where(AnswerOption.retired_at.is_(None))
             )
             obj = result.scalar_one_or_none()
             if not obj:
@@ -66,6 +73,7 @@ class AnswerOptionService:
             result = await self.db.execute(
                 select(AnswerOption)
                 .where(AnswerOption.question_id == question_id)
+                .where(AnswerOption.retired_at.is_(None))
                 .limit(limit)
                 .offset(offset)
             )
@@ -77,15 +85,105 @@ class AnswerOptionService:
                 detail=f"Database error: {str(e)}",
             )
 
+    async def list_answer_options_for_questions(
+        self, question_ids: List[UUID]
+    ) -> Dict[UUID, List[AnswerOptionRead]]:
+        try:
+            result = await self.db.execute(
+                select(AnswerOption)
+                .where(
+                    AnswerOption.question_id
+                    == any_(
+                        bindparam("ids", question_ids, ARRAY(PG_UUID(as_uuid=True)))
+                    )
+                )
+                .where(AnswerOption.retired_at.is_(None))
+                .order_by(AnswerOption.question_id, AnswerOption.created_at)
+            )
+            grouped: Dict[UUID, List[AnswerOptionRead]] = {
+                question_id: [] for question_id in question_ids
+            }
+            for item in result.scalars().all():
+                grouped[item.question_id].append(AnswerOptionRead.model_validate(item))
+            return grouped
+        except SQLAlchemyError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}",
+            )
+
+    async def update_answer_option(
+        self, answer_id: UUID, data: AnswerOptionCreate
+    ) -> Optional[AnswerOptionRead]:
+        try:
+            result = await self.db.execute(
+                select(AnswerOption, Question.template_id)
+                .join(Question, Question.id == AnswerOption.question_id)
+                .where(AnswerOption.id == answer_id)
+                .where(AnswerOption.retired_at.is_(None))
+            )
+            row = result.one_or_none()
+            if not row:
+                return None
+            obj, template_id = row
+            if data.question_id != obj.question_id:
+                question_result = await self.db.execute(
+                    select(Question)
+                    .where(Question.id == data.question_id)
+                    .where(Question.retired_at.is_(None))
+                )
+                question = question_result.scalar_one_or_none()
+                if not question:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail=f"Question with id {data.question_id} not found",
+                    )
+                # The option is retired for a copy under the new question, as
+                # template versions and the answers of sessions pinned to
+                # them keep referring to it under the old one.
+                obj.retired_at = func.now()
+                if question.template_id != template_id:
+                    await bump_content_version(self.db, template_id)
+                obj = AnswerOption(id=uuid4(), **data.model_dump(exclude_unset=True))
+                self.db.add(obj)
+                template_id = question.template_id
+            else:
+                for field, value in data.model_dump(exclude_unset=True).items():
+                    setattr(obj, field, value)
+            await bump_content_version(self.db, template_id)
+            await self.db.commit()
+            await self.db.refresh(obj)
+            return AnswerOptionRead.model_validate(obj)
+        except IntegrityError as e:
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Failed to update answer option: {str(e)}",
+            )
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}",
+            )
+
     async def delete_answer_option(self, answer_id: UUID) -> bool:
         try:
             result = await self.db.execute(
-                select(AnswerOption).where(AnswerOption.id == answer_id)
+                select(AnswerOption)
+                .where(AnswerOption.id == answer_id)
+                .where(AnswerOption.retired_at.is_(None))
             )
             obj = result.scalar_one_or_none()
             if not obj:
                 return False
-            await self.db.delete(obj)
+            obj.retired_at = func.now()
+            await bump_content_version(
+                self.db,
+                select(Question.template_id)
+                .where(Question.id == obj.question_id)
+                .scalar_subquery(),
+            )
             await self.db.commit()
             return True
         except SQLAlchemyError as e:
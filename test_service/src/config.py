@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from typing import Optional
 
 
 class Settings(BaseSettings):
@@ -12,6 +13,71 @@ class Settings(BaseSettings):
 
     CANDIDATE_SERVICE_URL: str
 
+    SERVER_TIMING_ENABLED: bool = False
+
+    TRACE_BUFFER_TRACES: int = 1000
+    TRACE_EXPORT_PATH: Optional[str] = None
+
+    LOAD_SHEDDING_ENABLED: bool = True
+    CHEAP_CONCURRENCY_LIMIT: int = 100
+    EXPENSIVE_CONCURRENCY_LIMIT: int = 10
+    LOAD_SHEDDING_QUEUE_SIZE: int = 50
+    LOAD_SHEDDING_QUEUE_TIMEOUT: float = 1.0
+
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_MAX_ENTRIES: int = 100000
+
+    INTERSERVICE_MAX_RETRIES: int = 2
+    INTERSERVICE_RETRY_BASE_DELAY: float = 0.05
+    INTERSERVICE_RETRY_BUDGET_RATIO: float = 0.2
+    INTERSERVICE_RETRY_MIN_PER_SECOND: float = 5.0
+    INTERSERVICE_BREAKER_FAILURES: int = 5
+    INTERSERVICE_BREAKER_RESET_SECONDS: float = 15.0
+
+    TEMPLATE_TREE_CACHE_SIZE: int = 256
+    TEMPLATE_VERSION_CACHE_SIZE: int = 1024
+
+    BATCH_MAX_IDS: int = 200
+
+    SESSION_DEFAULT_TIME_LIMIT_MINUTES: int = 1440
+    SESSION_SWEEPER_ENABLED: bool = True
+    SESSION_SWEEP_INTERVAL_SECONDS: float = 30.0
+    SESSION_SWEEP_BATCH_SIZE: int = 200
+    SESSION_SWEEP_MAX_BATCHES: int = 10
+    SESSION_CALLBACK_CONCURRENCY: int = 10
+    SESSION_CALLBACK_LEASE_SECONDS: float = 120.0
+    SESSION_CALLBACK_RETRY_BASE_SECONDS: float = 10.0
+    SESSION_CALLBACK_RETRY_MAX_SECONDS: float = 3600.0
+    SESSION_COMPACTION_ENABLED: bool = False
+    SESSION_COMPACTION_BATCH_SIZE: int = 1000
+    SESSION_CHANNEL_MAX_BATCH: int = 100
+    SESSION_CHANNEL_DB_CONCURRENCY: int = 20
+    SESSION_CHANNEL_FLUSH_MAX_ROWS: int = 1000
+    SESSION_LIST_EXACT_COUNT_LIMIT: int = 10000
+
+    SCORE_SKETCH_PERSIST_INTERVAL_SECONDS: float = 10.0
+
+    ANSWER_KEY_CACHE_SIZE: int = 256
+
+    ADAPTIVE_TARGET_SE: float = 0.4
+    ADAPTIVE_CALIBRATION_MAX_SESSIONS: int = 20000
+
+    ANSWER_WRITE_BEHIND_ENABLED: bool = False
+    ANSWER_JOURNAL_PATH: str = "journal/answers"
+    ANSWER_FLUSH_INTERVAL_MS: int = 50
+    ANSWER_FLUSH_MAX_ROWS: int = 1000
+    ANSWER_BUFFER_MAX_PENDING: int = 50000
+    ANSWER_SESSION_CACHE_SIZE: int = 10000
+
+    RESCORE_BATCH_SIZE: int = 5000
+    RESCORE_PUSH_BATCH_SIZE: int = 500
+    RESCORE_JOB_HISTORY: int = 100
+
+    ANALYTICS_CACHE_SIZE: int = 128
+
+    RESULTS_EXPORT_BATCH_SIZE: int = 5000
+    RESULTS_EXPORT_CONCURRENCY_LIMIT: int = 2
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -1,9 +1,14 @@
+import json
+
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.pool import NullPool
-from sqlalchemy import text
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from sqlalchemy import Select, text
 
 from src.config import settings
+from src.migrations import run_migrations
 
 SQLALCHEMY_DATABASE_URL = (
     f"postgresql+asyncpg://"
@@ -38,7 +43,29 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+class _Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+async def estimate_rows(db: AsyncSession, statement: Select) -> int:
+    """The planner's estimate of the rows ``statement`` returns."""
+    plan = (await db.execute(_Explain(statement))).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
 async def init_db():
     async with engine.begin() as conn:
         await conn.execute(text("SET search_path = public"))
         await conn.run_sync(Base.metadata.create_all)
+    async with engine.connect() as conn:
+        await run_migrations(conn)
@@ -1,17 +1,28 @@
+import logging
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from src import interservice
 from src.config import settings
-from src.database import init_db
+from src.database import engine, init_db
+from src.idempotency import IdempotencyMiddleware, IdempotencyStore
+from src.load_shedding import AdaptiveLimiter, LoadSheddingMiddleware
+from src.timing import ServerTimingMiddleware, instrument_engine
+from src.tracing import TracingMiddleware, exporter
 from src.templates.router import router as templates_router
 from src.questions.router import router as questions_router
 from src.answers.router import router as answers_router
 from src.sessions.router import router as sessions_router
+from src.sessions.answer_buffer import answer_buffer
+from src.sessions.percentiles import score_sketches
+from src.sessions.sweeper import sweeper
+from src.traces.router import router as traces_router
 
 from src.templates.models import TestTemplate  # noqa: F401
 from src.questions.models import Question  # noqa: F401
 from src.answers.models import AnswerOption  # noqa: F401
-from src.sessions.models import TestSession, SessionAnswer  # noqa: F401
+from src.sessions.models import TestSession, SessionAnswer, ScoreSketch  # noqa: F401
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -19,6 +30,51 @@ app = FastAPI(
     version="1.0.0",
 )
 
+if settings.LOAD_SHEDDING_ENABLED:
+    app.add_middleware(
+        LoadSheddingMiddleware,
+        buckets={
+            "default": AdaptiveLimiter(
+                settings.CHEAP_CONCURRENCY_LIMIT,
+                max_queue=settings.LOAD_SHEDDING_QUEUE_SIZE,
+                queue_timeout=settings.LOAD_SHEDDING_QUEUE_TIMEOUT,
+            ),
+            "expensive": AdaptiveLimiter(
+                settings.EXPENSIVE_CONCURRENCY_LIMIT,
+                max_queue=settings.LOAD_SHEDDING_QUEUE_SIZE,
+                queue_timeout=settings.LOAD_SHEDDING_QUEUE_TIMEOUT,
+            ),
+            # Exports stream for as long as the result is large, so their
+            # latency says nothing about load and the limit stays fixed.
+            "export": AdaptiveLimiter(
+                settings.RESULTS_EXPORT_CONCURRENCY_LIMIT,
+                min_limit=settings.RESULTS_EXPORT_CONCURRENCY_LIMIT,
+                max_limit=settings.RESULTS_EXPORT_CONCURRENCY_LIMIT,
+                max_queue=settings.LOAD_SHEDDING_QUEUE_SIZE,
+                queue_timeout=settings.LOAD_SHEDDING_QUEUE_TIMEOUT,
+            ),
+        },
+        routes=[
+            ("POST", r"^/sessions/[^/]+/finish$", "expensive"),
+            ("POST", r"^/templates/[^/]+/rescore$", "expensive"),
+            ("POST", r"^/templates/[^/]+/calibrate$", "expensive"),
+            ("POST", r"^/templates/[^/]+/clone$", "expensive"),
+            ("POST", r"^/templates/import$", "expensive"),
+            ("GET", r"^/templates/[^/]+/analytics$", "expensive"),
+            ("GET", r"^/templates/[^/]+/results/export$", "export"),
+            ("GET", r"^/traces/", "expensive"),
+        ],
+    )
+
+app.add_middleware(
+    IdempotencyMiddleware,
+    store=IdempotencyStore(
+        ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+        max_entries=settings.IDEMPOTENCY_MAX_ENTRIES,
+    ),
+    routes=[("POST", r"^/sessions/?$"), ("POST", r"^/sessions/answers$")],
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -26,19 +82,46 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(TracingMiddleware)
+
+if settings.SERVER_TIMING_ENABLED:
+    logging.basicConfig(level=logging.INFO)
+    instrument_engine(engine)
+    app.add_middleware(ServerTimingMiddleware)
 
 
 @app.on_event("startup")
 async def on_startup():
     await init_db()
+    await score_sketches.load()
+    score_sketches.start()
+    if answer_buffer.enabled:
+        await answer_buffer.start()
+    if settings.SESSION_SWEEPER_ENABLED:
+        sweeper.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await sweeper.stop()
+    await answer_buffer.stop()
+    await score_sketches.stop()
+    await interservice.close_client()
+    exporter.close()
 
 
 app.include_router(templates_router)
 app.include_router(questions_router)
 app.include_router(answers_router)
 app.include_router(sessions_router)
+app.include_router(traces_router)
 
 
 @app.get("/health", tags=["Health"])
 async def health_check():
     return {"status": "ok", "service": settings.PROJECT_NAME}
+
+
+@app.get("/health/interservice", tags=["Health"])
+async def interservice_health():
+    return interservice.resilience_stats()
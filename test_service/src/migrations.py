@@ -0,0 +1,327 @@
+import asyncio
+import logging
+import uuid
+from typing import Awaitable, Callable, List, Optional, Tuple, Union
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.config import settings
+
+# create_all() only creates missing tables, so columns and indexes added to
+# existing tables are applied here. Every step must be idempotent because a
+# fresh database already gets them from the models. Callable steps may
+# commit to keep long data migrations out of a single transaction.
+Step = Union[str, Callable[[AsyncConnection], Awaitable[None]]]
+
+logger = logging.getLogger(__name__)
+
+# Sessions whose answers one dedupe statement covers.
+DEDUPE_BATCH_SIZE = 5000
+DEDUPE_ATTEMPTS = 3
+MIGRATION_LOCK_POLL_SECONDS = 0.5
+
+# Deletes every answer superseded by a later one to the same question among
+# the next batch of sessions, and returns the last session id of the batch.
+_DEDUPE_BATCH = """
+WITH batch AS (
+    SELECT id FROM test_sessions WHERE id > :after ORDER BY id LIMIT :limit
+), deleted AS (
+    DELETE FROM session_answers a
+    USING session_answers b
+    WHERE a.session_id IN (SELECT id FROM batch)
+      AND b.session_id = a.session_id
+      AND b.question_id = a.question_id
+      AND (b.created_at, b.id) > (a.created_at, a.id)
+)
+SELECT id FROM batch ORDER BY id DESC LIMIT 1
+"""
+
+
+async def _index_valid(conn: AsyncConnection, name: str) -> Optional[bool]:
+    """Whether the index is usable; None if it does not exist."""
+    result = await conn.execute(
+        text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+        {"name": name},
+    )
+    return result.scalar()
+
+
+async def _run_outside_transaction(conn: AsyncConnection, statement: str) -> None:
+    await conn.commit()
+    await conn.execution_options(isolation_level="AUTOCOMMIT")
+    try:
+        await conn.execute(text(statement))
+    finally:
+        await conn.commit()
+        await conn.execution_options(isolation_level=conn.default_isolation_level)
+
+
+async def _create_index_concurrently(
+    conn: AsyncConnection, name: str, statement: str
+) -> None:
+    # A failed concurrent build leaves an invalid index behind.
+    valid = await _index_valid(conn, name)
+    if valid:
+        return
+    if valid is not None:
+        await _run_outside_transaction(conn, f"DROP INDEX CONCURRENTLY {name}")
+    await _run_outside_transaction(conn, statement)
+
+
+async def _dedupe_session_answers(conn: AsyncConnection) -> None:
+    # Superseded answers are deleted a batch of sessions at a time through a
+    # temporary index, committing as it goes, and the unique index is built
+    # concurrently, so writers are never blocked. Writers predating the
+    # upsert may add duplicates meanwhile, failing the build; it is retried.
+    for attempt in range(1, DEDUPE_ATTEMPTS + 1):
+        if await _index_valid(conn, "uq_session_answers_session_question"):
+            break
+        await _create_index_concurrently(
+            conn,
+            "ix_session_answers_dedupe",
+            "CREATE INDEX CONCURRENTLY ix_session_answers_dedupe "
+            "ON session_answers (session_id, question_id)",
+        )
+        after = uuid.UUID(int=0)
+        while after is not None:
+            after = (
+                await conn.execute(
+                    text(_DEDUPE_BATCH), {"after": after, "limit": DEDUPE_BATCH_SIZE}
+                )
+            ).scalar()
+            await conn.commit()
+        try:
+            await _create_index_concurrently(
+                conn,
+                "uq_session_answers_session_question",
+                "CREATE UNIQUE INDEX CONCURRENTLY uq_session_answers_session_question "
+                "ON session_answers (session_id, question_id)",
+            )
+            break
+        except IntegrityError:
+            if attempt == DEDUPE_ATTEMPTS:
+                raise
+            logger.warning("Duplicate answers were added while deduplicating; retrying")
+    await _run_outside_transaction(
+        conn, "DROP INDEX CONCURRENTLY IF EXISTS ix_session_answers_dedupe"
+    )
+
+
+MIGRATIONS: List[Tuple[str, List[Step]]] = [
+    (
+        "0001_trace_and_content_version",
+        [
+            "ALTER TABLE test_sessions ADD COLUMN IF NOT EXISTS traceparent VARCHAR(55)",
+            "ALTER TABLE test_templates ADD COLUMN IF NOT EXISTS content_version INTEGER NOT NULL DEFAULT 1",
+        ],
+    ),
+    (
+        "0002_session_lifecycle",
+        [
+            """
+            DO $$ BEGIN
+                CREATE TYPE session_status AS ENUM ('in_progress', 'finished', 'expired');
+            EXCEPTION WHEN duplicate_object THEN NULL;
+            END $$
+            """,
+            "ALTER TABLE test_templates ADD COLUMN IF NOT EXISTS time_limit_minutes INTEGER",
+            "ALTER TABLE test_sessions ADD COLUMN IF NOT EXISTS status session_status NOT NULL DEFAULT 'in_progress'",
+            "ALTER TABLE test_sessions ADD COLUMN IF NOT EXISTS started_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+            "ALTER TABLE test_sessions ADD COLUMN IF NOT EXISTS deadline TIMESTAMPTZ",
+            "ALTER TABLE test_sessions ADD COLUMN IF NOT EXISTS finished_at TIMESTAMPTZ",
+            """
+            UPDATE test_sessions
+            SET status = 'finished', started_at = created_at, finished_at = created_at
+            WHERE score IS NOT NULL AND status = 'in_progress'
+            """,
+            f"""
+            UPDATE test_sessions s
+            SET started_at = s.created_at,
+                deadline = s.created_at + make_interval(
+                    mins => COALESCE(t.time_limit_minutes, {int(settings.SESSION_DEFAULT_TIME_LIMIT_MINUTES)})
+                )
+            FROM test_templates t
+            WHERE t.id = s.template_id AND s.status = 'in_progress' AND s.deadline IS NULL
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS ix_test_sessions_in_progress_deadline
+            ON test_sessions (deadline) WHERE status = 'in_progress'
+            """,
+        ],
+    ),
+    (
+        "0003_session_template_finished_index",
+        [
+            """
+            CREATE INDEX IF NOT EXISTS ix_test_sessions_template_finished
+            ON test_sessions (template_id, finished_at) WHERE status <> 'in_progress'
+            """,
+        ],
+    ),
+    (
+        "0004_weighted_scoring",
+        [
+            "ALTER TABLE questions ADD COLUMN IF NOT EXISTS weight DOUBLE PRECISION NOT NULL DEFAULT 1",
+            "ALTER TABLE questions ADD COLUMN IF NOT EXISTS penalty DOUBLE PRECISION NOT NULL DEFAULT 0",
+            "ALTER TABLE answer_options ADD COLUMN IF NOT EXISTS credit DOUBLE PRECISION",
+            "ALTER TABLE test_sessions ALTER COLUMN score TYPE DOUBLE PRECISION",
+            "ALTER TABLE test_sessions ADD COLUMN IF NOT EXISTS max_score DOUBLE PRECISION",
+            "ALTER TABLE test_sessions ADD COLUMN IF NOT EXISTS score_percent DOUBLE PRECISION",
+            """
+            UPDATE test_sessions s
+            SET max_score = m.max_score,
+                score_percent = LEAST(100, GREATEST(0, 100 * s.score / NULLIF(m.max_score, 0)))
+            FROM (
+                SELECT q.template_id, count(DISTINCT q.id) AS max_score
+                FROM questions q JOIN answer_options a ON a.question_id = q.id AND a.correct
+                GROUP BY q.template_id
+            ) m
+            WHERE m.template_id = s.template_id AND s.score IS NOT NULL AND s.max_score IS NULL
+            """,
+        ],
+    ),
+    ("0005_unique_session_answers", [_dedupe_session_answers]),
+    (
+        "0006_packed_session_answers",
+        [
+            "ALTER TABLE test_sessions ADD COLUMN IF NOT EXISTS answer_question_ids UUID[]",
+            "ALTER TABLE test_sessions ADD COLUMN IF NOT EXISTS answer_option_ids UUID[]",
+            "ALTER TABLE test_sessions ADD COLUMN IF NOT EXISTS answer_times TIMESTAMPTZ[]",
+            """
+            CREATE INDEX IF NOT EXISTS ix_test_sessions_uncompacted
+            ON test_sessions (finished_at)
+            WHERE status <> 'in_progress' AND answer_option_ids IS NULL
+            """,
+        ],
+    ),
+    (
+        "0007_session_arrangement",
+        [
+            "ALTER TABLE test_templates ADD COLUMN IF NOT EXISTS shuffle_questions BOOLEAN NOT NULL DEFAULT false",
+            "ALTER TABLE test_templates ADD COLUMN IF NOT EXISTS shuffle_options BOOLEAN NOT NULL DEFAULT false",
+            "ALTER TABLE test_templates ADD COLUMN IF NOT EXISTS questions_per_session INTEGER",
+        ],
+    ),
+    (
+        "0008_adaptive_testing",
+        [
+            "ALTER TABLE questions ADD COLUMN IF NOT EXISTS difficulty DOUBLE PRECISION",
+            "ALTER TABLE test_templates ADD COLUMN IF NOT EXISTS adaptive BOOLEAN NOT NULL DEFAULT false",
+            "ALTER TABLE test_templates ADD COLUMN IF NOT EXISTS adaptive_target_se DOUBLE PRECISION",
+        ],
+    ),
+    (
+        "0009_template_versions",
+        [
+            "ALTER TABLE questions ADD COLUMN IF NOT EXISTS retired_at TIMESTAMPTZ",
+            "ALTER TABLE answer_options ADD COLUMN IF NOT EXISTS retired_at TIMESTAMPTZ",
+            """
+            ALTER TABLE test_sessions ADD COLUMN IF NOT EXISTS template_version_id UUID
+            REFERENCES template_versions (id) ON DELETE CASCADE
+            """,
+        ],
+    ),
+    (
+        "0010_session_listing_indexes",
+        [
+            """
+            CREATE INDEX IF NOT EXISTS ix_test_sessions_created
+            ON test_sessions (created_at, id)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS ix_test_sessions_application_created
+            ON test_sessions (application_id, created_at, id)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS ix_test_sessions_email_created
+            ON test_sessions (candidate_email, created_at, id)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS ix_test_sessions_template_created
+            ON test_sessions (template_id, created_at, id)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS ix_test_sessions_template_in_progress_created
+            ON test_sessions (template_id, created_at, id) WHERE status = 'in_progress'
+            """,
+        ],
+    ),
+    (
+        "0011_pending_result_callbacks",
+        [
+            "ALTER TABLE test_sessions ADD COLUMN IF NOT EXISTS callback_due_at TIMESTAMPTZ",
+            "ALTER TABLE test_sessions ADD COLUMN IF NOT EXISTS callback_attempts INTEGER NOT NULL DEFAULT 0",
+            """
+            CREATE INDEX IF NOT EXISTS ix_test_sessions_callback_due
+            ON test_sessions (callback_due_at) WHERE callback_due_at IS NOT NULL
+            """,
+        ],
+    ),
+    (
+        "0012_adaptive_served_questions",
+        [
+            "ALTER TABLE test_sessions ADD COLUMN IF NOT EXISTS served_question_ids UUID[]",
+        ],
+    ),
+    (
+        "0013_template_version_settings",
+        [
+            "ALTER TABLE template_versions ADD COLUMN IF NOT EXISTS questions_per_session INTEGER",
+            "ALTER TABLE template_versions ADD COLUMN IF NOT EXISTS adaptive BOOLEAN NOT NULL DEFAULT false",
+            """
+            UPDATE template_versions
+            SET questions_per_session = (content::jsonb ->> 'questions_per_session')::integer,
+                adaptive = coalesce((content::jsonb ->> 'adaptive')::boolean, false)
+            """,
+        ],
+    ),
+]
+
+
+async def run_migrations(conn: AsyncConnection) -> None:
+    """Apply pending migrations, committing after each one."""
+    await conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "name VARCHAR(100) PRIMARY KEY, "
+            "applied_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+        )
+    )
+    # Serialize concurrent workers starting up against the same database. The
+    # lock is session level so that it survives commits made by the steps.
+    # Waiting workers poll outside a transaction, as concurrent index builds
+    # wait for every open transaction to end.
+    await conn.commit()
+    while not (
+        await conn.execute(
+            text("SELECT pg_try_advisory_lock(hashtext('schema_migrations'))")
+        )
+    ).scalar():
+        await conn.commit()
+        await asyncio.sleep(MIGRATION_LOCK_POLL_SECONDS)
+    await conn.commit()
+    try:
+        applied = set(
+            (await conn.execute(text("SELECT name FROM schema_migrations"))).scalars()
+        )
+        for name, steps in MIGRATIONS:
+            if name in applied:
+                continue
+            for step in steps:
+                if isinstance(step, str):
+                    await conn.execute(text(step))
+                else:
+                    await step(conn)
+            await conn.execute(
+                text("INSERT INTO schema_migrations (name) VALUES (:name)"),
+                {"name": name},
+            )
+            await conn.commit()
+    finally:
+        await conn.rollback()
+        await conn.execute(
+            text("SELECT pg_advisory_unlock(hashtext('schema_migrations'))")
+        )
+        await conn.commit()
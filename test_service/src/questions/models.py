@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Text, DateTime, func, ForeignKey
+from sqlalchemy import Float, Text, DateTime, func, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -20,11 +20,25 @@ class Question(Base):
         nullable=False,
     )
     text: Mapped[str] = mapped_column(Text, nullable=False)
+    weight: Mapped[float] = mapped_column(
+        Float, nullable=False, default=1.0, server_default="1"
+    )
+    penalty: Mapped[float] = mapped_column(
+        Float, nullable=False, default=0.0, server_default="0"
+    )
+    # Rasch difficulty calibrated from finished sessions (src.adaptive).
+    difficulty: Mapped[float] = mapped_column(Float, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, server_default=func.now()
     )
+    # Deleted questions are only retired: template versions and the answers
+    # of sessions pinned to them still refer to them.
+    retired_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
 
     template = relationship("TestTemplate", back_populates="questions")
     answers = relationship(
-        "AnswerOption", back_populates="question", cascade="all, delete-orphan"
+        "AnswerOption",
+        back_populates="question",
+        cascade="all, delete-orphan",
+        order_by="AnswerOption.created_at",
     )
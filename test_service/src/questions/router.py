@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List
+from typing import Dict, List
 from uuid import UUID
 
 from src.questions.schemas import QuestionCreate, QuestionRead
 from src.questions.dependencies import get_question_service, valid_question_id
 from src.questions.service import QuestionService
+from src.config import settings
+from src.utils import parse_id_list
+from src.timing import TimedRoute
 
-router = APIRouter(prefix="/questions", tags=["questions"])
+router = APIRouter(prefix="/questions", tags=["questions"], route_class=TimedRoute)
 
 
 @router.post("/", response_model=QuestionRead, status_code=status.HTTP_201_CREATED)
@@ -17,6 +20,16 @@ async def create_question(
     return await service.create_question(data)
 
 
+@router.get("/batch", response_model=Dict[UUID, List[QuestionRead]])
+async def read_questions_batch(
+    ids: str = Query(description="Comma-separated question ids"),
+    service: QuestionService = Depends(get_question_service),
+):
+    return await service.get_questions_by_ids(
+        parse_id_list(ids, settings.BATCH_MAX_IDS)
+    )
+
+
 @router.get("/{question_id}", response_model=QuestionRead)
 async def read_question(
     question: dict = Depends(valid_question_id),
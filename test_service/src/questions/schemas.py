@@ -1,4 +1,5 @@
 from pydantic import BaseModel, Field
+from typing import Optional
 from uuid import UUID
 from datetime import datetime
 
@@ -6,6 +7,8 @@ from datetime import datetime
 class QuestionBase(BaseModel):
     template_id: UUID
     text: str = Field(min_length=1)
+    weight: float = Field(default=1.0, gt=0)
+    penalty: float = Field(default=0.0, ge=0, le=1)
 
 
 class QuestionCreate(QuestionBase):
@@ -14,6 +17,7 @@ class QuestionCreate(QuestionBase):
 
 class QuestionRead(QuestionBase):
     id: UUID
+    difficulty: Optional[float] = None
     created_at: datetime
 
     model_config = {"from_attributes": True}
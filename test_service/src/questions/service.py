@@ -1,13 +1,16 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import any_, bindparam, func, select
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from typing import List, Optional
-from uuid import UUID
+from typing import Dict, List, Optional
+from uuid import UUID, uuid4
 from fastapi import HTTPException, status
 
+from src.answers.models import AnswerOption
 from src.questions.models import Question
 from src.questions.schemas import QuestionCreate, QuestionRead
 from src.templates.models import TestTemplate
+from src.templates.service import bump_content_version
 
 
 class QuestionService:
@@ -28,6 +31,7 @@ class QuestionService:
 
             new_item = Question(**data.model_dump(exclude_unset=True))
             self.db.add(new_item)
+            await bump_content_version(self.db, data.template_id)
             await self.db.commit()
             await self.db.refresh(new_item)
             return QuestionRead.model_validate(new_item)
@@ -47,7 +51,9 @@ class QuestionService:
     async def get_question(self, question_id: UUID) -> Optional[QuestionRead]:
         try:
             result = await self.db.execute(
-                select(Question).where(Question.id == question_id)
+                select(Question)
+                .where(Question.id == question_id)
+                .where(Question.retired_at.is_(None))
             )
             obj = result.scalar_one_or_none()
             if not obj:
@@ -59,6 +65,33 @@ class QuestionService:
                 detail=f"Database error: {str(e)}",
             )
 
+    async def get_questions_by_ids(
+        self, question_ids: List[UUID]
+    ) -> Dict[UUID, List[QuestionRead]]:
+        try:
+            result = await self.db.execute(
+                select(Question)
+                .where(
+                    Question.id
+                    == any_(
+                        bindparam("ids", question_ids, ARRAY(PG_UUID(as_uuid=True)))
+                    )
+                )
+                .where(Question.retired_at.is_(None))
+                .order_by(Question.template_id, Question.created_at)
+            )
+            grouped: Dict[UUID, List[QuestionRead]] = {}
+            for item in result.scalars().all():
+                grouped.setdefault(item.template_id, []).append(
+                    QuestionRead.model_validate(item)
+                )
+            return grouped
+        except SQLAlchemyError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}",
+            )
+
     async def list_questions(
         self, template_id: UUID, limit: int = 10, offset: int = 0
     ) -> List[QuestionRead]:
@@ -66,6 +99,7 @@ class QuestionService:
             result = await self.db.execute(
                 select(Question)
                 .where(Question.template_id == template_id)
+                .where(Question.retired_at.is_(None))
                 .limit(limit)
                 .offset(offset)
             )
@@ -82,13 +116,19 @@ class QuestionService:
     ) -> Optional[QuestionRead]:
         try:
             result = await self.db.execute(
-                select(Question).where(Question.id == question_id)
+                select(Question)
+                .where(Question.id == question_id)
+                .where(Question.retired_at.is_(None))
             )
             obj = result.scalar_one_or_none()
             if not obj:
                 return None
-            for field, value in data.model_dump(exclude_unset=True).items():
-                setattr(obj, field, value)
+            if data.template_id != obj.template_id:
+                obj = await self._move_question(obj, data)
+            else:
+                for field, value in data.model_dump(exclude_unset=True).items():
+                    setattr(obj, field, value)
+            await bump_content_version(self.db, obj.template_id)
             await self.db.commit()
             await self.db.refresh(obj)
             return QuestionRead.model_validate(obj)
@@ -105,15 +145,68 @@ class QuestionService:
                 detail=f"Database error: {str(e)}",
             )
 
+    async def _move_question(self, obj: Question, data: QuestionCreate) -> Question:
+        """Retire a question moved to another template for a copy there.
+
+        Versions of the old template and the answers of sessions pinned to
+        them keep referring to the old rows, so those are never re-parented.
+        """
+        template = (
+            await self.db.execute(
+                select(TestTemplate.id).where(TestTemplate.id == data.template_id)
+            )
+        ).scalar_one_or_none()
+        if template is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Template with id {data.template_id} not found",
+            )
+        options = (
+            (
+                await self.db.execute(
+                    select(AnswerOption)
+                    .where(AnswerOption.question_id == obj.id)
+                    .where(AnswerOption.retired_at.is_(None))
+                )
+            )
+            .scalars()
+            .all()
+        )
+        values = {
+            "text": obj.text,
+            "weight": obj.weight,
+            "penalty": obj.penalty,
+            "difficulty": obj.difficulty,
+        }
+        values.update(data.model_dump(exclude_unset=True))
+        moved = Question(id=uuid4(), **values)
+        self.db.add(moved)
+        self.db.add_all(
+            AnswerOption(
+                question_id=moved.id,
+                text=option.text,
+                correct=option.correct,
+                credit=option.credit,
+                created_at=option.created_at,
+            )
+            for option in options
+        )
+        obj.retired_at = func.now()
+        await bump_content_version(self.db, obj.template_id)
+        return moved
+
     async def delete_question(self, question_id: UUID) -> bool:
         try:
             result = await self.db.execute(
-                select(Question).where(Question.id == question_id)
+                select(Question)
+                .where(Question.id == question_id)
+                .where(Question.retired_at.is_(None))
             )
             obj = result.scalar_one_or_none()
             if not obj:
                 return False
-            await self.db.delete(obj)
+            obj.retired_at = func.now()
+            await bump_content_version(self.db, obj.template_id)
             await self.db.commit()
             return True
         except SQLAlchemyError as e:
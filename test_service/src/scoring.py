@@ -0,0 +1,263 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.adaptive import ItemBank
+from src.cache import LRUCache
+from src.config import settings
+from src.sessions.models import SessionAnswer, TestSession
+from src.sessions.shuffle import given_questions
+from src.sessions.storage import flatten_answers
+from src.templates.schemas import TemplateVersionContent
+from src.templates.versions import get_version, version_content
+
+
+class AnswerKey:
+    """A template's scoring rules compiled into dense arrays.
+
+    Picking an option earns ``weight * credit`` of its question, where
+    ``credit`` defaults to 1 for correct and 0 for other options; options
+    without credit cost ``weight * penalty``. Only the last answer given to
+    a question counts. All scoring methods take flat arrays of session and
+    option positions covering any number of sessions, in answer order.
+
+    A template drawing ``sample_size`` questions per session gives each
+    session its own subset (see ``src.sessions.shuffle``); ``given`` masks
+    from ``given()`` restrict scoring to it. Sessions of an adaptive template
+    answer different questions by design, so with an ``item_bank`` they
+    score the expected score on the whole template at their estimated
+    ability.
+    """
+
+    def __init__(
+        self,
+        question_ids: Sequence[UUID],
+        weights: Sequence[float],
+        penalties: Sequence[float],
+        option_ids: Sequence[UUID],
+        option_questions: Sequence[int],
+        option_credits: Sequence[float],
+        sample_size: Optional[int] = None,
+    ):
+        self.question_ids = list(question_ids)
+        self.question_index: Dict[UUID, int] = {
+            question_id: i for i, question_id in enumerate(self.question_ids)
+        }
+        self.sample_size = sample_size
+        self.option_ids = list(option_ids)
+        self.index: Dict[UUID, int] = {
+            option_id: i for i, option_id in enumerate(self.option_ids)
+        }
+        self.n_questions = len(self.question_ids)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.option_question = np.asarray(option_questions, dtype=np.int64)
+        credit = np.asarray(option_credits, dtype=np.float64)
+        weight = self.weights[self.option_question]
+        penalty = np.asarray(penalties, dtype=np.float64)[self.option_question]
+        self.points = np.where(credit > 0, weight * credit, 0.0 - weight * penalty)
+        self.question_max = np.zeros(self.n_questions)
+        np.maximum.at(self.question_max, self.option_question, self.points)
+        self.max_score = float(self.question_max.sum())
+        self.item_bank: Optional[ItemBank] = None
+        self.version_id: Optional[UUID] = None
+
+    def option_positions(self, answer_ids: Sequence[UUID]) -> np.ndarray:
+        index = self.index
+        return np.fromiter(
+            (index.get(answer_id, -1) for answer_id in answer_ids),
+            dtype=np.int64,
+            count=len(answer_ids),
+        )
+
+    def given(self, session_ids: Sequence[UUID]) -> Optional[np.ndarray]:
+        """Sessions x questions mask of the questions each session is given,
+        or None when every session is given all of them."""
+        if self.sample_size is None or self.sample_size >= self.n_questions:
+            return None
+        return given_questions(session_ids, self.question_ids, self.sample_size)
+
+    def gives(self, session_id: UUID, question_id: UUID) -> bool:
+        given = self.given([session_id])
+        return given is None or bool(given[0, self.question_index[question_id]])
+
+    def max_scores(self, given: Optional[np.ndarray], n_sessions: int) -> np.ndarray:
+        if given is None:
+            return np.full(n_sessions, self.max_score)
+        return given @ self.question_max
+
+    def last_answers(
+        self,
+        session_pos: np.ndarray,
+        option_pos: np.ndarray,
+        given: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Drop unknown options, answers to questions the session was not
+        given and answers superseded by a later one."""
+        known = option_pos >= 0
+        session_pos, option_pos = session_pos[known], option_pos[known]
+        if given is not None:
+            kept = given[session_pos, self.option_question[option_pos]]
+            session_pos, option_pos = session_pos[kept], option_pos[kept]
+        cell = session_pos * self.n_questions + self.option_question[option_pos]
+        _, last = np.unique(cell[::-1], return_index=True)
+        keep = np.sort(len(cell) - 1 - last)
+        return session_pos[keep], option_pos[keep]
+
+    def score(
+        self,
+        session_pos: np.ndarray,
+        option_pos: np.ndarray,
+        n_sessions: int,
+        given: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        if self.item_bank is not None:
+            return self.item_bank.estimate(
+                *self.responses(session_pos, option_pos, n_sessions)
+            )[2]
+        session_pos, option_pos = self.last_answers(session_pos, option_pos, given)
+        return np.bincount(
+            session_pos, weights=self.points[option_pos], minlength=n_sessions
+        )
+
+    def item_scores(
+        self,
+        session_pos: np.ndarray,
+        option_pos: np.ndarray,
+        n_sessions: int,
+        given: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Sessions x questions matrices of points earned and answered flags."""
+        session_pos, option_pos = self.last_answers(session_pos, option_pos, given)
+        question_pos = self.option_question[option_pos]
+        points = np.zeros((n_sessions, self.n_questions))
+        points[session_pos, question_pos] = self.points[option_pos]
+        answered = np.zeros((n_sessions, self.n_questions), dtype=bool)
+        answered[session_pos, question_pos] = True
+        return points, answered
+
+    def responses(
+        self, session_pos: np.ndarray, option_pos: np.ndarray, n_sessions: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Sessions x questions matrices of full-credit and answered flags."""
+        points, answered = self.item_scores(session_pos, option_pos, n_sessions)
+        correct = answered & (points >= self.question_max) & (self.question_max > 0)
+        return correct, answered
+
+    def percent(
+        self, scores: np.ndarray, max_scores: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        max_scores = np.broadcast_to(
+            self.max_score if max_scores is None else max_scores, scores.shape
+        )
+        percents = np.zeros_like(scores)
+        positive = max_scores > 0
+        percents[positive] = scores[positive] / max_scores[positive] * 100
+        return np.round(np.clip(percents, 0, 100), 2)
+
+
+key_cache: LRUCache[AnswerKey] = LRUCache(settings.ANSWER_KEY_CACHE_SIZE)
+
+
+def _compile_answer_key(content: TemplateVersionContent) -> AnswerKey:
+    questions = content.questions
+    options = [(o, i) for i, q in enumerate(questions) for o in q.answers]
+    key = AnswerKey(
+        [q.id for q in questions],
+        [q.weight for q in questions],
+        [q.penalty for q in questions],
+        [o.id for o, _ in options],
+        [i for _, i in options],
+        [
+            o.credit if o.credit is not None else (1.0 if o.correct else 0.0)
+            for o, _ in options
+        ],
+        None if content.adaptive else content.questions_per_session,
+    )
+    if content.adaptive:
+        # Questions not calibrated yet count as of average difficulty.
+        key.item_bank = ItemBank(
+            [q.difficulty if q.difficulty is not None else 0.0 for q in questions],
+            key.question_max,
+            content.adaptive_target_se or settings.ADAPTIVE_TARGET_SE,
+            content.questions_per_session,
+        )
+    return key
+
+
+async def load_answer_key(
+    db: AsyncSession, template_id: UUID, version_id: Optional[UUID] = None
+) -> Optional[AnswerKey]:
+    """Answer key of a template version, by default the current one."""
+    version = await get_version(db, template_id, version_id)
+    if version is None:
+        return None
+    key = key_cache.get(version.content_hash)
+    if key is None:
+        key = _compile_answer_key(
+            TemplateVersionContent.model_validate_json(
+                await version_content(db, version)
+            )
+        )
+        key.version_id = version.id
+        key_cache.set(version.content_hash, key)
+    return key
+
+
+async def score_sessions(
+    db: AsyncSession,
+    session_ids: List[UUID],
+    template_ids: List[UUID],
+    version_ids: Optional[List[Optional[UUID]]] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Score, max score and percentage of each session from its stored
+    answers, by the template version each session is pinned to."""
+    answer_sessions, answer_ids = flatten_answers(
+        await db.execute(
+            select(
+                TestSession.id,
+                TestSession.answer_option_ids,
+                SessionAnswer.answer_id,
+            )
+            .outerjoin(SessionAnswer, SessionAnswer.session_id == TestSession.id)
+            .where(
+                TestSession.id
+                == any_(bindparam("ids", session_ids, ARRAY(PG_UUID(as_uuid=True))))
+            )
+            .order_by(SessionAnswer.created_at, SessionAnswer.id)
+        )
+    )
+    position = {session_id: i for i, session_id in enumerate(session_ids)}
+    session_pos = np.fromiter(
+        (position[session_id] for session_id in answer_sessions),
+        np.int64,
+        len(answer_sessions),
+    )
+    answer_ids = np.array(answer_ids, dtype=object)
+
+    n_sessions = len(session_ids)
+    scores = np.zeros(n_sessions)
+    max_scores = np.zeros(n_sessions)
+    percents = np.zeros(n_sessions)
+    if version_ids is None:
+        version_ids = [None] * n_sessions
+    versions = list(zip(template_ids, version_ids))
+    for version in set(versions):
+        key = await load_answer_key(db, *version)
+        in_template = np.fromiter((v == version for v in versions), bool, n_sessions)
+        selected = in_template[session_pos]
+        given = key.given(session_ids)
+        template_scores = key.score(
+            session_pos[selected],
+            key.option_positions(answer_ids[selected]),
+            n_sessions,
+            given,
+        )
+        template_max = key.max_scores(given, n_sessions)
+        scores[in_template] = template_scores[in_template]
+        max_scores[in_template] = template_max[in_template]
+        percents[in_template] = key.percent(template_scores, template_max)[in_template]
+    return scores, max_scores, percents
@@ -0,0 +1,321 @@
+import asyncio
+import fcntl
+import glob
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.cache import LRUCache
+from src.config import settings
+from src.database import async_session, engine
+from src.scoring import AnswerKey
+from src.sessions.storage import upsert_answers
+
+logger = logging.getLogger(__name__)
+
+# One buffered answer: (id, session_id, question_id, answer_id, created_at).
+PendingAnswer = Tuple[uuid.UUID, uuid.UUID, uuid.UUID, uuid.UUID, datetime]
+
+
+class OpenSession:
+    """What the accept path needs to validate answers without the database."""
+
+    def __init__(
+        self,
+        template_id: uuid.UUID,
+        deadline: Optional[datetime],
+        key: AnswerKey,
+        served: Optional[Iterable[uuid.UUID]] = None,
+    ):
+        self.template_id = template_id
+        self.deadline = deadline
+        self.key = key
+        # Questions served to an adaptive session when it was loaded.
+        self.served: Set[uuid.UUID] = set(served or ())
+        self.closed = False
+
+
+class AnswerWriteBuffer:
+    """Write-behind buffer for session answers.
+
+    Accepted answers are appended to a local journal and kept in memory,
+    coalesced per session and question since only the last answer counts.
+    A background flusher upserts them in multi-row statements every
+    ``flush_interval`` seconds, or sooner once ``max_rows`` are pending.
+    The journal is split into segments that are sealed at the start of a
+    flush and deleted once its batch commits; segments left over from a
+    crash are replayed on start. Journal writes survive a process crash but
+    are not fsynced, so an OS crash can lose the answers of the last flush
+    interval.
+
+    Finishing or expiring a session drains the answers buffered for it,
+    which only works if they are all in this process. Only one process per
+    database may therefore buffer; it holds an advisory lock for its
+    lifetime and any other fails to start. Each process still journals under
+    its own name, holding a lock on it, so that recovery only takes over the
+    segments of processes that are gone.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        journal_path: str,
+        flush_interval: float,
+        max_rows: int,
+        max_pending: int,
+        session_cache_size: int,
+    ):
+        self.enabled = enabled
+        self.journal_path = journal_path
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self.max_pending = max_pending
+        self.sessions: LRUCache[OpenSession] = LRUCache(session_cache_size)
+        self.flushed = 0
+        self.dropped = 0
+        self._pending: Dict[uuid.UUID, Dict[uuid.UUID, PendingAnswer]] = {}
+        self._rows = 0
+        self._inflight: frozenset = frozenset()
+        self._owner = uuid.uuid4().hex
+        self._owner_fd: Optional[int] = None
+        self._writer: Optional[AsyncConnection] = None
+        self._fd: Optional[int] = None
+        self._segment = 0
+        self._sealed: List[str] = []
+        self._lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return self._rows
+
+    async def start(self) -> None:
+        if self._task is None:
+            await self._claim_writer()
+            self._recover()
+            await self.flush()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        self._close_segment()
+        if self._owner_fd is not None:
+            # Segments still unflushed are recovered through the lock file.
+            if not self._sealed:
+                os.remove(self._lock_path(self._owner))
+            os.close(self._owner_fd)
+            self._owner_fd = None
+        if self._writer is not None:
+            await self._writer.close()
+            self._writer = None
+
+    def add(self, answer: PendingAnswer) -> None:
+        self._write_journal(answer)
+        self._put(answer)
+        if self._rows >= self.max_rows:
+            self._wake.set()
+
+    def close_session(self, session_id: uuid.UUID) -> None:
+        """Reject further answers to a session that is being finished."""
+        open_session = self.sessions.get(session_id)
+        if open_session is not None:
+            open_session.closed = True
+
+    async def drain_session(self, session_id: uuid.UUID) -> None:
+        """Wait until the session's accepted answers are in the database."""
+        while session_id in self._pending or session_id in self._inflight:
+            await self.flush()
+
+    async def backpressure(self) -> None:
+        if self._rows >= self.max_pending:
+            await self.flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._rows:
+                return
+            self._close_segment()
+            sealed = list(self._sealed)
+            batch = [a for answers in self._pending.values() for a in answers.values()]
+            self._inflight = frozenset(self._pending)
+            self._pending = {}
+            self._rows = 0
+            try:
+                inserted = await self._insert(batch)
+            except Exception:
+                # Answers accepted while the batch was in flight are newer.
+                for answer in batch:
+                    self._pending.setdefault(answer[1], {}).setdefault(
+                        answer[2], answer
+                    )
+                self._rows = sum(len(answers) for answers in self._pending.values())
+                raise
+            finally:
+                self._inflight = frozenset()
+            for path in sealed:
+                os.remove(path)
+                self._sealed.remove(path)
+            self.flushed += inserted
+            if inserted < len(batch):
+                self.dropped += len(batch) - inserted
+                logger.warning(
+                    "Dropped %d buffered answers of closed sessions",
+                    len(batch) - inserted,
+                )
+
+    async def _insert(self, batch: List[PendingAnswer]) -> int:
+        inserted = 0
+        async with async_session() as db:
+            for start in range(0, len(batch), self.max_rows):
+                rows = await upsert_answers(db, batch[start : start + self.max_rows])
+                inserted += len(rows)
+            await db.commit()
+        return inserted
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Flushing buffered answers failed")
+
+    def _put(self, answer: PendingAnswer) -> None:
+        answers = self._pending.setdefault(answer[1], {})
+        if answer[2] not in answers:
+            self._rows += 1
+        answers[answer[2]] = answer
+
+    async def _claim_writer(self) -> None:
+        conn = await engine.connect()
+        try:
+            acquired = (
+                await conn.execute(
+                    text("SELECT pg_try_advisory_lock(hashtext('answer_write_behind'))")
+                )
+            ).scalar_one()
+            await conn.commit()
+        except BaseException:
+            await conn.close()
+            raise
+        if not acquired:
+            await conn.close()
+            raise RuntimeError(
+                "Answer write-behind is already enabled in another process using "
+                "this database. Buffered answers live in process memory, so run a "
+                "single worker or set ANSWER_WRITE_BEHIND_ENABLED=false."
+            )
+        self._writer = conn
+
+    def _segment_path(self) -> str:
+        return f"{self.journal_path}.{self._owner}.{self._segment:08d}"
+
+    def _lock_path(self, owner: str) -> str:
+        return f"{self.journal_path}.{owner}.lock"
+
+    def _write_journal(self, answer: PendingAnswer) -> None:
+        if self._fd is None:
+            path = self._segment_path()
+            self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+            self._sealed.append(path)
+        answer_id, session_id, question_id, option_id, created_at = answer
+        line = f"{answer_id} {session_id} {question_id} {option_id} {created_at.isoformat()}\n"
+        os.write(self._fd, line.encode())
+
+    def _close_segment(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            self._segment += 1
+
+    def _recover(self) -> None:
+        directory = os.path.dirname(self.journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._owner_fd = os.open(
+            self._lock_path(self._owner), os.O_WRONLY | os.O_CREAT, 0o600
+        )
+        fcntl.flock(self._owner_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+        prefix = glob.escape(self.journal_path)
+        # Segments from before journals were named per process.
+        for path in sorted(glob.glob(f"{prefix}.{'[0-9]' * 8}")):
+            self._adopt(path)
+        for lock_path in glob.glob(f"{prefix}.*.lock"):
+            owner = lock_path[len(self.journal_path) + 1 : -len(".lock")]
+            if owner == self._owner:
+                continue
+            try:
+                fd = os.open(lock_path, os.O_WRONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                # Held for as long as its process lives.
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            try:
+                for path in sorted(glob.glob(f"{prefix}.{glob.escape(owner)}.*")):
+                    if path != lock_path:
+                        self._adopt(path)
+                try:
+                    os.remove(lock_path)
+                except FileNotFoundError:
+                    pass
+            finally:
+                os.close(fd)
+        if self._rows:
+            logger.info("Recovered %d buffered answers from the journal", self._rows)
+
+    def _adopt(self, path: str) -> None:
+        """Take over a dead process's segment and replay it."""
+        target = self._segment_path()
+        try:
+            # Atomic, so a segment is only ever adopted by one process.
+            os.rename(path, target)
+        except FileNotFoundError:
+            return
+        self._segment += 1
+        self._sealed.append(target)
+        with open(target) as journal:
+            for line in journal:
+                # A torn last line means the process died mid-write, before
+                # the answer was acknowledged.
+                try:
+                    *ids, created_at = line.split()
+                    answer = (
+                        *(uuid.UUID(part) for part in ids),
+                        datetime.fromisoformat(created_at),
+                    )
+                except ValueError:
+                    continue
+                if len(answer) == 5:
+                    self._put(answer)
+
+
+answer_buffer = AnswerWriteBuffer(
+    enabled=settings.ANSWER_WRITE_BEHIND_ENABLED,
+    journal_path=settings.ANSWER_JOURNAL_PATH,
+    flush_interval=settings.ANSWER_FLUSH_INTERVAL_MS / 1000,
+    max_rows=settings.ANSWER_FLUSH_MAX_ROWS,
+    max_pending=settings.ANSWER_BUFFER_MAX_PENDING,
+    session_cache_size=settings.ANSWER_SESSION_CACHE_SIZE,
+)
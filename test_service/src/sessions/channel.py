@@ -0,0 +1,382 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional, Set, Tuple, Union
+from uuid import UUID, uuid4
+
+from fastapi import HTTPException, WebSocket, WebSocketDisconnect
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import undefer
+from starlette.websockets import WebSocketState
+
+from src.config import settings
+from src.database import async_session
+from src.scoring import AnswerKey, load_answer_key
+from src.sessions.models import TestSession
+from src.sessions.schemas import ChannelAnswer, ChannelMessage, SessionRead
+from src.sessions.service import SessionService
+from src.sessions.storage import upsert_answers
+from src.templates.service import TemplateService
+
+logger = logging.getLogger(__name__)
+
+message_adapter: TypeAdapter = TypeAdapter(ChannelMessage)
+
+# WebSockets bypass load shedding; this bounds the connections they hold.
+db_slots = asyncio.Semaphore(settings.SESSION_CHANNEL_DB_CONCURRENCY)
+
+
+class ChannelRefused(Exception):
+    def __init__(self, code: int, reason: str):
+        self.code = code
+        self.reason = reason
+
+
+class ChannelWriter:
+    """Stores the answers of all channels of a worker together.
+
+    A channel hands over its batch and waits; while one upsert is running
+    the batches of other channels queue up and go to the database in the
+    next one, so a commit is shared by every channel waiting on it.
+    """
+
+    def __init__(self, max_rows: int):
+        self.max_rows = max_rows
+        self._pending: Deque[Tuple[List[tuple], asyncio.Future]] = deque()
+        self._task: Optional[asyncio.Task] = None
+
+    async def store(self, answers: List[tuple]) -> Dict[UUID, UUID]:
+        """Row ids of the stored answers by question id."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((answers, future))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return await future
+
+    async def _run(self) -> None:
+        while self._pending:
+            batch: List[Tuple[List[tuple], asyncio.Future]] = []
+            size = 0
+            while self._pending and size < self.max_rows:
+                batch.append(self._pending.popleft())
+                size += len(batch[-1][0])
+            # A session open in two channels may repeat a question.
+            answers = {
+                (answer[1], answer[2]): answer
+                for answers, _ in batch
+                for answer in answers
+            }
+            try:
+                async with db_slots, async_session() as db:
+                    rows = await upsert_answers(db, list(answers.values()))
+                    await db.commit()
+            except Exception as e:
+                # Waiting channels must not hang, whatever failed.
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            stored = {(row.session_id, row.question_id): row.id for row in rows}
+            for answers, future in batch:
+                if not future.done():
+                    future.set_result(
+                        {
+                            answer[2]: stored[answer[1], answer[2]]
+                            for answer in answers
+                            if (answer[1], answer[2]) in stored
+                        }
+                    )
+
+
+channel_writer = ChannelWriter(settings.SESSION_CHANNEL_FLUSH_MAX_ROWS)
+
+
+class TestTakingChannel:
+    """A candidate's test session over one WebSocket.
+
+    The candidate-facing template is pushed once on connect. Answer messages
+    may be pipelined: each is checked against the cached answer key as it is
+    read, and everything that arrived while the previous batch was being
+    stored is handed to the worker's ``ChannelWriter`` together, after which
+    the batch is acknowledged in message order. Sessions of adaptive templates
+    are also sent the next question after the template and after every batch
+    of answers. A finish message stores what is pending, finishes the session
+    and closes the channel.
+
+    Close codes above 4000 carry the HTTP status that refused the channel.
+    """
+
+    def __init__(self, websocket: WebSocket, session_id: UUID, max_batch: int):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.max_batch = max_batch
+        self.template_id: Optional[UUID] = None
+        self.version_id: Optional[UUID] = None
+        self.deadline: Optional[datetime] = None
+        self.key: Optional[AnswerKey] = None
+        self.served: Set[UUID] = set()
+        self._key_fresh = False
+
+    async def run(self) -> None:
+        await self.websocket.accept()
+        try:
+            await self._open()
+        except ChannelRefused as e:
+            await self.websocket.close(code=e.code, reason=e.reason)
+            return
+
+        queue: asyncio.Queue = asyncio.Queue(self.max_batch)
+        reader = asyncio.create_task(self._read(queue))
+        try:
+            while True:
+                batch = [await queue.get()]
+                while len(batch) < self.max_batch and not queue.empty():
+                    batch.append(queue.get_nowait())
+                if not await self._handle(batch):
+                    break
+        except WebSocketDisconnect:
+            return
+        finally:
+            reader.cancel()
+        if (
+            self.websocket.client_state == WebSocketState.CONNECTED
+            and self.websocket.application_state == WebSocketState.CONNECTED
+        ):
+            await self.websocket.close()
+
+    async def _open(self) -> None:
+        try:
+            async with db_slots, async_session() as db:
+                result = await db.execute(
+                    select(TestSession)
+                    .where(TestSession.id == self.session_id)
+                    .options(undefer(TestSession.served_question_ids))
+                )
+                session = result.scalar_one_or_none()
+                if session is None:
+                    raise ChannelRefused(4404, "Session not found")
+                if session.status != "in_progress":
+                    raise ChannelRefused(4409, f"Session is {session.status}")
+                self.template_id = session.template_id
+                self.version_id = session.template_version_id
+                self.deadline = session.deadline
+                self.served = set(session.served_question_ids or ())
+                self.key = await load_answer_key(db, self.template_id, self.version_id)
+                tree = await TemplateService(db).get_template_tree(
+                    self.template_id,
+                    session_id=self.session_id,
+                    version_id=self.version_id,
+                )
+        except (SQLAlchemyError, HTTPException) as e:
+            logger.warning(
+                "Opening channel for session %s failed: %s", self.session_id, e
+            )
+            raise ChannelRefused(1011, "Database error")
+        await self.websocket.send_text(
+            '{"type":"template","session":'
+            + SessionRead.model_validate(session).model_dump_json()
+            + ',"template":'
+            + tree[1].decode()
+            + "}"
+        )
+        if self.key.item_bank is not None:
+            await self._send_next()
+
+    async def _read(self, queue: asyncio.Queue) -> None:
+        while True:
+            message = await self.websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                await queue.put(None)
+                return
+            await queue.put(message.get("text") or message.get("bytes"))
+
+    async def _handle(self, batch: List[Optional[Union[str, bytes]]]) -> bool:
+        """Answer a batch of messages; False once the channel is done."""
+        # A pinned version's key never changes.
+        self._key_fresh = self.version_id is not None
+        replies: List[Union[dict, ChannelAnswer]] = []
+        for raw in batch:
+            if raw is None:
+                # Answers read before the disconnect are still stored.
+                await self._store(replies, send=False)
+                return False
+            try:
+                message = message_adapter.validate_json(raw)
+            except ValidationError as e:
+                replies.append(
+                    {
+                        "type": "error",
+                        "status": 422,
+                        "detail": e.errors(include_url=False, include_context=False),
+                    }
+                )
+                continue
+            if not isinstance(message, ChannelAnswer):
+                await self._store(replies)
+                await self._finish()
+                return False
+            replies.append(await self._check(message) or message)
+        await self._store(replies)
+        if self.key.item_bank is not None and any(
+            isinstance(reply, ChannelAnswer) for reply in replies
+        ):
+            await self._send_next()
+        return True
+
+    async def _send_next(self) -> None:
+        try:
+            async with db_slots, async_session() as db:
+                next_question = await SessionService(db).next_question(self.session_id)
+        except HTTPException as e:
+            await self.websocket.send_text(
+                json.dumps(
+                    {"type": "error", "status": e.status_code, "detail": e.detail}
+                )
+            )
+            return
+        if next_question is not None:
+            if next_question.question is not None:
+                self.served.add(next_question.question.id)
+            await self.websocket.send_text(
+                '{"type":"next",' + next_question.model_dump_json()[1:]
+            )
+
+    async def _check(self, message: ChannelAnswer) -> Optional[dict]:
+        if self.deadline is not None and self.deadline <= datetime.now(timezone.utc):
+            return _error(
+                message,
+                409,
+                f"Session with id {self.session_id} has passed its deadline",
+            )
+        while True:
+            position = self.key.index.get(message.answer_id)
+            if (
+                position is not None
+                and self.key.question_ids[self.key.option_question[position]]
+                == message.question_id
+            ):
+                if not self.key.gives(self.session_id, message.question_id):
+                    return _error(
+                        message,
+                        404,
+                        f"Question with id {message.question_id} is not among the questions drawn for session {self.session_id}",
+                    )
+                if self.key.item_bank is None or message.question_id in self.served:
+                    return None
+                # /next may have served it over HTTP since the channel opened.
+                try:
+                    async with db_slots, async_session() as db:
+                        served = (
+                            await db.execute(
+                                select(TestSession.served_question_ids).where(
+                                    TestSession.id == self.session_id
+                                )
+                            )
+                        ).scalar_one_or_none()
+                except SQLAlchemyError as e:
+                    return _error(message, 500, f"Database error: {str(e)}")
+                self.served.update(served or ())
+                if message.question_id in self.served:
+                    return None
+                return _error(
+                    message,
+                    404,
+                    f"Question with id {message.question_id} has not been served to session {self.session_id}",
+                )
+            if self._key_fresh:
+                break
+            # The current version may have changed since the key was loaded.
+            try:
+                async with db_slots, async_session() as db:
+                    key = await load_answer_key(db, self.template_id)
+            except SQLAlchemyError as e:
+                return _error(message, 500, f"Database error: {str(e)}")
+            self.key = key or self.key
+            self._key_fresh = True
+        if message.question_id not in self.key.question_ids:
+            return _error(
+                message,
+                404,
+                f"Question with id {message.question_id} not found or does not belong to the session's template",
+            )
+        return _error(
+            message,
+            404,
+            f"Answer option with id {message.answer_id} not found or does not belong to the question",
+        )
+
+    async def _store(
+        self, replies: List[Union[dict, ChannelAnswer]], send: bool = True
+    ) -> None:
+        # Only the last answer to a question within a batch is kept.
+        now = datetime.now(timezone.utc)
+        answers: Dict[UUID, tuple] = {
+            reply.question_id: (
+                uuid4(),
+                self.session_id,
+                reply.question_id,
+                reply.answer_id,
+                now,
+            )
+            for reply in replies
+            if isinstance(reply, ChannelAnswer)
+        }
+        stored: Dict[UUID, UUID] = {}
+        failure: Optional[str] = None
+        if answers:
+            try:
+                stored = await channel_writer.store(list(answers.values()))
+            except SQLAlchemyError as e:
+                logger.warning("Storing channel answers failed: %s", e)
+                failure = f"Database error: {str(e)}"
+        if not send:
+            return
+
+        for reply in replies:
+            if not isinstance(reply, ChannelAnswer):
+                message = reply
+            elif reply.question_id in stored:
+                message = {
+                    "type": "ack",
+                    "seq": reply.seq,
+                    "id": str(stored[reply.question_id]),
+                }
+            elif failure is not None:
+                message = _error(reply, 500, failure)
+            else:
+                message = _error(
+                    reply,
+                    409,
+                    f"Session with id {self.session_id} no longer accepts this answer",
+                )
+            await self.websocket.send_text(json.dumps(message))
+
+    async def _finish(self) -> None:
+        try:
+            async with db_slots, async_session() as db:
+                session = await SessionService(db).finish_session(self.session_id)
+        except HTTPException as e:
+            await self.websocket.send_text(
+                json.dumps(
+                    {"type": "error", "status": e.status_code, "detail": e.detail}
+                )
+            )
+            return
+        if session is None:
+            await self.websocket.send_text(
+                json.dumps(
+                    {"type": "error", "status": 404, "detail": "Session not found"}
+                )
+            )
+            return
+        await self.websocket.send_text(
+            '{"type":"finished","session":' + session.model_dump_json() + "}"
+        )
+
+
+def _error(message: ChannelAnswer, status: int, detail: str) -> dict:
+    return {"type": "error", "seq": message.seq, "status": status, "detail": detail}
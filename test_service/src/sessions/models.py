@@ -1,8 +1,20 @@
 import uuid
 from datetime import datetime
+from typing import List
 
-from sqlalchemy import ForeignKey, Integer, DateTime, func, String
-from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy import (
+    BigInteger,
+    DateTime,
+    Enum,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    func,
+    text,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.database import Base
@@ -10,6 +22,48 @@ from src.database import Base
 
 class TestSession(Base):
     __tablename__ = "test_sessions"
+    __table_args__ = (
+        Index(
+            "ix_test_sessions_in_progress_deadline",
+            "deadline",
+            postgresql_where=text("status = 'in_progress'"),
+        ),
+        Index(
+            "ix_test_sessions_template_finished",
+            "template_id",
+            "finished_at",
+            postgresql_where=text("status <> 'in_progress'"),
+        ),
+        Index(
+            "ix_test_sessions_uncompacted",
+            "finished_at",
+            postgresql_where=text(
+                "status <> 'in_progress' AND answer_option_ids IS NULL"
+            ),
+        ),
+        # Listing order and the filters it is most often narrowed by.
+        Index("ix_test_sessions_created", "created_at", "id"),
+        Index(
+            "ix_test_sessions_application_created",
+            "application_id",
+            "created_at",
+            "id",
+        ),
+        Index("ix_test_sessions_email_created", "candidate_email", "created_at", "id"),
+        Index("ix_test_sessions_template_created", "template_id", "created_at", "id"),
+        Index(
+            "ix_test_sessions_template_in_progress_created",
+            "template_id",
+            "created_at",
+            "id",
+            postgresql_where=text("status = 'in_progress'"),
+        ),
+        Index(
+            "ix_test_sessions_callback_due",
+            "callback_due_at",
+            postgresql_where=text("callback_due_at IS NOT NULL"),
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         PG_UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -23,11 +77,59 @@ class TestSession(Base):
         ForeignKey("test_templates.id", ondelete="CASCADE"),
         nullable=False,
     )
+    # The template content the session is given and scored by; sessions
+    # started before versioning follow the template's current version.
+    template_version_id: Mapped[uuid.UUID] = mapped_column(
+        PG_UUID(as_uuid=True),
+        ForeignKey("template_versions.id", ondelete="CASCADE"),
+        nullable=True,
+    )
     candidate_email: Mapped[str] = mapped_column(String(100), nullable=False)
-    score: Mapped[int] = mapped_column(Integer, nullable=True)
+    score: Mapped[float] = mapped_column(Float, nullable=True)
+    max_score: Mapped[float] = mapped_column(Float, nullable=True)
+    score_percent: Mapped[float] = mapped_column(Float, nullable=True)
+    traceparent: Mapped[str] = mapped_column(String(55), nullable=True)
+    # Set in the transaction that finishes the session and cleared once
+    # candidate_service acknowledges the result; see src.sessions.sweeper.
+    callback_due_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    callback_attempts: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    status: Mapped[str] = mapped_column(
+        Enum("in_progress", "finished", "expired", name="session_status"),
+        nullable=False,
+        default="in_progress",
+        server_default="in_progress",
+    )
+    started_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+    deadline: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, server_default=func.now()
     )
+    # Answers of a compacted finished session in answer order; such a
+    # session has no session_answers rows (see src.sessions.storage).
+    answer_question_ids: Mapped[List[uuid.UUID]] = mapped_column(
+        ARRAY(PG_UUID(as_uuid=True)), nullable=True, deferred=True
+    )
+    answer_option_ids: Mapped[List[uuid.UUID]] = mapped_column(
+        ARRAY(PG_UUID(as_uuid=True)), nullable=True, deferred=True
+    )
+    answer_times: Mapped[List[datetime]] = mapped_column(
+        ARRAY(DateTime(timezone=True)), nullable=True, deferred=True
+    )
+
+    # Questions of an adaptive template served by /next so far, in order;
+    # only these are shown to the candidate and accept answers.
+    served_question_ids: Mapped[List[uuid.UUID]] = mapped_column(
+        ARRAY(PG_UUID(as_uuid=True)), nullable=True, deferred=True
+    )
 
     template = relationship("TestTemplate", back_populates="sessions")
     answers = relationship(
@@ -37,6 +139,14 @@ class TestSession(Base):
 
 class SessionAnswer(Base):
     __tablename__ = "session_answers"
+    __table_args__ = (
+        Index(
+            "uq_session_answers_session_question",
+            "session_id",
+            "question_id",
+            unique=True,
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         PG_UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -61,3 +171,20 @@ class SessionAnswer(Base):
     )
 
     session = relationship("TestSession", back_populates="answers")
+
+
+class ScoreSketch(Base):
+    """Histogram of a template's finished session score percentages (see
+    src.sessions.percentiles)."""
+
+    __tablename__ = "score_sketches"
+
+    template_id: Mapped[uuid.UUID] = mapped_column(
+        PG_UUID(as_uuid=True),
+        ForeignKey("test_templates.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    counts: Mapped[List[int]] = mapped_column(ARRAY(BigInteger), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
@@ -0,0 +1,253 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import BigInteger, Integer, column, func, literal_column, select, values
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.database import async_session
+from src.sessions.models import ScoreSketch, TestSession
+from src.templates.models import TestTemplate
+
+logger = logging.getLogger(__name__)
+
+# How far before the last reload rows are read again on the next one.
+_SYNC_OVERLAP = timedelta(seconds=30)
+
+# Score percentages are counted in fixed 0.1 point bins, so a rank is exact
+# up to the width of one bin.
+BINS = 1000
+
+_BIN = func.least(
+    func.greatest(func.floor(TestSession.score_percent * BINS / 100), 0), BINS - 1
+).cast(Integer)
+
+# Element-wise sum of the stored and the incoming counts.
+_MERGED_COUNTS = literal_column(
+    "ARRAY(SELECT a + b FROM unnest(score_sketches.counts, excluded.counts)"
+    " WITH ORDINALITY AS t(a, b, i) ORDER BY i)"
+)
+
+
+def score_bin(percent: float) -> int:
+    return min(max(int(np.floor(percent * BINS / 100)), 0), BINS - 1)
+
+
+class TemplateSketch:
+    """Score percentage histogram of one template.
+
+    ``pending`` holds the sessions counted here since the last persist.
+    Percentile ranks of every bin are derived lazily from the cumulative
+    counts, so a lookup is an index into an array.
+    """
+
+    __slots__ = ("counts", "pending", "_ranks")
+
+    def __init__(self, counts: Optional[np.ndarray] = None):
+        self.counts = (
+            np.zeros(BINS, dtype=np.int64)
+            if counts is None
+            else np.asarray(counts, dtype=np.int64)
+        )
+        self.pending = np.zeros(BINS, dtype=np.int64)
+        self._ranks: Optional[np.ndarray] = None
+
+    def add(self, percent: float) -> None:
+        b = score_bin(percent)
+        self.counts[b] += 1
+        self.pending[b] += 1
+        self._ranks = None
+
+    def reset(self, counts: np.ndarray) -> None:
+        self.counts = counts + self.pending
+        self._ranks = None
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Percentage of sessions scoring lower, counting ties as half."""
+        if self._ranks is None:
+            below = np.cumsum(self.counts)
+            total = below[-1]
+            if total == 0:
+                return None
+            self._ranks = (below - self.counts / 2) * (100 / total)
+        return round(float(self._ranks[score_bin(percent)]), 2)
+
+
+async def _bin_counts(db: AsyncSession, *where) -> Dict[UUID, np.ndarray]:
+    rows = await db.execute(
+        select(TestSession.template_id, _BIN, func.count())
+        .where(TestSession.status != "in_progress")
+        .where(TestSession.score_percent.is_not(None))
+        .where(*where)
+        .group_by(TestSession.template_id, _BIN)
+    )
+    counts: Dict[UUID, np.ndarray] = {}
+    for template_id, b, n in rows:
+        counts.setdefault(template_id, np.zeros(BINS, dtype=np.int64))[b] = n
+    return counts
+
+
+class ScoreSketches:
+    """Per-template score histograms giving percentile ranks in O(1).
+
+    Every worker counts the sessions it finishes in memory and periodically
+    adds them to the template's ``score_sketches`` row in one upsert, then
+    reloads the rows changed since its last persist, so it also sees the
+    sessions finished by other workers, including for templates it finished
+    none of. On startup the rows are loaded; templates without one are
+    counted from their finished sessions once.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._sketches: Dict[UUID, TemplateSketch] = {}
+        self._synced_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, template_id: UUID, percent: float) -> None:
+        sketch = self._sketches.get(template_id)
+        if sketch is None:
+            sketch = self._sketches[template_id] = TemplateSketch()
+        sketch.add(percent)
+
+    def percentile(self, template_id: UUID, percent: float) -> Optional[float]:
+        sketch = self._sketches.get(template_id)
+        return None if sketch is None else sketch.percentile(percent)
+
+    async def load(self) -> None:
+        async with async_session() as db:
+            missing = await _bin_counts(
+                db, TestSession.template_id.not_in(select(ScoreSketch.template_id))
+            )
+            if missing:
+                await db.execute(
+                    insert(ScoreSketch)
+                    .values(
+                        [
+                            {"template_id": template_id, "counts": counts.tolist()}
+                            for template_id, counts in missing.items()
+                        ]
+                    )
+                    .on_conflict_do_nothing()
+                )
+                await db.commit()
+            await self._reload(db)
+
+    async def _reload(self, db: AsyncSession) -> None:
+        """Take the rows changed since the last reload, or all of them."""
+        synced_at = (await db.execute(select(func.now()))).scalar_one()
+        stmt = select(ScoreSketch.template_id, ScoreSketch.counts)
+        if self._synced_at is not None:
+            # updated_at is when the writing transaction started, which may
+            # commit only after this one takes its snapshot.
+            stmt = stmt.where(ScoreSketch.updated_at > self._synced_at - _SYNC_OVERLAP)
+        for template_id, counts in await db.execute(stmt):
+            if len(counts) != BINS:
+                continue
+            sketch = self._sketches.get(template_id)
+            if sketch is None:
+                self._sketches[template_id] = TemplateSketch(counts)
+            else:
+                sketch.reset(np.asarray(counts, dtype=np.int64))
+        self._synced_at = synced_at
+
+    async def persist(self) -> None:
+        pending = {}
+        for template_id, sketch in self._sketches.items():
+            if sketch.pending.any():
+                pending[template_id] = sketch.pending
+                sketch.pending = np.zeros(BINS, dtype=np.int64)
+        if pending:
+            await self._merge(pending)
+        async with async_session() as db:
+            await self._reload(db)
+
+    async def _merge(self, pending: Dict[UUID, np.ndarray]) -> None:
+        incoming = values(
+            column("template_id", PG_UUID(as_uuid=True)),
+            column("counts", ARRAY(BigInteger)),
+            name="v",
+        ).data(
+            [(template_id, counts.tolist()) for template_id, counts in pending.items()]
+        )
+        stmt = insert(ScoreSketch).from_select(
+            ["template_id", "counts"],
+            select(incoming.c.template_id, incoming.c.counts).join(
+                TestTemplate, TestTemplate.id == incoming.c.template_id
+            ),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ScoreSketch.template_id],
+            set_={"counts": _MERGED_COUNTS, "updated_at": func.now()},
+        ).returning(ScoreSketch.template_id, ScoreSketch.counts)
+        try:
+            async with async_session() as db:
+                merged = (await db.execute(stmt)).all()
+                await db.commit()
+        except Exception:
+            for template_id, counts in pending.items():
+                sketch = self._sketches.get(template_id)
+                if sketch is not None:
+                    sketch.pending += counts
+            raise
+
+        stored = set()
+        for template_id, counts in merged:
+            stored.add(template_id)
+            self._sketches[template_id].reset(np.asarray(counts, dtype=np.int64))
+        # Templates deleted in the meantime have nothing left to rank.
+        for template_id in pending.keys() - stored:
+            self._sketches.pop(template_id, None)
+
+    async def rebuild(self, template_id: UUID) -> None:
+        """Recount a template from its finished sessions, e.g. after a rescore."""
+        async with async_session() as db:
+            counts = (
+                await _bin_counts(db, TestSession.template_id == template_id)
+            ).get(template_id, np.zeros(BINS, dtype=np.int64))
+            stmt = insert(ScoreSketch).values(
+                template_id=template_id, counts=counts.tolist()
+            )
+            await db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[ScoreSketch.template_id],
+                    set_={"counts": stmt.excluded.counts, "updated_at": func.now()},
+                )
+            )
+            await db.commit()
+        sketch = self._sketches.setdefault(template_id, TemplateSketch())
+        sketch.pending = np.zeros(BINS, dtype=np.int64)
+        sketch.reset(counts)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            try:
+                await self.persist()
+            except Exception:
+                logger.exception("Persisting score sketches failed")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.persist()
+            except Exception:
+                logger.exception("Persisting score sketches failed")
+
+
+score_sketches = ScoreSketches(settings.SCORE_SKETCH_PERSIST_INTERVAL_SECONDS)
@@ -1,5 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    status,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+)
+from datetime import datetime
+from typing import List, Literal, Optional
 from uuid import UUID
 
 from src.sessions.schemas import (
@@ -7,11 +17,19 @@ from src.sessions.schemas import (
     SessionRead,
     SessionAnswerCreate,
     SessionAnswerRead,
+    NextQuestion,
+    SessionPage,
 )
+from src.config import settings
+from src.sessions.channel import TestTakingChannel
 from src.sessions.dependencies import get_session_service, valid_session_id
 from src.sessions.service import SessionService
+from src.templates.dependencies import get_template_service
+from src.templates.schemas import TemplateTree
+from src.templates.service import TemplateService
+from src.timing import TimedRoute
 
-router = APIRouter(prefix="/sessions", tags=["sessions"])
+router = APIRouter(prefix="/sessions", tags=["sessions"], route_class=TimedRoute)
 
 
 @router.post("/", response_model=SessionRead, status_code=status.HTTP_201_CREATED)
@@ -30,13 +48,74 @@ async def read_session(
     return session
 
 
-@router.get("/", response_model=List[SessionRead])
+@router.get("/{session_id}/template", response_model=TemplateTree)
+async def read_session_template(
+    request: Request,
+    session: SessionRead = Depends(valid_session_id),
+    service: TemplateService = Depends(get_template_service),
+):
+    tree = await service.get_template_tree(
+        session.template_id,
+        session_id=session.id,
+        version_id=session.template_version_id,
+    )
+    if not tree:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Template not found"
+        )
+    content_hash, body = tree
+    etag = f'"{content_hash}-{session.id}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+        )
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+@router.get("/{session_id}/next", response_model=NextQuestion)
+async def read_next_question(
+    session_id: UUID,
+    service: SessionService = Depends(get_session_service),
+):
+    next_question = await service.next_question(session_id)
+    if next_question is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Session not found"
+        )
+    return next_question
+
+
+@router.get("/", response_model=SessionPage)
 async def list_sessions(
-    limit: int = Query(default=10, ge=1),
-    offset: int = Query(default=0, ge=0),
+    application_id: Optional[UUID] = None,
+    template_id: Optional[UUID] = None,
+    candidate_email: Optional[str] = None,
+    session_status: Optional[Literal["in_progress", "finished", "expired"]] = Query(
+        default=None, alias="status"
+    ),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=10, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0, deprecated=True),
     service: SessionService = Depends(get_session_service),
 ):
-    return await service.list_sessions(limit=limit, offset=offset)
+    if offset and cursor is not None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Pass either cursor or offset; offset is deprecated, use cursor",
+        )
+    return await service.list_sessions(
+        application_id=application_id,
+        template_id=template_id,
+        candidate_email=candidate_email,
+        session_status=session_status,
+        created_from=created_from,
+        created_to=created_to,
+        cursor=cursor,
+        limit=limit,
+        offset=offset,
+    )
 
 
 @router.post(
@@ -72,3 +151,11 @@ async def finish_session(
             status_code=status.HTTP_404_NOT_FOUND, detail="Session not found"
         )
     return updated
+
+
+@router.websocket("/{session_id}/ws")
+async def session_channel(websocket: WebSocket, session_id: UUID):
+    channel = TestTakingChannel(
+        websocket, session_id, max_batch=settings.SESSION_CHANNEL_MAX_BATCH
+    )
+    await channel.run()
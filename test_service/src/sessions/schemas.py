@@ -1,8 +1,10 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from typing import Annotated, Literal, Optional, List, Union
 from uuid import UUID
 from datetime import datetime
 
+from src.templates.schemas import QuestionTree
+
 
 class SessionCreate(BaseModel):
     application_id: UUID
@@ -14,9 +16,17 @@ class SessionRead(BaseModel):
     id: UUID
     application_id: UUID
     template_id: UUID
+    template_version_id: Optional[UUID]
     candidate_email: str
     created_at: Optional[datetime]
-    score: Optional[int]
+    score: Optional[float]
+    max_score: Optional[float]
+    score_percent: Optional[float]
+    score_percentile: Optional[float] = None
+    status: str
+    started_at: Optional[datetime]
+    deadline: Optional[datetime]
+    finished_at: Optional[datetime]
 
     model_config = {
         "from_attributes": True,
@@ -24,6 +34,15 @@ class SessionRead(BaseModel):
     }
 
 
+class SessionPage(BaseModel):
+    items: List[SessionRead]
+    # Pass back as ``cursor`` for the next page; None on the last one.
+    next_cursor: Optional[str]
+    total: int
+    # Large totals are the planner's estimate rather than a count.
+    total_is_estimate: bool
+
+
 class SessionAnswerCreate(BaseModel):
     session_id: UUID
     question_id: UUID
@@ -41,3 +60,27 @@ class SessionAnswerRead(BaseModel):
         "from_attributes": True,
         "json_encoders": {datetime: lambda v: v.isoformat()},
     }
+
+
+class NextQuestion(BaseModel):
+    done: bool
+    answered: int
+    ability: float
+    standard_error: float
+    question: Optional[QuestionTree]
+
+
+class ChannelAnswer(BaseModel):
+    type: Literal["answer"]
+    seq: int
+    question_id: UUID
+    answer_id: UUID
+
+
+class ChannelFinish(BaseModel):
+    type: Literal["finish"]
+
+
+ChannelMessage = Annotated[
+    Union[ChannelAnswer, ChannelFinish], Field(discriminator="type")
+]
@@ -1,9 +1,28 @@
+import asyncio
+import base64
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+
 import httpx
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import (
+    all_,
+    and_,
+    any_,
+    case,
+    func,
+    literal,
+    or_,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, insert
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from typing import List, Optional
-from uuid import UUID
+from typing import List, Optional, Tuple
+from uuid import UUID, uuid4
 from fastapi import HTTPException, status
 
 from src.sessions.models import TestSession, SessionAnswer
@@ -12,12 +31,152 @@ from src.sessions.schemas import (
     SessionRead,
     SessionAnswerCreate,
     SessionAnswerRead,
+    NextQuestion,
+    SessionPage,
 )
+from src import interservice
 from src.config import settings
+from src.database import async_session, estimate_rows
+from src.scoring import load_answer_key, score_sessions
+from src.sessions.answer_buffer import OpenSession, answer_buffer
+from src.sessions.percentiles import score_sketches
+from src.sessions.storage import flatten_answers, unpack_answers
+from src.templates.service import TemplateService
+from src.templates.versions import current_version
+from src.tracing import current_traceparent, parse_traceparent, start_span
 from src.answers.models import AnswerOption
-from src.templates.models import TestTemplate
+from src.templates.models import TemplateVersion, TestTemplate
 from src.questions.models import Question
 
+logger = logging.getLogger(__name__)
+
+
+def _encode_cursor(created_at: datetime, session_id: UUID) -> str:
+    raw = f"{created_at.isoformat()}|{session_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, session_id = raw.split("|")
+        return datetime.fromisoformat(created_at), UUID(session_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+def session_read(obj: TestSession) -> SessionRead:
+    read = SessionRead.model_validate(obj)
+    if obj.status != "in_progress" and obj.score_percent is not None:
+        read.score_percentile = score_sketches.percentile(
+            obj.template_id, obj.score_percent
+        )
+    return read
+
+
+async def send_result_callback(
+    session_id: UUID,
+    application_id: UUID,
+    score: float,
+    max_score: float,
+    score_percent: float,
+    traceparent: Optional[str],
+    score_percentile: Optional[float] = None,
+) -> bool:
+    """POST the session's result to candidate_service.
+
+    Returns whether the result was acknowledged; a 4xx answer is final and
+    counts as such, while transport errors and 5xx answers are retried.
+    """
+    with start_span("test_result_callback", parent=parse_traceparent(traceparent)):
+        callback_payload = {
+            "session_id": str(session_id),
+            "score": score,
+            "max_score": max_score,
+            "score_percent": score_percent,
+            "score_percentile": score_percentile,
+            "traceparent": current_traceparent(),
+        }
+        try:
+            response = await interservice.request(
+                "POST",
+                f"{settings.CANDIDATE_SERVICE_URL}/applications/{application_id}/test-result",
+                peer="candidate_service",
+                idempotent=True,
+                json=callback_payload,
+                timeout=10.0,
+            )
+        except httpx.RequestError as e:
+            logger.warning("Failed to send callback for session %s: %s", session_id, e)
+            return False
+        if response.status_code >= 500:
+            logger.warning(
+                "Failed to send callback for session %s: HTTP %d",
+                session_id,
+                response.status_code,
+            )
+            return False
+        if response.is_error:
+            logger.warning(
+                "Callback for session %s was rejected: HTTP %d",
+                session_id,
+                response.status_code,
+            )
+        return True
+
+
+async def send_result_callbacks(results: List[dict], concurrency: int) -> int:
+    """Send result callbacks and record which were acknowledged.
+
+    Each session's ``callback_due_at`` was set when it was finished; it is
+    cleared once its callback is acknowledged and otherwise pushed back
+    with exponential backoff for the sweeper to send it again. Returns the
+    number of acknowledged callbacks.
+    """
+    if not results:
+        return 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(result: dict) -> bool:
+        async with semaphore:
+            return await send_result_callback(**result)
+
+    acknowledged = await asyncio.gather(*(send(result) for result in results))
+    done = [r["session_id"] for r, ok in zip(results, acknowledged) if ok]
+    failed = [r["session_id"] for r, ok in zip(results, acknowledged) if not ok]
+    delay = func.least(
+        settings.SESSION_CALLBACK_RETRY_MAX_SECONDS,
+        settings.SESSION_CALLBACK_RETRY_BASE_SECONDS
+        * func.power(2, TestSession.callback_attempts),
+    ) * (0.5 + func.random() / 2)
+    try:
+        async with async_session() as db:
+            if done:
+                await db.execute(
+                    update(TestSession)
+                    .where(TestSession.id.in_(done))
+                    .values(callback_due_at=None, callback_attempts=0)
+                    .execution_options(synchronize_session=False)
+                )
+            if failed:
+                await db.execute(
+                    update(TestSession)
+                    .where(TestSession.id.in_(failed))
+                    .values(
+                        callback_attempts=TestSession.callback_attempts + 1,
+                        callback_due_at=func.now()
+                        + func.make_interval(0, 0, 0, 0, 0, 0, delay),
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+            await db.commit()
+    except SQLAlchemyError:
+        # The callbacks are sent again once their lease runs out.
+        logger.exception("Failed to record result callbacks")
+    return len(done)
+
 
 class SessionService:
     def __init__(self, db: AsyncSession):
@@ -35,10 +194,20 @@ class SessionService:
                     detail=f"Template with id {data.template_id} not found",
                 )
 
+            started_at = datetime.now(timezone.utc)
+            time_limit = (
+                template.time_limit_minutes
+                or settings.SESSION_DEFAULT_TIME_LIMIT_MINUTES
+            )
+            version = await current_version(self.db, data.template_id)
             new_item = TestSession(
                 application_id=data.application_id,
                 template_id=data.template_id,
+                template_version_id=version.id,
                 candidate_email=data.candidate_email,
+                traceparent=current_traceparent(),
+                started_at=started_at,
+                deadline=started_at + timedelta(minutes=time_limit),
             )
             self.db.add(new_item)
             await self.db.commit()
@@ -65,7 +234,7 @@ class SessionService:
             obj = result.scalar_one_or_none()
             if not obj:
                 return None
-            return SessionRead.model_validate(obj)
+            return session_read(obj)
         except SQLAlchemyError as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -73,61 +242,102 @@ class SessionService:
             )
 
     async def list_sessions(
-        self, limit: int = 10, offset: int = 0
-    ) -> List[SessionRead]:
+        self,
+        application_id: Optional[UUID] = None,
+        template_id: Optional[UUID] = None,
+        candidate_email: Optional[str] = None,
+        session_status: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = 10,
+        offset: int = 0,
+    ) -> SessionPage:
+        """Newest sessions first, paged by the (created_at, id) of the last
+        one so every page is an index range scan. ``offset`` is only kept for
+        clients written before cursors."""
+        where = []
+        if application_id is not None:
+            where.append(TestSession.application_id == application_id)
+        if template_id is not None:
+            where.append(TestSession.template_id == template_id)
+        if candidate_email is not None:
+            where.append(TestSession.candidate_email == candidate_email)
+        if session_status is not None:
+            where.append(TestSession.status == session_status)
+        if created_from is not None:
+            where.append(TestSession.created_at >= created_from)
+        if created_to is not None:
+            where.append(TestSession.created_at < created_to)
+        stmt = (
+            select(TestSession)
+            .where(*where)
+            .order_by(TestSession.created_at.desc(), TestSession.id.desc())
+            .limit(limit + 1)
+            .offset(offset)
+        )
+        if cursor is not None:
+            stmt = stmt.where(
+                tuple_(TestSession.created_at, TestSession.id)
+                < tuple_(*_decode_cursor(cursor))
+            )
         try:
-            result = await self.db.execute(
-                select(TestSession).limit(limit).offset(offset)
+            items = (await self.db.execute(stmt)).scalars().all()
+            next_cursor = None
+            if len(items) > limit:
+                items = items[:limit]
+                next_cursor = _encode_cursor(items[-1].created_at, items[-1].id)
+            if cursor is None and not offset and next_cursor is None:
+                total, total_is_estimate = len(items), False
+            else:
+                total, total_is_estimate = await self._count_sessions(where)
+            return SessionPage(
+                items=[session_read(item) for item in items],
+                next_cursor=next_cursor,
+                total=total,
+                total_is_estimate=total_is_estimate,
             )
-            items = result.scalars().all()
-            return [SessionRead.model_validate(item) for item in items]
         except SQLAlchemyError as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Database error: {str(e)}",
             )
 
-    async def create_answer(self, data: SessionAnswerCreate) -> SessionAnswerRead:
-        try:
-            session_result = await self.db.execute(
-                select(TestSession).where(TestSession.id == data.session_id)
-            )
-            session = session_result.scalar_one_or_none()
-            if not session:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Session with id {data.session_id} not found",
-                )
-
-            question_result = await self.db.execute(
-                select(Question)
-                .where(Question.id == data.question_id)
-                .where(Question.template_id == session.template_id)
-            )
-            question = question_result.scalar_one_or_none()
-            if not question:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Question with id {data.question_id} not found or does not belong to the session's template",
-                )
-
-            answer_result = await self.db.execute(
-                select(AnswerOption)
-                .where(AnswerOption.id == data.answer_id)
-                .where(AnswerOption.question_id == data.question_id)
-            )
-            answer = answer_result.scalar_one_or_none()
-            if not answer:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Answer option with id {data.answer_id} not found or does not belong to the question",
+    async def _count_sessions(self, where: list) -> Tuple[int, bool]:
+        # Small results are counted, but only up to the limit since the
+        # estimate they were picked by can be far off.
+        limit = settings.SESSION_LIST_EXACT_COUNT_LIMIT
+        estimate = await estimate_rows(self.db, select(TestSession.id).where(*where))
+        if estimate < limit:
+            counted = (
+                await self.db.execute(
+                    select(func.count()).select_from(
+                        select(literal(1))
+                        .select_from(TestSession)
+                        .where(*where)
+                        .limit(limit + 1)
+                        .subquery()
+                    )
                 )
+            ).scalar_one()
+            if counted <= limit:
+                return counted, False
+            estimate = counted
+        return estimate, True
 
-            new_item = SessionAnswer(**data.model_dump(exclude_unset=True))
-            self.db.add(new_item)
+    async def create_answer(self, data: SessionAnswerCreate) -> SessionAnswerRead:
+        if answer_buffer.enabled:
+            return await self._buffer_answer(data)
+        try:
+            row = (await self.db.execute(self._answer_upsert(data))).one_or_none()
+            if row is None:
+                await self.db.rollback()
+                row = await self._store_sampled_answer(data)
+            if row is None:
+                await self.db.rollback()
+                await self._reject_answer(data)
             await self.db.commit()
-            await self.db.refresh(new_item)
-            return SessionAnswerRead.model_validate(new_item)
+            return SessionAnswerRead.model_validate(row)
         except IntegrityError as e:
             await self.db.rollback()
             raise HTTPException(
@@ -141,13 +351,246 @@ class SessionService:
                 detail=f"Database error: {str(e)}",
             )
 
+    @staticmethod
+    def _answer_upsert(data: SessionAnswerCreate, sampled: bool = False):
+        # Validation, the in-progress check and the upsert run as one
+        # statement; re-answering a question replaces the earlier answer.
+        # FOR SHARE makes a concurrent finish or expiry either wait for the
+        # answer or, once committed, reject it. The question and option must
+        # be in the session's template version. Templates sampling questions
+        # per session are left out unless the question was checked as given,
+        # and adaptive ones take answers only to questions /next served.
+        candidate = (
+            select(
+                literal(uuid4(), PG_UUID(as_uuid=True)),
+                TestSession.id,
+                Question.id,
+                AnswerOption.id,
+            )
+            .join(Question, Question.template_id == TestSession.template_id)
+            .join(AnswerOption, AnswerOption.question_id == Question.id)
+            .join(TestTemplate, TestTemplate.id == TestSession.template_id)
+            .outerjoin(
+                TemplateVersion, TemplateVersion.id == TestSession.template_version_id
+            )
+            .where(TestSession.id == data.session_id)
+            .where(Question.id == data.question_id)
+            .where(AnswerOption.id == data.answer_id)
+            .where(
+                or_(
+                    and_(
+                        TestSession.template_version_id.is_(None),
+                        Question.retired_at.is_(None),
+                        AnswerOption.retired_at.is_(None),
+                    ),
+                    and_(
+                        Question.id == any_(TemplateVersion.question_ids),
+                        AnswerOption.id == any_(TemplateVersion.option_ids),
+                    ),
+                )
+            )
+            .where(TestSession.status == "in_progress")
+            .where(
+                or_(TestSession.deadline.is_(None), TestSession.deadline > func.now())
+            )
+            .with_for_update(read=True, of=TestSession)
+        )
+        if not sampled:
+            # Sessions pinned to a version are given questions by its
+            # settings; older sessions follow the template's.
+            pinned = TestSession.template_version_id.is_not(None)
+            questions_per_session = case(
+                (pinned, TemplateVersion.questions_per_session),
+                else_=TestTemplate.questions_per_session,
+            )
+            adaptive = case(
+                (pinned, TemplateVersion.adaptive), else_=TestTemplate.adaptive
+            )
+            candidate = candidate.where(
+                or_(
+                    and_(questions_per_session.is_(None), ~adaptive),
+                    and_(
+                        adaptive,
+                        Question.id == any_(TestSession.served_question_ids),
+                    ),
+                )
+            )
+        stmt = insert(SessionAnswer).from_select(
+            ["id", "session_id", "question_id", "answer_id"], candidate
+        )
+        return stmt.on_conflict_do_update(
+            index_elements=[SessionAnswer.session_id, SessionAnswer.question_id],
+            set_={"answer_id": stmt.excluded.answer_id},
+        ).returning(*SessionAnswer.__table__.c)
+
+    async def _store_sampled_answer(self, data: SessionAnswerCreate):
+        result = await self.db.execute(
+            select(TestSession.template_id, TestSession.template_version_id).where(
+                TestSession.id == data.session_id
+            )
+        )
+        session = result.one_or_none()
+        if session is None:
+            return None
+        key = await load_answer_key(self.db, *session)
+        if (
+            key is None
+            or key.sample_size is None
+            or data.question_id not in key.question_index
+            or not key.gives(data.session_id, data.question_id)
+        ):
+            return None
+        return (
+            await self.db.execute(self._answer_upsert(data, sampled=True))
+        ).one_or_none()
+
+    async def _buffer_answer(self, data: SessionAnswerCreate) -> SessionAnswerRead:
+        try:
+            await answer_buffer.backpressure()
+            open_session = answer_buffer.sessions.get(data.session_id)
+            if open_session is None or not self._accepts(open_session, data):
+                # A cached session is reloaded once in case its template changed.
+                open_session = await self._load_open_session(data.session_id)
+                if open_session is None or not self._accepts(open_session, data):
+                    await self._reject_answer(data)
+        except SQLAlchemyError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}",
+            )
+        if open_session.closed:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Session with id {data.session_id} is finished",
+            )
+
+        answer = (
+            uuid4(),
+            data.session_id,
+            data.question_id,
+            data.answer_id,
+            datetime.now(timezone.utc),
+        )
+        answer_buffer.add(answer)
+        return SessionAnswerRead(
+            id=answer[0],
+            session_id=data.session_id,
+            question_id=data.question_id,
+            answer_id=data.answer_id,
+            created_at=answer[4],
+        )
+
+    @staticmethod
+    def _accepts(open_session: OpenSession, data: SessionAnswerCreate) -> bool:
+        key = open_session.key
+        position = key.index.get(data.answer_id)
+        return (
+            position is not None
+            and key.question_ids[key.option_question[position]] == data.question_id
+            and key.gives(data.session_id, data.question_id)
+            and (key.item_bank is None or data.question_id in open_session.served)
+            and (
+                open_session.deadline is None
+                or open_session.deadline > datetime.now(timezone.utc)
+            )
+        )
+
+    async def _load_open_session(self, session_id: UUID) -> Optional[OpenSession]:
+        result = await self.db.execute(
+            select(
+                TestSession.template_id,
+                TestSession.template_version_id,
+                TestSession.deadline,
+                TestSession.served_question_ids,
+            )
+            .where(TestSession.id == session_id)
+            .where(TestSession.status == "in_progress")
+        )
+        row = result.one_or_none()
+        if row is None:
+            return None
+        key = await load_answer_key(self.db, row.template_id, row.template_version_id)
+        open_session = OpenSession(
+            row.template_id, row.deadline, key, row.served_question_ids
+        )
+        answer_buffer.sessions.set(session_id, open_session)
+        return open_session
+
+    async def _reject_answer(self, data: SessionAnswerCreate) -> None:
+        """Raise the error explaining why an answer was not recorded."""
+        session_result = await self.db.execute(
+            select(TestSession).where(TestSession.id == data.session_id)
+        )
+        session = session_result.scalar_one_or_none()
+        if not session:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Session with id {data.session_id} not found",
+            )
+        if session.status != "in_progress":
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Session with id {data.session_id} is {session.status}",
+            )
+        if session.deadline and session.deadline <= datetime.now(timezone.utc):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Session with id {data.session_id} has passed its deadline",
+            )
+
+        key = await load_answer_key(
+            self.db, session.template_id, session.template_version_id
+        )
+        if key is None or data.question_id not in key.question_index:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Question with id {data.question_id} not found or does not belong to the session's template",
+            )
+        position = key.index.get(data.answer_id)
+        if (
+            position is None
+            or key.question_ids[key.option_question[position]] != data.question_id
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Answer option with id {data.answer_id} not found or does not belong to the question",
+            )
+        if key.item_bank is not None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Question with id {data.question_id} has not been served to session {data.session_id}",
+            )
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Question with id {data.question_id} is not among the questions drawn for session {data.session_id}",
+        )
+
     async def list_answers_for_session(
         self, session_id: UUID, limit: int = 10, offset: int = 0
     ) -> List[SessionAnswerRead]:
         try:
+            if answer_buffer.enabled:
+                await answer_buffer.drain_session(session_id)
+            packed = (
+                await self.db.execute(
+                    select(
+                        TestSession.answer_question_ids,
+                        TestSession.answer_option_ids,
+                        TestSession.answer_times,
+                    ).where(TestSession.id == session_id)
+                )
+            ).one_or_none()
+            if packed is not None and packed.answer_option_ids is not None:
+                answers = unpack_answers(session_id, *packed)
+                return [
+                    SessionAnswerRead.model_validate(answer)
+                    for answer in answers[offset : offset + limit]
+                ]
+
             result = await self.db.execute(
                 select(SessionAnswer)
                 .where(SessionAnswer.session_id == session_id)
+                .order_by(SessionAnswer.created_at, SessionAnswer.id)
                 .limit(limit)
                 .offset(offset)
             )
@@ -159,43 +602,157 @@ class SessionService:
                 detail=f"Database error: {str(e)}",
             )
 
+    async def next_question(self, session_id: UUID) -> Optional[NextQuestion]:
+        """Ability estimate of an adaptive session and the question to serve
+        next, or none once the estimate is precise enough."""
+        try:
+            if answer_buffer.enabled:
+                await answer_buffer.drain_session(session_id)
+            session_result = await self.db.execute(
+                select(
+                    TestSession.template_id,
+                    TestSession.template_version_id,
+                    TestSession.status,
+                ).where(TestSession.id == session_id)
+            )
+            session = session_result.one_or_none()
+            if session is None:
+                return None
+            key = await load_answer_key(
+                self.db, session.template_id, session.template_version_id
+            )
+            if key is None:
+                return None
+            if key.item_bank is None:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Template with id {session.template_id} is not adaptive",
+                )
+            _, answer_ids = flatten_answers(
+                await self.db.execute(
+                    select(
+                        TestSession.id,
+                        TestSession.answer_option_ids,
+                        SessionAnswer.answer_id,
+                    )
+                    .outerjoin(
+                        SessionAnswer, SessionAnswer.session_id == TestSession.id
+                    )
+                    .where(TestSession.id == session_id)
+                    .order_by(SessionAnswer.created_at, SessionAnswer.id)
+                )
+            )
+            correct, answered = key.responses(
+                np.zeros(len(answer_ids), np.int64),
+                key.option_positions(answer_ids),
+                1,
+            )
+            ability, standard_error, _ = key.item_bank.estimate(correct, answered)
+            count = int(answered.sum())
+            question = None
+            if session.status == "in_progress" and not key.item_bank.done(
+                standard_error[0], count
+            ):
+                position = key.item_bank.next_question(ability[0], answered[0])
+                if position is not None:
+                    question_id = key.question_ids[position]
+                    await self.db.execute(
+                        update(TestSession)
+                        .where(TestSession.id == session_id)
+                        .where(TestSession.status == "in_progress")
+                        .where(
+                            or_(
+                                TestSession.served_question_ids.is_(None),
+                                question_id != all_(TestSession.served_question_ids),
+                            )
+                        )
+                        .values(
+                            served_question_ids=func.array_append(
+                                TestSession.served_question_ids, question_id
+                            )
+                        )
+                        .execution_options(synchronize_session=False)
+                    )
+                    await self.db.commit()
+                    open_session = answer_buffer.sessions.get(session_id)
+                    if open_session is not None:
+                        open_session.served.add(question_id)
+                    _, body = await TemplateService(self.db).get_template_tree(
+                        session.template_id,
+                        session_id=session_id,
+                        version_id=session.template_version_id,
+                    )
+                    # Absent if the session was finished meanwhile.
+                    question = next(
+                        (
+                            q
+                            for q in json.loads(body)["questions"]
+                            if q["id"] == str(question_id)
+                        ),
+                        None,
+                    )
+            return NextQuestion(
+                done=question is None,
+                answered=count,
+                ability=round(float(ability[0]), 4),
+                standard_error=round(float(standard_error[0]), 4),
+                question=question,
+            )
+        except SQLAlchemyError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}",
+            )
+
     async def calculate_score_and_callback(self, session_id: UUID) -> None:
         try:
             result = await self.db.execute(
-                select(TestSession).where(TestSession.id == session_id)
+                select(TestSession)
+                .where(TestSession.id == session_id)
+                .with_for_update()
             )
             session_obj = result.scalar_one_or_none()
             if not session_obj:
                 return
 
-            result_all = await self.db.execute(
-                select(SessionAnswer).where(SessionAnswer.session_id == session_id)
+            scores, max_scores, percents = await score_sessions(
+                self.db,
+                [session_id],
+                [session_obj.template_id],
+                [session_obj.template_version_id],
             )
-            all_answers = result_all.scalars().all()
-
-            correct_count = 0
-            for ans in all_answers:
-                ans_res = await self.db.execute(
-                    select(AnswerOption).where(AnswerOption.id == ans.answer_id)
-                )
-                answer_option = ans_res.scalar_one_or_none()
-                if answer_option and answer_option.correct:
-                    correct_count += 1
-
-            session_obj.score = correct_count
+            session_obj.score = float(scores[0])
+            session_obj.max_score = float(max_scores[0])
+            session_obj.score_percent = float(percents[0])
+            finishing = session_obj.status == "in_progress"
+            if finishing:
+                session_obj.status = "finished"
+                session_obj.finished_at = func.now()
+            session_obj.callback_due_at = func.now() + timedelta(
+                seconds=settings.SESSION_CALLBACK_LEASE_SECONDS
+            )
+            session_obj.callback_attempts = 0
             await self.db.commit()
             await self.db.refresh(session_obj)
+            if finishing:
+                score_sketches.add(session_obj.template_id, session_obj.score_percent)
 
-            callback_payload = {"session_id": str(session_id), "score": correct_count}
-            async with httpx.AsyncClient() as client:
-                try:
-                    await client.post(
-                        f"{settings.CANDIDATE_SERVICE_URL}/applications/{session_obj.application_id}/test-result",
-                        json=callback_payload,
-                        timeout=10.0,
-                    )
-                except httpx.RequestError as e:
-                    print(f"Failed to send callback: {str(e)}")
+            await send_result_callbacks(
+                [
+                    {
+                        "session_id": session_id,
+                        "application_id": session_obj.application_id,
+                        "score": session_obj.score,
+                        "max_score": session_obj.max_score,
+                        "score_percent": session_obj.score_percent,
+                        "traceparent": session_obj.traceparent,
+                        "score_percentile": score_sketches.percentile(
+                            session_obj.template_id, session_obj.score_percent
+                        ),
+                    }
+                ],
+                concurrency=1,
+            )
         except SQLAlchemyError as e:
             await self.db.rollback()
             raise HTTPException(
@@ -205,6 +762,9 @@ class SessionService:
 
     async def finish_session(self, session_id: UUID) -> Optional[SessionRead]:
         try:
+            if answer_buffer.enabled:
+                answer_buffer.close_session(session_id)
+                await answer_buffer.drain_session(session_id)
             await self.calculate_score_and_callback(session_id)
             return await self.get_session(session_id)
         except HTTPException:
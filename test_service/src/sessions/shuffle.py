@@ -0,0 +1,76 @@
+from typing import List, Optional, Sequence, Tuple
+from uuid import UUID
+
+import numpy as np
+
+_MASK = (1 << 64) - 1
+_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def fold_ids(ids: Sequence[UUID]) -> np.ndarray:
+    """64-bit keys of UUIDs, the two halves xored."""
+    return np.fromiter(
+        ((i.int >> 64) ^ (i.int & _MASK) for i in ids), np.uint64, len(ids)
+    )
+
+
+def draw(seeds: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """Seeds x keys matrix of SplitMix64 draws.
+
+    A session's seed is mixed with the id of each question or option, so a
+    draw depends only on the pair and not on the other items of the
+    template. Within a row the draws are distinct, as the mix is a bijection.
+    """
+    x = (seeds[:, None] ^ keys[None, :]) + _GAMMA
+    x = (x ^ (x >> np.uint64(30))) * _MIX1
+    x = (x ^ (x >> np.uint64(27))) * _MIX2
+    return x ^ (x >> np.uint64(31))
+
+
+def given_questions(
+    session_ids: Sequence[UUID], question_ids: Sequence[UUID], sample_size: int
+) -> np.ndarray:
+    """Sessions x questions mask of the ``sample_size`` questions each
+    session is given: those with the lowest draws."""
+    draws = draw(fold_ids(session_ids), fold_ids(question_ids))
+    given = np.zeros(draws.shape, dtype=bool)
+    if sample_size >= len(question_ids):
+        given[:] = True
+        return given
+    chosen = np.argpartition(draws, sample_size - 1, axis=1)[:, :sample_size]
+    np.put_along_axis(given, chosen, True, axis=1)
+    return given
+
+
+def arrange(
+    session_id: UUID,
+    question_ids: Sequence[UUID],
+    option_ids: Sequence[Sequence[UUID]],
+    sample_size: Optional[int],
+    shuffle_questions: bool,
+    shuffle_options: bool,
+) -> List[Tuple[int, List[int]]]:
+    """Positions of the questions a session is given, in the order it sees
+    them, each with the positions of its options in order."""
+    seed = fold_ids([session_id])
+    order = np.arange(len(question_ids))
+    if sample_size is not None or shuffle_questions:
+        draws = draw(seed, fold_ids(question_ids))[0]
+        by_draw = np.argsort(draws)
+        if sample_size is not None:
+            by_draw = by_draw[:sample_size]
+        order = by_draw if shuffle_questions else np.sort(by_draw)
+
+    order = order.tolist()
+    if not shuffle_options:
+        return [(q, list(range(len(option_ids[q])))) for q in order]
+    draws = draw(seed, fold_ids([o for q in order for o in option_ids[q]]))[0]
+    arranged = []
+    start = 0
+    for q in order:
+        end = start + len(option_ids[q])
+        arranged.append((q, np.argsort(draws[start:end]).tolist()))
+        start = end
+    return arranged
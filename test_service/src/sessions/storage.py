@@ -0,0 +1,176 @@
+import itertools
+from datetime import datetime
+from typing import Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID, uuid5
+
+from sqlalchemy import DateTime, cast, column, delete, func, literal_column, select
+from sqlalchemy import update, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, aggregate_order_by, insert
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.answers.models import AnswerOption
+from src.questions.models import Question
+from src.sessions.models import SessionAnswer, TestSession
+
+
+async def upsert_answers(db: AsyncSession, answers: Sequence[tuple]) -> List[Row]:
+    """Store ``(id, session_id, question_id, answer_id, created_at)`` answers
+    in one statement and return the ``(id, session_id, question_id)`` rows
+    written.
+
+    Answers were validated when accepted; the joins only drop those whose
+    session closed or whose option was deleted since. A question answered
+    before keeps its row id.
+    """
+    rows = values(
+        column("id", PG_UUID(as_uuid=True)),
+        column("session_id", PG_UUID(as_uuid=True)),
+        column("question_id", PG_UUID(as_uuid=True)),
+        column("answer_id", PG_UUID(as_uuid=True)),
+        column("created_at", DateTime(timezone=True)),
+        name="v",
+    ).data(list(answers))
+    candidate = (
+        select(
+            rows.c.id,
+            rows.c.session_id,
+            rows.c.question_id,
+            rows.c.answer_id,
+            rows.c.created_at,
+        )
+        .join(TestSession, TestSession.id == rows.c.session_id)
+        .join(
+            AnswerOption,
+            (AnswerOption.id == rows.c.answer_id)
+            & (AnswerOption.question_id == rows.c.question_id),
+        )
+        .join(
+            Question,
+            (Question.id == rows.c.question_id)
+            & (Question.template_id == TestSession.template_id),
+        )
+        .where(TestSession.status == "in_progress")
+        .with_for_update(read=True, of=TestSession)
+    )
+    stmt = insert(SessionAnswer).from_select(
+        ["id", "session_id", "question_id", "answer_id", "created_at"], candidate
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SessionAnswer.session_id, SessionAnswer.question_id],
+        set_={"answer_id": stmt.excluded.answer_id},
+    ).returning(SessionAnswer.id, SessionAnswer.session_id, SessionAnswer.question_id)
+    return (await db.execute(stmt)).all()
+
+
+def flatten_answers(
+    rows: Iterable[Tuple[UUID, Optional[List[UUID]], Optional[UUID]]],
+) -> Tuple[List[UUID], List[UUID]]:
+    """Parallel session and option id lists from ``(session id, packed option
+    ids, answer id)`` rows.
+
+    Readers outer join ``session_answers`` to ``test_sessions`` and select the
+    packed option ids alongside; a compacted session has no answer rows, so
+    it arrives as a single row carrying all of its answers.
+    """
+    session_ids: List[UUID] = []
+    option_ids: List[UUID] = []
+    for session_id, packed, answer_id in rows:
+        if packed is not None:
+            session_ids.extend(itertools.repeat(session_id, len(packed)))
+            option_ids.extend(packed)
+        elif answer_id is not None:
+            session_ids.append(session_id)
+            option_ids.append(answer_id)
+    return session_ids, option_ids
+
+
+def unpack_answers(
+    session_id: UUID,
+    question_ids: List[UUID],
+    option_ids: List[UUID],
+    times: List[datetime],
+) -> List[dict]:
+    """A compacted session's answers in their stored row shape.
+
+    Row ids are not kept; the id is derived from session and question, which
+    identify an answer, so it is stable across reads.
+    """
+    return [
+        {
+            "id": uuid5(session_id, str(question_id)),
+            "session_id": session_id,
+            "question_id": question_id,
+            "answer_id": option_id,
+            "created_at": created_at,
+        }
+        for question_id, option_id, created_at in zip(question_ids, option_ids, times)
+    ]
+
+
+async def compact_finished_sessions(
+    db: AsyncSession, batch_size: int, template_id: Optional[UUID] = None
+) -> int:
+    """Move the answers of up to ``batch_size`` finished sessions into arrays.
+
+    Sessions are claimed with ``SKIP LOCKED`` and their rows deleted and
+    packed in the same statement, so a session is never half compacted.
+    """
+    claimable = (
+        select(TestSession.id)
+        .where(TestSession.status != "in_progress")
+        .where(TestSession.answer_option_ids.is_(None))
+    )
+    if template_id is not None:
+        claimable = claimable.where(TestSession.template_id == template_id)
+    claimed = (
+        claimable.order_by(TestSession.finished_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .cte("claimed")
+    )
+    moved = (
+        delete(SessionAnswer)
+        .where(SessionAnswer.session_id == claimed.c.id)
+        .returning(
+            SessionAnswer.id,
+            SessionAnswer.session_id,
+            SessionAnswer.question_id,
+            SessionAnswer.answer_id,
+            SessionAnswer.created_at,
+        )
+        .cte("moved")
+    )
+
+    def packed_array(value, target):
+        order = aggregate_order_by(value, moved.c.created_at, moved.c.id)
+        return func.coalesce(
+            func.array_agg(order).filter(moved.c.session_id.is_not(None)),
+            cast(literal_column("'{}'"), target.type),
+        )
+
+    question_ids = packed_array(moved.c.question_id, TestSession.answer_question_ids)
+    option_ids = packed_array(moved.c.answer_id, TestSession.answer_option_ids)
+    times = packed_array(moved.c.created_at, TestSession.answer_times)
+    packed = (
+        select(
+            claimed.c.id,
+            question_ids.label("question_ids"),
+            option_ids.label("option_ids"),
+            times.label("times"),
+        )
+        .outerjoin(moved, moved.c.session_id == claimed.c.id)
+        .group_by(claimed.c.id)
+        .cte("packed")
+    )
+    result = await db.execute(
+        update(TestSession)
+        .where(TestSession.id == packed.c.id)
+        .values(
+            answer_question_ids=packed.c.question_ids,
+            answer_option_ids=packed.c.option_ids,
+            answer_times=packed.c.times,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
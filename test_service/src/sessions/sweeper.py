@@ -0,0 +1,256 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import Float, column, func, select, update, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+
+from src.config import settings
+from src.database import async_session
+from src.scoring import score_sessions
+from src.sessions.answer_buffer import answer_buffer
+from src.sessions.models import TestSession
+from src.sessions.percentiles import score_sketches
+from src.sessions.service import send_result_callbacks
+from src.sessions.storage import compact_finished_sessions
+
+logger = logging.getLogger(__name__)
+
+
+class SessionExpirySweeper:
+    """Finalizes in-progress sessions whose deadline has passed.
+
+    Each batch is claimed with ``FOR UPDATE SKIP LOCKED`` through the partial
+    deadline index, so several workers can sweep concurrently without
+    finalizing the same session twice, and a sweep touches at most
+    ``batch_size * max_batches`` rows however large the table grows.
+
+    The session is expired in the same transaction that marks its result
+    callback pending, and callbacks that are not acknowledged are claimed
+    the same way and sent again until they are.
+
+    With ``compaction_batch_size`` set, each pass also packs the answers of
+    finished sessions onto their session rows, in batches claimed the same
+    way.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        batch_size: int,
+        max_batches: int,
+        callback_concurrency: int,
+        callback_lease: float,
+        compaction_batch_size: Optional[int] = None,
+    ):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.callback_concurrency = callback_concurrency
+        self.callback_lease = timedelta(seconds=callback_lease)
+        self.compaction_batch_size = compaction_batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                expired = await self.sweep()
+                if expired:
+                    logger.info("Expired %d test sessions", expired)
+                retried = await self.retry_callbacks()
+                if retried:
+                    logger.info("Retried %d result callbacks", retried)
+                if self.compaction_batch_size:
+                    compacted = await self.compact()
+                    if compacted:
+                        logger.info("Compacted %d finished test sessions", compacted)
+            except Exception:
+                logger.exception("Session expiry sweep failed")
+            await asyncio.sleep(self.interval)
+
+    async def sweep(self) -> int:
+        # Answers accepted before the deadline must count towards the score.
+        # Only sessions whose deadline passed before the flush are expired,
+        # since answers to the others may still have been accepted since.
+        cutoff = datetime.now(timezone.utc)
+        if answer_buffer.enabled:
+            await answer_buffer.flush()
+        total = 0
+        for _ in range(self.max_batches):
+            results = await self._expire_batch(cutoff)
+            total += len(results)
+            for result in results:
+                score_sketches.add(result["template_id"], result["score_percent"])
+            for result in results:
+                result["score_percentile"] = score_sketches.percentile(
+                    result.pop("template_id"), result["score_percent"]
+                )
+            await send_result_callbacks(results, self.callback_concurrency)
+            if len(results) < self.batch_size:
+                break
+        return total
+
+    async def retry_callbacks(self) -> int:
+        total = 0
+        for _ in range(self.max_batches):
+            results = await self._claim_callbacks()
+            total += len(results)
+            await send_result_callbacks(results, self.callback_concurrency)
+            if len(results) < self.batch_size:
+                break
+        return total
+
+    async def compact(self) -> int:
+        total = 0
+        for _ in range(self.max_batches):
+            async with async_session() as db:
+                async with db.begin():
+                    compacted = await compact_finished_sessions(
+                        db, self.compaction_batch_size
+                    )
+            total += compacted
+            if compacted < self.compaction_batch_size:
+                break
+        return total
+
+    async def _expire_batch(self, cutoff: datetime) -> List[dict]:
+        async with async_session() as db:
+            async with db.begin():
+                claimed = (
+                    await db.execute(
+                        select(
+                            TestSession.id,
+                            TestSession.template_id,
+                            TestSession.template_version_id,
+                            TestSession.application_id,
+                            TestSession.traceparent,
+                        )
+                        .where(TestSession.status == "in_progress")
+                        .where(TestSession.deadline <= cutoff)
+                        .order_by(TestSession.deadline)
+                        .limit(self.batch_size)
+                        .with_for_update(skip_locked=True)
+                    )
+                ).all()
+                if not claimed:
+                    return []
+
+                ids = [row.id for row in claimed]
+                scores, max_scores, percents = await score_sessions(
+                    db,
+                    ids,
+                    [row.template_id for row in claimed],
+                    [row.template_version_id for row in claimed],
+                )
+
+                results = values(
+                    column("id", PG_UUID(as_uuid=True)),
+                    column("score", Float),
+                    column("max_score", Float),
+                    column("score_percent", Float),
+                    name="v",
+                ).data(
+                    [
+                        (session_id, float(score), float(max_score), float(percent))
+                        for session_id, score, max_score, percent in zip(
+                            ids, scores, max_scores, percents
+                        )
+                    ]
+                )
+                await db.execute(
+                    update(TestSession)
+                    .where(TestSession.id == results.c.id)
+                    .values(
+                        status="expired",
+                        finished_at=func.now(),
+                        score=results.c.score,
+                        max_score=results.c.max_score,
+                        score_percent=results.c.score_percent,
+                        callback_due_at=func.now() + self.callback_lease,
+                        callback_attempts=0,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                return [
+                    {
+                        "session_id": row.id,
+                        "application_id": row.application_id,
+                        "template_id": row.template_id,
+                        "score": float(scores[i]),
+                        "max_score": float(max_scores[i]),
+                        "score_percent": float(percents[i]),
+                        "traceparent": row.traceparent,
+                    }
+                    for i, row in enumerate(claimed)
+                ]
+
+    async def _claim_callbacks(self) -> List[dict]:
+        async with async_session() as db:
+            async with db.begin():
+                due = (
+                    select(TestSession.id)
+                    .where(TestSession.callback_due_at <= func.now())
+                    .order_by(TestSession.callback_due_at)
+                    .limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                    .cte("due")
+                )
+                claimed = (
+                    await db.execute(
+                        update(TestSession)
+                        .where(TestSession.id.in_(select(due.c.id)))
+                        .values(callback_due_at=func.now() + self.callback_lease)
+                        .returning(
+                            TestSession.id,
+                            TestSession.application_id,
+                            TestSession.template_id,
+                            TestSession.score,
+                            TestSession.max_score,
+                            TestSession.score_percent,
+                            TestSession.traceparent,
+                        )
+                        .execution_options(synchronize_session=False)
+                    )
+                ).all()
+        return [
+            {
+                "session_id": row.id,
+                "application_id": row.application_id,
+                "score": row.score,
+                "max_score": row.max_score,
+                "score_percent": row.score_percent,
+                "traceparent": row.traceparent,
+                "score_percentile": score_sketches.percentile(
+                    row.template_id, row.score_percent
+                ),
+            }
+            for row in claimed
+        ]
+
+
+sweeper = SessionExpirySweeper(
+    interval=settings.SESSION_SWEEP_INTERVAL_SECONDS,
+    batch_size=settings.SESSION_SWEEP_BATCH_SIZE,
+    max_batches=settings.SESSION_SWEEP_MAX_BATCHES,
+    callback_concurrency=settings.SESSION_CALLBACK_CONCURRENCY,
+    callback_lease=settings.SESSION_CALLBACK_LEASE_SECONDS,
+    compaction_batch_size=(
+        settings.SESSION_COMPACTION_BATCH_SIZE
+        if settings.SESSION_COMPACTION_ENABLED
+        else None
+    ),
+)
@@ -0,0 +1,61 @@
+from typing import Dict, Optional, Union
+
+import numpy as np
+
+
+def item_analysis(
+    points: np.ndarray,
+    question_max: np.ndarray,
+    max_score: Union[float, np.ndarray],
+    given: Optional[np.ndarray] = None,
+) -> Dict[str, object]:
+    """Classical item statistics from a sessions x questions points matrix.
+
+    Difficulty is the mean share of each question's maximum that sessions
+    earned, among the sessions given the question when ``given`` masks a
+    sampled template; ``max_score`` may then be per session. Discrimination is the correlation of the item score with the
+    rest score (the point-biserial for right/wrong items), and reliability
+    is Cronbach's alpha, which equals KR-20 for right/wrong items.
+    """
+    n_sessions, n_questions = points.shape
+    totals = points.sum(axis=1)
+    if n_sessions:
+        mean_item = points.mean(axis=0)
+        var_item = points.var(axis=0)
+        mean_total = totals.mean()
+        var_total = totals.var()
+        cov_total = points.T @ totals / n_sessions - mean_item * mean_total
+    else:
+        mean_item = var_item = cov_total = np.full(n_questions, np.nan)
+        mean_total = var_total = np.nan
+
+    # Item-rest moments follow from the item/total ones, so the sessions x
+    # questions rest matrix is never materialized.
+    var_rest = var_total + var_item - 2 * cov_total
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if given is not None:
+            p_values = points.sum(axis=0) / given.sum(axis=0) / question_max
+        else:
+            p_values = mean_item / question_max
+        discrimination = (cov_total - var_item) / np.sqrt(var_item * var_rest)
+        alpha = (
+            n_questions / (n_questions - 1) * (1 - var_item.sum() / var_total)
+            if n_questions > 1
+            else np.nan
+        )
+        percents = np.clip(totals / max_score * 100, 0, 100)
+    p_values[~np.isfinite(p_values)] = np.nan
+    discrimination[~np.isfinite(discrimination)] = np.nan
+
+    histogram, edges = np.histogram(percents[np.isfinite(percents)], 10, (0, 100))
+    return {
+        "sessions": n_sessions,
+        "p_values": p_values,
+        "discrimination": discrimination,
+        "score_histogram": histogram,
+        "histogram_edges": edges,
+        "mean_score": mean_total,
+        "score_std": np.sqrt(var_total),
+        "median_score": np.median(totals) if n_sessions else np.nan,
+        "reliability_alpha": alpha,
+    }
@@ -1,8 +1,20 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import String, Text, DateTime, func
-from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from typing import List
+
+from sqlalchemy import (
+    Boolean,
+    Float,
+    ForeignKey,
+    Index,
+    String,
+    Text,
+    DateTime,
+    Integer,
+    func,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.database import Base
@@ -16,6 +28,24 @@ class TestTemplate(Base):
     )
     title: Mapped[str] = mapped_column(String(100), nullable=False)
     description: Mapped[str] = mapped_column(Text, nullable=True)
+    time_limit_minutes: Mapped[int] = mapped_column(Integer, nullable=True)
+    # Per-session arrangement, derived from the session id at read and
+    # scoring time (see src.sessions.shuffle). Adaptive templates serve
+    # questions by ability instead and cap sessions at questions_per_session.
+    shuffle_questions: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=False, server_default="false"
+    )
+    shuffle_options: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=False, server_default="false"
+    )
+    questions_per_session: Mapped[int] = mapped_column(Integer, nullable=True)
+    adaptive: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=False, server_default="false"
+    )
+    adaptive_target_se: Mapped[float] = mapped_column(Float, nullable=True)
+    content_version: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=1, server_default="1"
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, server_default=func.now()
     )
@@ -32,3 +62,49 @@ class TestTemplate(Base):
     sessions = relationship(
         "TestSession", back_populates="template", cascade="all, delete-orphan"
     )
+
+
+class TemplateVersion(Base):
+    """Immutable snapshot of a template's content at one content_version.
+
+    ``content`` is the keyed template tree as JSON and ``content_hash`` its
+    SHA-256, so anything derived from a version can be cached by hash for
+    good. The question and option ids and the drawing settings let answers
+    be checked against the version in SQL.
+    """
+
+    __tablename__ = "template_versions"
+    __table_args__ = (
+        Index(
+            "uq_template_versions_template_number",
+            "template_id",
+            "number",
+            unique=True,
+        ),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        PG_UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    template_id: Mapped[uuid.UUID] = mapped_column(
+        PG_UUID(as_uuid=True),
+        ForeignKey("test_templates.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    number: Mapped[int] = mapped_column(Integer, nullable=False)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    question_ids: Mapped[List[uuid.UUID]] = mapped_column(
+        ARRAY(PG_UUID(as_uuid=True)), nullable=False
+    )
+    option_ids: Mapped[List[uuid.UUID]] = mapped_column(
+        ARRAY(PG_UUID(as_uuid=True)), nullable=False
+    )
+    # Copied from the content for the checks answers are stored with.
+    questions_per_session: Mapped[int] = mapped_column(Integer, nullable=True)
+    adaptive: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=False, server_default="false"
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
@@ -0,0 +1,296 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Sequence
+
+import httpx
+import numpy as np
+from sqlalchemy import Float, column, func, select, update, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import SQLAlchemyError
+
+from src import interservice
+from src.config import settings
+from src.database import async_session, engine
+from src.scoring import AnswerKey, load_answer_key
+from src.sessions.models import TestSession, SessionAnswer
+from src.sessions.percentiles import score_sketches
+from src.sessions.service import send_result_callbacks
+from src.sessions.storage import flatten_answers
+from src.tracing import current_traceparent, start_span
+
+logger = logging.getLogger(__name__)
+
+
+class RescoreJob:
+    def __init__(self, template_id: uuid.UUID):
+        self.id = uuid.uuid4()
+        self.template_id = template_id
+        self.status = "pending"
+        self.sessions_total = 0
+        self.sessions_processed = 0
+        self.sessions_changed = 0
+        self.results_pushed = 0
+        self.push_failures = 0
+        self.error: Optional[str] = None
+        self.started_at = datetime.now(timezone.utc)
+        self.finished_at: Optional[datetime] = None
+        self._started = time.perf_counter()
+        self._elapsed: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("pending", "running")
+
+    @property
+    def elapsed_seconds(self) -> float:
+        if self._elapsed is not None:
+            return round(self._elapsed, 3)
+        return round(time.perf_counter() - self._started, 3)
+
+    @property
+    def sessions_per_second(self) -> float:
+        elapsed = self.elapsed_seconds
+        return round(self.sessions_processed / elapsed, 1) if elapsed else 0.0
+
+    def _finish(self, status: str) -> None:
+        self.status = status
+        self.finished_at = datetime.now(timezone.utc)
+        self._elapsed = time.perf_counter() - self._started
+
+
+jobs: "OrderedDict[uuid.UUID, RescoreJob]" = OrderedDict()
+
+
+def get_job(template_id: uuid.UUID, job_id: uuid.UUID) -> Optional[RescoreJob]:
+    job = jobs.get(job_id)
+    if job is None or job.template_id != template_id:
+        return None
+    return job
+
+
+def start_rescore(template_id: uuid.UUID) -> RescoreJob:
+    for job in jobs.values():
+        if job.template_id == template_id and job.active:
+            return job
+    job = RescoreJob(template_id)
+    jobs[job.id] = job
+    while len(jobs) > settings.RESCORE_JOB_HISTORY:
+        oldest = next(iter(jobs.values()))
+        if oldest.active:
+            break
+        jobs.popitem(last=False)
+    job._task = asyncio.create_task(_run(job))
+    return job
+
+
+async def _run(job: RescoreJob) -> None:
+    job.status = "running"
+    try:
+        with start_span("template_rescore") as span:
+            span.attributes["template_id"] = str(job.template_id)
+            changed = await _rescore(job)
+            if changed:
+                # Pushed results carry percentiles of the rescored sketch.
+                await score_sketches.rebuild(job.template_id)
+                await _push_results(job, changed)
+            span.attributes["sessions"] = job.sessions_processed
+            span.attributes["changed"] = job.sessions_changed
+        job._finish("completed")
+    except Exception as e:
+        logger.exception("Rescore of template %s failed", job.template_id)
+        job.error = str(e)
+        job._finish("failed")
+
+
+async def _rescore(job: RescoreJob) -> List[tuple]:
+    scored = (TestSession.template_id == job.template_id) & (
+        TestSession.status != "in_progress"
+    )
+    async with async_session() as write_db:
+        # Sessions are scored by the current version, whatever version they
+        # are pinned to; those whose score changes are re-pinned to it.
+        key = await load_answer_key(write_db, job.template_id)
+        job.sessions_total = (
+            await write_db.execute(select(func.count(TestSession.id)).where(scored))
+        ).scalar_one()
+        await write_db.commit()
+
+        # Rows arrive ordered by session, so all answers of one session are
+        # contiguous; the tail session of a partition is carried over to the
+        # next one in case it continues there.
+        async with engine.connect() as read_conn:
+            result = await read_conn.stream(
+                select(
+                    TestSession.id,
+                    TestSession.application_id,
+                    TestSession.score,
+                    TestSession.max_score,
+                    TestSession.answer_option_ids,
+                    TestSession.callback_due_at,
+                    SessionAnswer.answer_id,
+                )
+                .outerjoin(SessionAnswer, SessionAnswer.session_id == TestSession.id)
+                .where(scored)
+                .order_by(TestSession.id, SessionAnswer.created_at, SessionAnswer.id)
+                .execution_options(yield_per=settings.RESCORE_BATCH_SIZE)
+            )
+            carry: List[Row] = []
+            changed: List[tuple] = []
+            async for partition in result.partitions():
+                rows = carry + partition
+                split = len(rows)
+                while split > 0 and rows[split - 1].id == rows[-1].id:
+                    split -= 1
+                carry = rows[split:]
+                if split:
+                    changed += await _rescore_batch(job, key, rows[:split], write_db)
+            if carry:
+                changed += await _rescore_batch(job, key, carry, write_db)
+    return changed
+
+
+async def _rescore_batch(
+    job: RescoreJob, key: AnswerKey, rows: Sequence[Row], write_db
+) -> List[tuple]:
+    sessions: List[Row] = []
+    for row in rows:
+        if not sessions or sessions[-1].id != row.id:
+            sessions.append(row)
+    position = {s.id: i for i, s in enumerate(sessions)}
+    answer_sessions, answer_ids = flatten_answers(
+        (row.id, row.answer_option_ids, row.answer_id) for row in rows
+    )
+    session_pos = np.fromiter(
+        (position[session_id] for session_id in answer_sessions),
+        np.int64,
+        len(answer_sessions),
+    )
+    option_pos = key.option_positions(answer_ids)
+    given = key.given([s.id for s in sessions])
+    new_scores = key.score(session_pos, option_pos, len(sessions), given)
+    new_max = key.max_scores(given, len(sessions))
+    new_percents = key.percent(new_scores, new_max)
+    old_scores = np.array(
+        [s.score if s.score is not None else np.nan for s in sessions], np.float64
+    )
+    old_max = np.array(
+        [s.max_score if s.max_score is not None else np.nan for s in sessions],
+        np.float64,
+    )
+    stale = ~np.isclose(new_scores, old_scores) | ~np.isclose(new_max, old_max)
+    changed = [
+        (sessions[i], float(new_scores[i]), float(new_max[i]), float(new_percents[i]))
+        for i in np.flatnonzero(stale)
+    ]
+
+    if changed:
+        rows_values = values(
+            column("id", PG_UUID(as_uuid=True)),
+            column("score", Float),
+            column("max_score", Float),
+            column("score_percent", Float),
+            name="v",
+        ).data([(s.id, *result) for s, *result in changed])
+        await write_db.execute(
+            update(TestSession)
+            .where(TestSession.id == rows_values.c.id)
+            .values(
+                score=rows_values.c.score,
+                max_score=rows_values.c.max_score,
+                score_percent=rows_values.c.score_percent,
+                template_version_id=key.version_id,
+                # Sent again by the sweeper unless the push is acknowledged.
+                callback_due_at=func.now()
+                + timedelta(seconds=settings.SESSION_CALLBACK_LEASE_SECONDS),
+                callback_attempts=0,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await write_db.commit()
+
+    job.sessions_processed += len(sessions)
+    job.sessions_changed += len(changed)
+    return [
+        (s.id, s.application_id, s.callback_due_at is not None, *result)
+        for s, *result in changed
+    ]
+
+
+async def _push_results(job: RescoreJob, changed: List[tuple]) -> None:
+    # The bulk endpoint only updates scores, so sessions whose finish was
+    # not acknowledged yet go through the callback, which also sets the
+    # application's status.
+    unacknowledged = [c for c in changed if c[2]]
+    acknowledged = await send_result_callbacks(
+        [
+            {
+                "session_id": session_id,
+                "application_id": application_id,
+                "score": score,
+                "max_score": max_score,
+                "score_percent": percent,
+                "traceparent": current_traceparent(),
+                "score_percentile": score_sketches.percentile(job.template_id, percent),
+            }
+            for session_id, application_id, _, score, max_score, percent in (
+                unacknowledged
+            )
+        ],
+        concurrency=settings.SESSION_CALLBACK_CONCURRENCY,
+    )
+    job.results_pushed += acknowledged
+    job.push_failures += len(unacknowledged) - acknowledged
+
+    bulk = [c for c in changed if not c[2]]
+    size = settings.RESCORE_PUSH_BATCH_SIZE
+    for start in range(0, len(bulk), size):
+        chunk = bulk[start : start + size]
+        payload = {
+            "results": [
+                {
+                    "application_id": str(application_id),
+                    "session_id": str(session_id),
+                    "score": score,
+                    "max_score": max_score,
+                    "score_percent": percent,
+                    "score_percentile": score_sketches.percentile(
+                        job.template_id, percent
+                    ),
+                }
+                for session_id, application_id, _, score, max_score, percent in chunk
+            ],
+            "traceparent": current_traceparent(),
+        }
+        try:
+            resp = await interservice.request(
+                "POST",
+                f"{settings.CANDIDATE_SERVICE_URL}/applications/test-results",
+                peer="candidate_service",
+                idempotent=True,
+                json=payload,
+                timeout=30.0,
+            )
+            resp.raise_for_status()
+        except httpx.HTTPError as e:
+            job.push_failures += len(chunk)
+            logger.warning("Failed to push rescored results: %s", e)
+            continue
+        job.results_pushed += len(chunk)
+        try:
+            async with async_session() as db:
+                await db.execute(
+                    update(TestSession)
+                    .where(TestSession.id.in_([c[0] for c in chunk]))
+                    .values(callback_due_at=None, callback_attempts=0)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+        except SQLAlchemyError:
+            # The sweeper sends the results again once their lease runs out.
+            logger.exception("Failed to record pushed rescored results")
@@ -0,0 +1,199 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import DateTime, Select, column, func, literal_column, select, true
+from sqlalchemy import union_all
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.engine import Row
+
+from src.answers.models import AnswerOption
+from src.config import settings
+from src.database import engine
+from src.questions.models import Question
+from src.sessions.models import SessionAnswer, TestSession
+
+SESSION_FIELDS = (
+    "session_id",
+    "application_id",
+    "candidate_email",
+    "status",
+    "template_version_id",
+    "started_at",
+    "finished_at",
+    "score",
+    "max_score",
+    "score_percent",
+)
+ANSWER_FIELDS = (
+    "question_id",
+    "question_text",
+    "answer_id",
+    "answer_text",
+    "answered_at",
+)
+
+
+def _results_query(template_id: UUID, include_answers: bool) -> Select:
+    stmt = (
+        select(
+            TestSession.id.label("session_id"),
+            TestSession.application_id,
+            TestSession.candidate_email,
+            TestSession.status,
+            TestSession.template_version_id,
+            TestSession.started_at,
+            TestSession.finished_at,
+            TestSession.score,
+            TestSession.max_score,
+            TestSession.score_percent,
+        )
+        .select_from(TestSession)
+        .where(TestSession.template_id == template_id)
+        .order_by(TestSession.created_at, TestSession.id)
+    )
+    if not include_answers:
+        return stmt
+
+    # A compacted session has its answers in arrays rather than rows (see
+    # src.sessions.storage); the other kind has no arrays, so the union
+    # yields each session's answers exactly once.
+    packed = (
+        func.unnest(
+            TestSession.answer_question_ids,
+            TestSession.answer_option_ids,
+            TestSession.answer_times,
+        )
+        .table_valued(
+            column("question_id", PG_UUID(as_uuid=True)),
+            column("answer_id", PG_UUID(as_uuid=True)),
+            column("created_at", DateTime(timezone=True)),
+        )
+        .render_derived("packed")
+    )
+    answers = union_all(
+        select(
+            SessionAnswer.question_id, SessionAnswer.answer_id, SessionAnswer.created_at
+        ).where(SessionAnswer.session_id == TestSession.id),
+        select(packed.c.question_id, packed.c.answer_id, packed.c.created_at),
+    ).lateral("answers")
+    return (
+        stmt.add_columns(
+            answers.c.question_id,
+            Question.text.label("question_text"),
+            answers.c.answer_id,
+            AnswerOption.text.label("answer_text"),
+            answers.c.created_at.label("answered_at"),
+        )
+        .outerjoin(answers, true())
+        .outerjoin(Question, Question.id == answers.c.question_id)
+        .outerjoin(AnswerOption, AnswerOption.id == answers.c.answer_id)
+        .order_by(literal_column("answered_at"))
+    )
+
+
+def _text(value) -> object:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+class _CsvEncoder:
+    """One line per session, or per answer with the session repeated."""
+
+    def __init__(self, include_answers: bool):
+        self.fields = SESSION_FIELDS + (ANSWER_FIELDS if include_answers else ())
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._writer.writerow(self.fields)
+
+    def encode(self, rows: Sequence[Row]) -> bytes:
+        for row in rows:
+            self._writer.writerow([_text(value) for value in row])
+        return self._take()
+
+    def finish(self) -> bytes:
+        return self._take()
+
+    def _take(self) -> bytes:
+        data = self._buffer.getvalue().encode()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+
+class _NdjsonEncoder:
+    """One object per session, with its answers nested when included.
+
+    Rows arrive grouped by session, so only the session being read is held;
+    it is written once the next one starts.
+    """
+
+    def __init__(self, include_answers: bool):
+        self.include_answers = include_answers
+        self._current: Optional[dict] = None
+
+    def encode(self, rows: Sequence[Row]) -> bytes:
+        lines: List[str] = []
+        for row in rows:
+            if not self.include_answers:
+                lines.append(self._dump(dict(zip(SESSION_FIELDS, row))))
+                continue
+            if self._current is None or self._current["session_id"] != row[0]:
+                if self._current is not None:
+                    lines.append(self._dump(self._current))
+                self._current = dict(zip(SESSION_FIELDS, row))
+                self._current["answers"] = []
+            if row.question_id is not None:
+                self._current["answers"].append(
+                    dict(zip(ANSWER_FIELDS, row[len(SESSION_FIELDS) :]))
+                )
+        return "".join(lines).encode()
+
+    def finish(self) -> bytes:
+        if self._current is None:
+            return b""
+        line, self._current = self._dump(self._current), None
+        return line.encode()
+
+    @staticmethod
+    def _dump(record: dict) -> str:
+        return json.dumps(record, default=_text) + "\n"
+
+
+async def export_results(
+    template_id: UUID, export_format: str, include_answers: bool, gzip: bool
+) -> AsyncIterator[bytes]:
+    """Stream every session of a template, optionally with its answers.
+
+    Rows are read through a server-side cursor one batch at a time and each
+    batch is encoded (and compressed) before the next is fetched, so memory
+    stays flat however many sessions the template has.
+    """
+    encoder = (_NdjsonEncoder if export_format == "ndjson" else _CsvEncoder)(
+        include_answers
+    )
+    compressor = zlib.compressobj(wbits=31) if gzip else None
+    async with engine.connect() as conn:
+        result = await conn.stream(
+            _results_query(template_id, include_answers).execution_options(
+                yield_per=settings.RESULTS_EXPORT_BATCH_SIZE
+            )
+        )
+        async for partition in result.partitions():
+            chunk = encoder.encode(partition)
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+    chunk = encoder.finish()
+    if compressor is not None:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
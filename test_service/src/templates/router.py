@@ -1,12 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
 from uuid import UUID
 
-from src.templates.schemas import TemplateCreate, TemplateRead
+from src.templates.schemas import (
+    TemplateCreate,
+    TemplateRead,
+    TemplateTree,
+    RescoreJobRead,
+    TemplateAnalytics,
+    CalibrationRead,
+    TemplateClone,
+    TemplateDocument,
+)
+from src.templates import results_export
 from src.templates.dependencies import get_template_service, valid_template_id
+from src.templates.rescore import get_job, start_rescore
 from src.templates.service import TemplateService
+from src.timing import TimedRoute
 
-router = APIRouter(prefix="/templates", tags=["templates"])
+router = APIRouter(prefix="/templates", tags=["templates"], route_class=TimedRoute)
 
 
 @router.post("/", response_model=TemplateRead, status_code=status.HTTP_201_CREATED)
@@ -17,6 +30,16 @@ async def create_template(
     return await service.create_template(data)
 
 
+@router.post(
+    "/import", response_model=TemplateRead, status_code=status.HTTP_201_CREATED
+)
+async def import_template(
+    document: TemplateDocument,
+    service: TemplateService = Depends(get_template_service),
+):
+    return await service.import_template(document)
+
+
 @router.get("/{template_id}", response_model=TemplateRead)
 async def read_template(
     template: dict = Depends(valid_template_id),
@@ -24,6 +47,128 @@ async def read_template(
     return template
 
 
+@router.get("/{template_id}/full", response_model=TemplateTree)
+async def read_template_tree(
+    template_id: UUID,
+    request: Request,
+    include_correct: bool = False,
+    service: TemplateService = Depends(get_template_service),
+):
+    tree = await service.get_template_tree(template_id, include_correct)
+    if not tree:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Template not found"
+        )
+    content_hash, body = tree
+    etag = f'"{content_hash}{"-keyed" if include_correct else ""}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+        )
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+@router.get("/{template_id}/export", response_model=TemplateDocument)
+async def export_template(
+    template_id: UUID,
+    service: TemplateService = Depends(get_template_service),
+):
+    document = await service.export_template(template_id)
+    if document is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Template not found"
+        )
+    return document
+
+
+@router.get("/{template_id}/results/export")
+async def export_results(
+    template_id: UUID,
+    export_format: Literal["csv", "ndjson"] = Query(default="csv", alias="format"),
+    include: Optional[Literal["answers"]] = None,
+    compress: Optional[Literal["gzip"]] = None,
+    template: dict = Depends(valid_template_id),
+):
+    filename = f"{template_id}-results.{export_format}"
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    if compress == "gzip":
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        results_export.export_results(
+            template_id, export_format, include == "answers", compress == "gzip"
+        ),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post(
+    "/{template_id}/clone",
+    response_model=TemplateRead,
+    status_code=status.HTTP_201_CREATED,
+)
+async def clone_template(
+    template_id: UUID,
+    data: TemplateClone = TemplateClone(),
+    service: TemplateService = Depends(get_template_service),
+):
+    cloned = await service.clone_template(template_id, data)
+    if cloned is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Template not found"
+        )
+    return cloned
+
+
+@router.get("/{template_id}/analytics", response_model=TemplateAnalytics)
+async def read_template_analytics(
+    template_id: UUID,
+    service: TemplateService = Depends(get_template_service),
+):
+    body = await service.get_template_analytics(template_id)
+    if body is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Template not found"
+        )
+    return Response(content=body, media_type="application/json")
+
+
+@router.post("/{template_id}/calibrate", response_model=CalibrationRead)
+async def calibrate_template(
+    template_id: UUID,
+    service: TemplateService = Depends(get_template_service),
+):
+    calibration = await service.calibrate_template(template_id)
+    if calibration is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Template not found"
+        )
+    return calibration
+
+
+@router.post(
+    "/{template_id}/rescore",
+    response_model=RescoreJobRead,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def rescore_template(
+    template_id: UUID,
+    template: dict = Depends(valid_template_id),
+):
+    return start_rescore(template_id)
+
+
+@router.get("/{template_id}/rescore/{job_id}", response_model=RescoreJobRead)
+async def read_rescore_job(template_id: UUID, job_id: UUID):
+    job = get_job(template_id, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Rescore job not found"
+        )
+    return job
+
+
 @router.get("/", response_model=List[TemplateRead])
 async def list_templates(
     limit: int = Query(default=10, ge=1),
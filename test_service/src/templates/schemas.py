@@ -1,12 +1,18 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 
 
 class TemplateBase(BaseModel):
     title: str = Field(min_length=1, max_length=100)
     description: Optional[str] = None
+    time_limit_minutes: Optional[int] = Field(default=None, ge=1)
+    shuffle_questions: bool = False
+    shuffle_options: bool = False
+    questions_per_session: Optional[int] = Field(default=None, ge=1)
+    adaptive: bool = False
+    adaptive_target_se: Optional[float] = Field(default=None, gt=0)
 
 
 class TemplateCreate(TemplateBase):
@@ -19,3 +25,149 @@ class TemplateRead(TemplateBase):
     updated_at: Optional[datetime]
 
     model_config = {"from_attributes": True}
+
+
+class AnswerOptionPublic(BaseModel):
+    id: UUID
+    text: str
+
+    model_config = {"from_attributes": True}
+
+
+class AnswerOptionKeyed(AnswerOptionPublic):
+    correct: bool
+    credit: Optional[float]
+
+
+class QuestionTree(BaseModel):
+    id: UUID
+    text: str
+    weight: float
+    penalty: float
+    answers: List[AnswerOptionPublic]
+
+    model_config = {"from_attributes": True}
+
+
+class QuestionTreeKeyed(QuestionTree):
+    answers: List[AnswerOptionKeyed]
+
+
+class TemplateTree(TemplateRead):
+    content_version: int
+    questions: List[QuestionTree]
+
+
+class TemplateTreeKeyed(TemplateTree):
+    questions: List[QuestionTreeKeyed]
+
+
+class QuestionVersion(QuestionTreeKeyed):
+    difficulty: Optional[float]
+
+
+class TemplateVersionContent(TemplateTree):
+    """Everything a template version fixes: the keyed tree and calibration."""
+
+    questions: List[QuestionVersion]
+
+
+class AnswerOptionDocument(BaseModel):
+    text: str
+    correct: bool = False
+    credit: Optional[float] = Field(default=None, ge=0, le=1)
+
+    model_config = {"from_attributes": True}
+
+
+class QuestionDocument(BaseModel):
+    text: str = Field(min_length=1)
+    weight: float = Field(default=1.0, gt=0)
+    penalty: float = Field(default=0.0, ge=0, le=1)
+    difficulty: Optional[float] = None
+    answers: List[AnswerOptionDocument] = Field(default_factory=list, max_length=100)
+
+    model_config = {"from_attributes": True}
+
+
+class TemplateDocument(TemplateBase):
+    """A whole template without ids, as exported and imported."""
+
+    questions: List[QuestionDocument] = Field(default_factory=list, max_length=2000)
+
+    model_config = {"from_attributes": True}
+
+
+class TemplateClone(BaseModel):
+    title: Optional[str] = Field(default=None, min_length=1, max_length=100)
+
+
+class RescoreJobRead(BaseModel):
+    id: UUID
+    template_id: UUID
+    status: str
+    sessions_total: int
+    sessions_processed: int
+    sessions_changed: int
+    results_pushed: int
+    push_failures: int
+    elapsed_seconds: float
+    sessions_per_second: float
+    started_at: datetime
+    finished_at: Optional[datetime]
+    error: Optional[str]
+
+    model_config = {"from_attributes": True}
+
+
+class QuestionCalibration(BaseModel):
+    id: UUID
+    answered: int
+    difficulty: Optional[float]
+
+
+class CalibrationRead(BaseModel):
+    template_id: UUID
+    sessions: int
+    iterations: int
+    questions: List[QuestionCalibration]
+    calibrated_at: datetime
+
+
+class OptionAnalytics(BaseModel):
+    id: UUID
+    text: str
+    correct: bool
+    points: float
+    count: int
+    share: Optional[float]
+
+
+class QuestionAnalytics(BaseModel):
+    id: UUID
+    text: str
+    weight: float
+    answered: int
+    p_value: Optional[float]
+    discrimination: Optional[float]
+    options: List[OptionAnalytics]
+
+
+class ScoreBucket(BaseModel):
+    percent_from: int
+    percent_to: int
+    count: int
+
+
+class TemplateAnalytics(BaseModel):
+    template_id: UUID
+    content_version: int
+    sessions: int
+    max_score: float
+    mean_score: Optional[float]
+    score_std: Optional[float]
+    median_score: Optional[float]
+    reliability_alpha: Optional[float]
+    score_distribution: List[ScoreBucket]
+    questions: List[QuestionAnalytics]
+    computed_at: datetime
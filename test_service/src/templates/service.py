@@ -1,12 +1,182 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+import itertools
+import json
+import math
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import (
+    Float,
+    bindparam,
+    column,
+    func,
+    insert,
+    literal,
+    select,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID, aggregate_order_by
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from typing import List, Optional
-from uuid import UUID
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import List, Optional, Tuple
+from uuid import UUID, uuid4
 from fastapi import HTTPException, status
 
+from src.answers.models import AnswerOption
+from src.cache import LRUCache
+from src.config import settings
+from src.questions.models import Question
+from src.adaptive import fit_rasch
+from src.scoring import AnswerKey, load_answer_key
+from src.sessions.models import TestSession, SessionAnswer
+from src.sessions.shuffle import arrange
+from src.templates.analytics import item_analysis
+from src.templates.versions import get_version, version_content
 from src.templates.models import TestTemplate
-from src.templates.schemas import TemplateCreate, TemplateRead
+from src.templates.schemas import (
+    TemplateCreate,
+    TemplateRead,
+    TemplateTree,
+    TemplateTreeKeyed,
+    TemplateAnalytics,
+    CalibrationRead,
+    TemplateClone,
+    TemplateDocument,
+)
+
+tree_cache: LRUCache[Tuple[bool, bool, bytes]] = LRUCache(
+    settings.TEMPLATE_TREE_CACHE_SIZE
+)
+analytics_cache: LRUCache[Tuple[tuple, bytes]] = LRUCache(settings.ANALYTICS_CACHE_SIZE)
+
+
+def _finite(value) -> Optional[float]:
+    value = float(value)
+    return round(value, 4) if math.isfinite(value) else None
+
+
+def _packed_picks(answer_key: AnswerKey, option_ids) -> np.ndarray:
+    positions = answer_key.option_positions(option_ids)
+    return positions[positions >= 0]
+
+
+def _arrange_tree(
+    body: bytes, session_id: UUID, served: Optional[List[UUID]] = None
+) -> bytes:
+    tree = json.loads(body)
+    questions = tree["questions"]
+    if tree["adaptive"]:
+        # Only what /next has served so far, in the order it was served.
+        position = {question["id"]: i for i, question in enumerate(questions)}
+        questions = [
+            questions[position[str(question_id)]]
+            for question_id in served or ()
+            if str(question_id) in position
+        ]
+        tree["questions"] = questions
+    tree["questions"] = [
+        {**questions[q], "answers": [questions[q]["answers"][o] for o in options]}
+        for q, options in arrange(
+            session_id,
+            [UUID(question["id"]) for question in questions],
+            [[UUID(option["id"]) for option in q["answers"]] for q in questions],
+            None if tree["adaptive"] else tree["questions_per_session"],
+            tree["shuffle_questions"] and not tree["adaptive"],
+            tree["shuffle_options"],
+        )
+    ]
+    return json.dumps(tree, separators=(",", ":")).encode()
+
+
+# Copies get creation times a microsecond apart in the source order, so
+# questions and options keep their order under new random ids.
+_ORDER_STEP = timedelta(microseconds=1)
+
+_TEMPLATE_SETTINGS = (
+    "description",
+    "time_limit_minutes",
+    "shuffle_questions",
+    "shuffle_options",
+    "questions_per_session",
+    "adaptive",
+    "adaptive_target_se",
+)
+
+
+def _clone_content(source_id: UUID, target_id: UUID):
+    """One statement copying the questions and answer options of a
+    template, mapping each old question id to its new one in a CTE."""
+    source = (
+        select(
+            Question.id.label("old_id"),
+            func.gen_random_uuid().label("new_id"),
+            Question.text,
+            Question.weight,
+            Question.penalty,
+            Question.difficulty,
+            func.row_number()
+            .over(order_by=(Question.created_at, Question.id))
+            .label("position"),
+        )
+        .where(Question.template_id == source_id)
+        .where(Question.retired_at.is_(None))
+        .cte("source")
+    )
+    questions = (
+        insert(Question)
+        .from_select(
+            [
+                "id",
+                "template_id",
+                "text",
+                "weight",
+                "penalty",
+                "difficulty",
+                "created_at",
+            ],
+            select(
+                source.c.new_id,
+                literal(target_id, PG_UUID(as_uuid=True)),
+                source.c.text,
+                source.c.weight,
+                source.c.penalty,
+                source.c.difficulty,
+                func.now() + source.c.position * literal(_ORDER_STEP),
+            ),
+        )
+        .cte("questions")
+    )
+    position = func.row_number().over(
+        partition_by=AnswerOption.question_id,
+        order_by=(AnswerOption.created_at, AnswerOption.id),
+    )
+    return (
+        insert(AnswerOption)
+        .from_select(
+            ["id", "question_id", "text", "correct", "credit", "created_at"],
+            select(
+                func.gen_random_uuid(),
+                source.c.new_id,
+                AnswerOption.text,
+                AnswerOption.correct,
+                AnswerOption.credit,
+                func.now() + position * literal(_ORDER_STEP),
+            )
+            .join(source, source.c.old_id == AnswerOption.question_id)
+            .where(AnswerOption.retired_at.is_(None)),
+        )
+        .add_cte(questions)
+    )
+
+
+async def bump_content_version(db: AsyncSession, template_id) -> None:
+    await db.execute(
+        update(TestTemplate)
+        .where(TestTemplate.id == template_id)
+        .values(content_version=TestTemplate.content_version + 1)
+    )
 
 
 class TemplateService:
@@ -48,6 +218,406 @@ class TemplateService:
                 detail=f"Database error: {str(e)}",
             )
 
+    async def get_template_tree(
+        self,
+        template_id: UUID,
+        include_correct: bool = False,
+        session_id: Optional[UUID] = None,
+        version_id: Optional[UUID] = None,
+    ) -> Optional[Tuple[str, bytes]]:
+        """Content hash and JSON of a template version with its questions,
+        by default the current version.
+
+        With ``session_id`` the questions are sampled and ordered as that
+        session is given them; of an adaptive template only those served to
+        it so far are listed.
+        """
+        try:
+            version = await get_version(self.db, template_id, version_id)
+            if version is None:
+                return None
+            key = (version.content_hash, include_correct)
+            cached = tree_cache.get(key)
+            if cached is None:
+                schema = TemplateTreeKeyed if include_correct else TemplateTree
+                tree = schema.model_validate_json(
+                    await version_content(self.db, version)
+                )
+                arranged = (
+                    tree.shuffle_questions
+                    or tree.shuffle_options
+                    or tree.questions_per_session is not None
+                    or tree.adaptive
+                )
+                cached = (arranged, tree.adaptive, tree.model_dump_json().encode())
+                tree_cache.set(key, cached)
+            content_hash = version.content_hash
+            arranged, adaptive, body = cached
+            if session_id is not None and arranged:
+                served = None
+                if adaptive:
+                    served = (
+                        await self.db.execute(
+                            select(TestSession.served_question_ids).where(
+                                TestSession.id == session_id
+                            )
+                        )
+                    ).scalar_one_or_none()
+                    # The listing grows as questions are served.
+                    content_hash = f"{content_hash}.{len(served or ())}"
+                body = _arrange_tree(body, session_id, served)
+            return content_hash, body
+        except SQLAlchemyError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}",
+            )
+
+    async def get_template_analytics(self, template_id: UUID) -> Optional[bytes]:
+        try:
+            result = await self.db.execute(
+                select(TestTemplate.content_version).where(
+                    TestTemplate.id == template_id
+                )
+            )
+            content_version = result.scalar_one_or_none()
+            if content_version is None:
+                return None
+
+            finished = (TestSession.template_id == template_id) & (
+                TestSession.status != "in_progress"
+            )
+            result = await self.db.execute(
+                select(
+                    func.count(TestSession.id), func.max(TestSession.finished_at)
+                ).where(finished)
+            )
+            stamp = (content_version, *result.one())
+            cached = analytics_cache.get(template_id)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+
+            answer_key = await load_answer_key(self.db, template_id)
+            question_text = dict(
+                (
+                    await self.db.execute(
+                        select(Question.id, Question.text).where(
+                            Question.template_id == template_id
+                        )
+                    )
+                ).all()
+            )
+            options = {
+                o.id: o
+                for o in (
+                    await self.db.execute(
+                        select(AnswerOption.id, AnswerOption.text, AnswerOption.correct)
+                        .join(Question, Question.id == AnswerOption.question_id)
+                        .where(Question.template_id == template_id)
+                    )
+                ).all()
+            }
+
+            session_ids, session_pos, option_pos = await self._finished_picks(
+                template_id, answer_key
+            )
+            n_sessions = len(session_ids)
+            given = answer_key.given(session_ids)
+            session_pos, option_pos = answer_key.last_answers(session_pos, option_pos)
+            points, answered = answer_key.item_scores(
+                session_pos, option_pos, n_sessions, given
+            )
+            stats = item_analysis(
+                points,
+                answer_key.question_max,
+                answer_key.max_scores(given, n_sessions),
+                given,
+            )
+
+            option_counts = np.bincount(
+                option_pos, minlength=len(answer_key.option_ids)
+            )
+            answered_counts = answered.sum(axis=0)
+            question_options = [[] for _ in answer_key.question_ids]
+            for oi, question in enumerate(answer_key.option_question):
+                question_options[question].append(oi)
+            edges = stats["histogram_edges"]
+            analytics = TemplateAnalytics(
+                template_id=template_id,
+                content_version=content_version,
+                sessions=n_sessions,
+                max_score=answer_key.max_score,
+                mean_score=_finite(stats["mean_score"]),
+                score_std=_finite(stats["score_std"]),
+                median_score=_finite(stats["median_score"]),
+                reliability_alpha=_finite(stats["reliability_alpha"]),
+                score_distribution=[
+                    {
+                        "percent_from": int(edges[i]),
+                        "percent_to": int(edges[i + 1]),
+                        "count": int(count),
+                    }
+                    for i, count in enumerate(stats["score_histogram"])
+                ],
+                questions=[
+                    {
+                        "id": question_id,
+                        "text": question_text.get(question_id, ""),
+                        "weight": float(answer_key.weights[qi]),
+                        "answered": int(answered_counts[qi]),
+                        "p_value": _finite(stats["p_values"][qi]),
+                        "discrimination": _finite(stats["discrimination"][qi]),
+                        "options": [
+                            {
+                                "id": answer_key.option_ids[oi],
+                                "text": options[answer_key.option_ids[oi]].text,
+                                "correct": options[answer_key.option_ids[oi]].correct,
+                                "points": float(answer_key.points[oi]),
+                                "count": int(option_counts[oi]),
+                                "share": (
+                                    round(option_counts[oi] / answered_counts[qi], 4)
+                                    if answered_counts[qi]
+                                    else None
+                                ),
+                            }
+                            for oi in question_options[qi]
+                        ],
+                    }
+                    for qi, question_id in enumerate(answer_key.question_ids)
+                ],
+                computed_at=datetime.now(timezone.utc),
+            )
+            body = analytics.model_dump_json().encode()
+            analytics_cache.set(template_id, (stamp, body))
+            return body
+        except SQLAlchemyError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}",
+            )
+
+    async def calibrate_template(self, template_id: UUID) -> Optional[CalibrationRead]:
+        """Fit Rasch difficulties to the most recent finished sessions."""
+        try:
+            answer_key = await load_answer_key(self.db, template_id)
+            if answer_key is None:
+                return None
+            session_ids, session_pos, option_pos = await self._finished_picks(
+                template_id, answer_key, settings.ADAPTIVE_CALIBRATION_MAX_SESSIONS
+            )
+            correct, answered = answer_key.responses(
+                session_pos, option_pos, len(session_ids)
+            )
+            answered_sessions = answered.any(axis=1)
+            correct, answered = (
+                correct[answered_sessions],
+                answered[answered_sessions],
+            )
+            difficulties, _, iterations = fit_rasch(correct, answered)
+            answered_counts = answered.sum(axis=0)
+            calibrated = [
+                (question_id, float(difficulties[qi]) if answered_counts[qi] else None)
+                for qi, question_id in enumerate(answer_key.question_ids)
+            ]
+            if calibrated:
+                rows = values(
+                    column("id", PG_UUID(as_uuid=True)),
+                    column("difficulty", Float),
+                    name="v",
+                ).data(calibrated)
+                await self.db.execute(
+                    update(Question)
+                    .where(Question.id == rows.c.id)
+                    .values(difficulty=rows.c.difficulty)
+                    .execution_options(synchronize_session=False)
+                )
+            await bump_content_version(self.db, template_id)
+            await self.db.commit()
+            return CalibrationRead(
+                template_id=template_id,
+                sessions=len(correct),
+                iterations=iterations,
+                questions=[
+                    {
+                        "id": question_id,
+                        "answered": int(answered_counts[qi]),
+                        "difficulty": (
+                            round(difficulty, 4) if difficulty is not None else None
+                        ),
+                    }
+                    for qi, (question_id, difficulty) in enumerate(calibrated)
+                ],
+                calibrated_at=datetime.now(timezone.utc),
+            )
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}",
+            )
+
+    async def _finished_picks(
+        self, template_id: UUID, answer_key: AnswerKey, limit: Optional[int] = None
+    ) -> Tuple[List[UUID], np.ndarray, np.ndarray]:
+        """Ids of finished sessions, most recent first when limited, and the
+        session and answer-key option positions of their answers."""
+        # One row per finished session holding the answer-key positions
+        # it picked in answer order, so only small integers cross the wire.
+        # Compacted sessions have no answer rows and bring their packed
+        # option ids instead.
+        key = (
+            func.unnest(
+                bindparam(
+                    "option_ids",
+                    answer_key.option_ids,
+                    ARRAY(PG_UUID(as_uuid=True)),
+                )
+            )
+            .table_valued("id", with_ordinality="pos")
+            .render_derived(name="k")
+        )
+        stmt = (
+            select(
+                TestSession.id,
+                func.array_agg(
+                    aggregate_order_by(key.c.pos - 1, SessionAnswer.created_at)
+                ).filter(key.c.pos.is_not(None)),
+                TestSession.answer_option_ids,
+            )
+            .select_from(TestSession)
+            .outerjoin(SessionAnswer, SessionAnswer.session_id == TestSession.id)
+            .outerjoin(key, key.c.id == SessionAnswer.answer_id)
+            .where(TestSession.template_id == template_id)
+            .where(TestSession.status != "in_progress")
+            .group_by(TestSession.id)
+        )
+        if limit is not None:
+            stmt = stmt.order_by(TestSession.finished_at.desc()).limit(limit)
+        session_ids = []
+        per_session = []
+        for session_id, picks, packed in await self.db.execute(stmt):
+            session_ids.append(session_id)
+            per_session.append(
+                _packed_picks(answer_key, packed) if packed is not None else picks or ()
+            )
+        n_sessions = len(session_ids)
+        session_pos = np.repeat(
+            np.arange(n_sessions),
+            np.fromiter(map(len, per_session), np.int64, n_sessions),
+        )
+        option_pos = np.fromiter(itertools.chain.from_iterable(per_session), np.int64)
+        return session_ids, session_pos, option_pos
+
+    async def clone_template(
+        self, template_id: UUID, data: TemplateClone
+    ) -> Optional[TemplateRead]:
+        try:
+            copied = (
+                await self.db.execute(
+                    insert(TestTemplate)
+                    .from_select(
+                        ["id", "title", *_TEMPLATE_SETTINGS],
+                        select(
+                            literal(uuid4(), PG_UUID(as_uuid=True)),
+                            func.coalesce(data.title, TestTemplate.title),
+                            *(getattr(TestTemplate, f) for f in _TEMPLATE_SETTINGS),
+                        ).where(TestTemplate.id == template_id),
+                    )
+                    .returning(*TestTemplate.__table__.c)
+                )
+            ).one_or_none()
+            if copied is None:
+                return None
+            await self.db.execute(_clone_content(template_id, copied.id))
+            await self.db.commit()
+            return TemplateRead.model_validate(copied)
+        except IntegrityError as e:
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Failed to clone template: {str(e)}",
+            )
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}",
+            )
+
+    async def import_template(self, document: TemplateDocument) -> TemplateRead:
+        try:
+            template = TestTemplate(**document.model_dump(exclude={"questions"}))
+            self.db.add(template)
+            await self.db.flush()
+
+            created_at = datetime.now(timezone.utc)
+            questions, options = [], []
+            for i, question in enumerate(document.questions):
+                question_id = uuid4()
+                questions.append(
+                    {
+                        **question.model_dump(exclude={"answers"}),
+                        "id": question_id,
+                        "template_id": template.id,
+                        "created_at": created_at + i * _ORDER_STEP,
+                    }
+                )
+                options.extend(
+                    {
+                        **option.model_dump(),
+                        "id": uuid4(),
+                        "question_id": question_id,
+                        "created_at": created_at + j * _ORDER_STEP,
+                    }
+                    for j, option in enumerate(question.answers)
+                )
+            if questions:
+                await self.db.execute(insert(Question), questions)
+            if options:
+                await self.db.execute(insert(AnswerOption), options)
+            await self.db.commit()
+            await self.db.refresh(template)
+            return TemplateRead.model_validate(template)
+        except IntegrityError as e:
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Failed to import template: {str(e)}",
+            )
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}",
+            )
+
+    async def export_template(self, template_id: UUID) -> Optional[TemplateDocument]:
+        try:
+            result = await self.db.execute(
+                select(TestTemplate).where(TestTemplate.id == template_id)
+            )
+            template = result.scalar_one_or_none()
+            if not template:
+                return None
+            questions = await self.db.execute(
+                select(Question)
+                .where(Question.template_id == template_id)
+                .where(Question.retired_at.is_(None))
+                .options(
+                    selectinload(
+                        Question.answers.and_(AnswerOption.retired_at.is_(None))
+                    )
+                )
+                .order_by(Question.created_at, Question.id)
+            )
+            set_committed_value(template, "questions", questions.scalars().all())
+            return TemplateDocument.model_validate(template)
+        except SQLAlchemyError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database error: {str(e)}",
+            )
+
     async def list_templates(
         self, limit: int = 10, offset: int = 0
     ) -> List[TemplateRead]:
@@ -75,6 +645,7 @@ class TemplateService:
                 return None
             for field, value in data.model_dump(exclude_unset=True).items():
                 setattr(obj, field, value)
+            obj.content_version = TestTemplate.content_version + 1
             await self.db.commit()
             await self.db.refresh(obj)
             return TemplateRead.model_validate(obj)
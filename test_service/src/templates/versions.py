@@ -0,0 +1,162 @@
+import hashlib
+from typing import NamedTuple, Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from src.answers.models import AnswerOption
+from src.cache import LRUCache
+from src.config import settings
+from src.database import async_session
+from src.questions.models import Question
+from src.templates.models import TemplateVersion, TestTemplate
+from src.templates.schemas import TemplateVersionContent
+
+
+class Version(NamedTuple):
+    id: UUID
+    template_id: UUID
+    number: int
+    content_hash: str
+
+
+# Versions never change, so nothing cached from them is ever invalidated.
+version_cache: LRUCache[Version] = LRUCache(settings.TEMPLATE_VERSION_CACHE_SIZE)
+content_cache: LRUCache[bytes] = LRUCache(settings.TEMPLATE_VERSION_CACHE_SIZE)
+
+_VERSION_COLUMNS = (
+    TemplateVersion.id,
+    TemplateVersion.template_id,
+    TemplateVersion.number,
+    TemplateVersion.content_hash,
+)
+
+
+async def current_version(db: AsyncSession, template_id: UUID) -> Optional[Version]:
+    """The version of the template's current content, captured first if the
+    template changed since its latest version."""
+    row = (
+        await db.execute(
+            select(TestTemplate.content_version, *_VERSION_COLUMNS)
+            .outerjoin(
+                TemplateVersion,
+                (TemplateVersion.template_id == TestTemplate.id)
+                & (TemplateVersion.number == TestTemplate.content_version),
+            )
+            .where(TestTemplate.id == template_id)
+        )
+    ).one_or_none()
+    if row is None:
+        return None
+    if row.id is not None:
+        return Version(row.id, row.template_id, row.number, row.content_hash)
+    return await _capture(template_id)
+
+
+async def get_version(
+    db: AsyncSession, template_id: UUID, version_id: Optional[UUID]
+) -> Optional[Version]:
+    """A session's pinned version; sessions without one follow the current."""
+    if version_id is None:
+        return await current_version(db, template_id)
+    version = version_cache.get(version_id)
+    if version is None:
+        row = (
+            await db.execute(
+                select(*_VERSION_COLUMNS).where(TemplateVersion.id == version_id)
+            )
+        ).one_or_none()
+        if row is None:
+            return None
+        version = Version(*row)
+        version_cache.set(version_id, version)
+    return version
+
+
+async def version_content(db: AsyncSession, version: Version) -> bytes:
+    """JSON of a ``TemplateVersionContent``."""
+    content = content_cache.get(version.content_hash)
+    if content is None:
+        content = (
+            await db.execute(
+                select(TemplateVersion.content).where(TemplateVersion.id == version.id)
+            )
+        ).scalar_one()
+        content = content.encode()
+        content_cache.set(version.content_hash, content)
+    return content
+
+
+async def _capture(template_id: UUID) -> Optional[Version]:
+    # Captures run in their own transactions so that callers holding locks
+    # neither block them nor commit early. Edits change rows and bump
+    # content_version in one commit, so a single snapshot gives content that
+    # matches its number.
+    async with async_session() as db:
+        await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        template = (
+            await db.execute(select(TestTemplate).where(TestTemplate.id == template_id))
+        ).scalar_one_or_none()
+        if template is None:
+            return None
+        questions = (
+            (
+                await db.execute(
+                    select(Question)
+                    .where(Question.template_id == template_id)
+                    .where(Question.retired_at.is_(None))
+                    .options(
+                        selectinload(
+                            Question.answers.and_(AnswerOption.retired_at.is_(None))
+                        )
+                    )
+                    .order_by(Question.created_at, Question.id)
+                )
+            )
+            .scalars()
+            .all()
+        )
+        set_committed_value(template, "questions", questions)
+        content = TemplateVersionContent.model_validate(template).model_dump_json()
+        number = template.content_version
+        question_ids = [q.id for q in questions]
+        option_ids = [o.id for q in questions for o in q.answers]
+        questions_per_session = template.questions_per_session
+        adaptive = template.adaptive
+        await db.rollback()
+
+    content_hash = hashlib.sha256(content.encode()).hexdigest()
+    async with async_session() as db:
+        await db.execute(
+            insert(TemplateVersion)
+            .values(
+                id=uuid4(),
+                template_id=template_id,
+                number=number,
+                content_hash=content_hash,
+                content=content,
+                question_ids=question_ids,
+                option_ids=option_ids,
+                questions_per_session=questions_per_session,
+                adaptive=adaptive,
+            )
+            .on_conflict_do_nothing(
+                index_elements=[TemplateVersion.template_id, TemplateVersion.number]
+            )
+        )
+        # A concurrent capture of the same number may have won.
+        row = (
+            await db.execute(
+                select(*_VERSION_COLUMNS)
+                .where(TemplateVersion.template_id == template_id)
+                .where(TemplateVersion.number == number)
+            )
+        ).one()
+        await db.commit()
+    version = Version(*row)
+    version_cache.set(version.id, version)
+    return version
@@ -0,0 +1,160 @@
+# Kept identical in candidate_service/src and test_service/src, since each
+# service is built from its own directory; change both copies together.
+# test_service/tests/test_shared_modules.py fails while they differ.
+
+import inspect
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+_current_timing: ContextVar[Optional["RequestTiming"]] = ContextVar(
+    "request_timing", default=None
+)
+
+
+class RequestTiming:
+    __slots__ = ("started", "spans", "endpoint_done")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float, Optional[str]]] = []
+        self.endpoint_done: Optional[float] = None
+
+    def add(self, name: str, duration: float, desc: Optional[str] = None) -> None:
+        self.spans.append((name, duration, desc))
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def header_value(self) -> str:
+        totals: Dict[str, List[float]] = {}
+        for name, duration, _ in self.spans:
+            entry = totals.setdefault(name, [0.0, 0])
+            entry[0] += duration
+            entry[1] += 1
+        parts = [
+            f'{name};dur={duration * 1000:.2f};desc="{int(count)}x"'
+            for name, (duration, count) in totals.items()
+        ]
+        parts.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(parts)
+
+    def as_dict(self) -> dict:
+        return {
+            "total_ms": round(self.elapsed() * 1000, 3),
+            "spans": [
+                {"name": name, "ms": round(duration * 1000, 3), "desc": desc}
+                for name, duration, desc in self.spans
+            ],
+        }
+
+
+def current_timing() -> Optional[RequestTiming]:
+    return _current_timing.get()
+
+
+@contextmanager
+def span(name: str, desc: Optional[str] = None):
+    timing = _current_timing.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - start, desc)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        if _current_timing.get() is not None:
+            conn.info.setdefault("timing_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        timing = _current_timing.get()
+        starts = conn.info.get("timing_start")
+        if timing is None or not starts:
+            return
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement else None
+        timing.add("db", time.perf_counter() - starts.pop(), verb)
+
+
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    @wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            timing = _current_timing.get()
+            if timing is not None:
+                timing.endpoint_done = time.perf_counter()
+
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if inspect.iscoroutinefunction(endpoint):
+            endpoint = _timed_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            timing = _current_timing.get()
+            if timing is not None and timing.endpoint_done is not None:
+                timing.add("serialize", time.perf_counter() - timing.endpoint_done)
+                timing.endpoint_done = None
+            return response
+
+        return timed_handler
+
+
+class ServerTimingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = _current_timing.set(timing)
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timing.header_value())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_timing.reset(token)
+            record = timing.as_dict()
+            record.update(
+                method=scope["method"], path=scope["path"], status=status_code
+            )
+            logger.info(json.dumps(record))
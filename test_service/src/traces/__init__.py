@@ -0,0 +1,3 @@
+"""
+Traces package for test service.
+"""
@@ -0,0 +1,50 @@
+import httpx
+from fastapi import APIRouter, HTTPException, Request, status
+
+from src import interservice
+from src.config import settings
+from src.timing import TimedRoute
+from src.traces.schemas import TraceRead
+from src.tracing import critical_path, exporter
+
+router = APIRouter(prefix="/traces", tags=["traces"], route_class=TimedRoute)
+
+
+@router.get("/{trace_id}", response_model=TraceRead)
+async def read_trace(
+    trace_id: str,
+    request: Request,
+    include_peer: bool = True,
+):
+    spans = exporter.get_trace(trace_id)
+    authorization = request.headers.get("authorization")
+    if include_peer and authorization:
+        try:
+            resp = await interservice.request(
+                "GET",
+                f"{settings.CANDIDATE_SERVICE_URL}/traces/{trace_id}",
+                peer="candidate_service",
+                params={"include_peer": "false"},
+                headers={"Authorization": authorization},
+                timeout=5.0,
+                hedge_after=0.5,
+            )
+            if resp.status_code != status.HTTP_404_NOT_FOUND:
+                resp.raise_for_status()
+                spans.extend(resp.json()["spans"])
+        except httpx.HTTPError:
+            pass
+
+    if not spans:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Trace not found"
+        )
+
+    spans.sort(key=lambda s: s["start"])
+    end = max(s["start"] + s["duration_ms"] / 1000 for s in spans)
+    return TraceRead(
+        trace_id=trace_id,
+        duration_ms=round((end - spans[0]["start"]) * 1000, 3),
+        spans=spans,
+        critical_path=critical_path(spans),
+    )
@@ -0,0 +1,237 @@
+# Kept identical in candidate_service/src and test_service/src, since each
+# service is built from its own directory; change both copies together.
+# test_service/tests/test_shared_modules.py fails while they differ.
+
+import json
+import logging
+import re
+import secrets
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueListener
+from queue import SimpleQueue
+from typing import Dict, Iterator, List, Optional
+
+from starlette.datastructures import MutableHeaders
+
+from src.config import settings
+
+TRACEPARENT_HEADER = "traceparent"
+REQUEST_ID_HEADER = "x-request-id"
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class SpanContext:
+    __slots__ = ("trace_id", "span_id", "request_id")
+
+    def __init__(self, trace_id: str, span_id: str, request_id: str):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.request_id = request_id
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+class Span:
+    __slots__ = (
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "name",
+        "kind",
+        "start",
+        "duration_ms",
+        "attributes",
+        "_started",
+    )
+
+    def __init__(
+        self, name: str, kind: str, parent: Optional[SpanContext], request_id: str
+    ):
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.kind = kind
+        self.start = time.time()
+        self.duration_ms = 0.0
+        self.attributes: Dict[str, object] = {"request_id": request_id}
+        self._started = time.perf_counter()
+
+    def finish(self) -> None:
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+
+    def as_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "service": settings.PROJECT_NAME,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+        }
+
+
+class _JsonLines(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.msg)
+
+
+class SpanExporter:
+    def __init__(self, max_traces: int, path: Optional[str] = None):
+        self.max_traces = max_traces
+        self.path = path
+        self._traces: "OrderedDict[str, List[dict]]" = OrderedDict()
+        # Spans are appended to the file by a thread of their own, off the
+        # event loop.
+        self._queue: "SimpleQueue[logging.LogRecord]" = SimpleQueue()
+        self._listener: Optional[QueueListener] = None
+        if path:
+            handler = logging.FileHandler(path, encoding="utf-8", delay=True)
+            handler.setFormatter(_JsonLines())
+            self._listener = QueueListener(self._queue, handler)
+            self._listener.start()
+
+    def export(self, span: Span) -> None:
+        record = span.as_dict()
+        spans = self._traces.get(span.trace_id)
+        if spans is None:
+            spans = self._traces[span.trace_id] = []
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+        spans.append(record)
+        if self._listener is not None:
+            self._queue.put(logging.makeLogRecord({"msg": record}))
+
+    def close(self) -> None:
+        """Write out the queued spans and stop the writer thread."""
+        if self._listener is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
+
+    def get_trace(self, trace_id: str) -> List[dict]:
+        return list(self._traces.get(trace_id, ()))
+
+
+exporter = SpanExporter(settings.TRACE_BUFFER_TRACES, settings.TRACE_EXPORT_PATH)
+
+_current_context: ContextVar[Optional[SpanContext]] = ContextVar(
+    "trace_context", default=None
+)
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    if not value:
+        return None
+    match = _TRACEPARENT_RE.match(value.strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return SpanContext(match.group(1), match.group(2), match.group(1))
+
+
+def current_context() -> Optional[SpanContext]:
+    return _current_context.get()
+
+
+def current_traceparent() -> Optional[str]:
+    context = _current_context.get()
+    return context.traceparent if context else None
+
+
+@contextmanager
+def start_span(
+    name: str,
+    kind: str = "internal",
+    parent: Optional[SpanContext] = None,
+    request_id: Optional[str] = None,
+) -> Iterator[Span]:
+    parent = parent or _current_context.get()
+    request_id = request_id or (parent.request_id if parent else None)
+    request_id = request_id or secrets.token_hex(16)
+    span = Span(name, kind, parent, request_id)
+    token = _current_context.set(SpanContext(span.trace_id, span.span_id, request_id))
+    try:
+        yield span
+    except Exception as e:
+        span.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        _current_context.reset(token)
+        span.finish()
+        exporter.export(span)
+
+
+@contextmanager
+def client_span(name: str, peer: str) -> Iterator[Dict[str, str]]:
+    with start_span(name, kind="client") as span:
+        span.attributes["peer"] = peer
+        yield {
+            TRACEPARENT_HEADER: f"00-{span.trace_id}-{span.span_id}-01",
+            REQUEST_ID_HEADER: span.attributes["request_id"],
+        }
+
+
+def critical_path(spans: List[dict]) -> List[dict]:
+    if not spans:
+        return []
+    span_ids = {s["span_id"] for s in spans}
+    children: Dict[Optional[str], List[dict]] = {}
+    for s in spans:
+        children.setdefault(s["parent_id"], []).append(s)
+
+    def end(s: dict) -> float:
+        return s["start"] + s["duration_ms"] / 1000
+
+    roots = [s for s in spans if s["parent_id"] not in span_ids]
+    node: Optional[dict] = min(roots or spans, key=lambda s: s["start"])
+    path = []
+    while node is not None:
+        nxt = max(children.get(node["span_id"], ()), key=end, default=None)
+        self_ms = node["duration_ms"] - (nxt["duration_ms"] if nxt else 0.0)
+        path.append({**node, "self_ms": round(max(self_ms, 0.0), 3)})
+        node = nxt
+    return path
+
+
+class TracingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {
+            k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]
+        }
+        parent = parse_traceparent(headers.get(TRACEPARENT_HEADER))
+        name = f"{scope['method']} {scope['path']}"
+
+        with start_span(
+            name, "server", parent=parent, request_id=headers.get(REQUEST_ID_HEADER)
+        ) as span:
+
+            async def send_with_trace(message):
+                if message["type"] == "http.response.start":
+                    span.attributes["status"] = message["status"]
+                    response_headers = MutableHeaders(scope=message)
+                    response_headers.append(
+                        TRACEPARENT_HEADER, f"00-{span.trace_id}-{span.span_id}-01"
+                    )
+                    response_headers.append(
+                        REQUEST_ID_HEADER, span.attributes["request_id"]
+                    )
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace)
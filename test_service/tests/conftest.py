@@ -0,0 +1,25 @@
+import asyncio
+import os
+
+import pytest
+
+os.environ.setdefault("POSTGRES_HOST", "localhost")
+os.environ.setdefault("POSTGRES_USER", "user")
+os.environ.setdefault("POSTGRES_PASSWORD", "pass")
+os.environ.setdefault("POSTGRES_DB", "test_db")
+os.environ.setdefault("CANDIDATE_SERVICE_URL", "http://127.0.0.1:8001")
+
+
+@pytest.fixture(scope="session")
+def database():
+    """Skips tests that need PostgreSQL when it is not reachable."""
+    from src.database import engine, init_db
+
+    async def connect():
+        await init_db()
+        await engine.dispose()
+
+    try:
+        asyncio.run(connect())
+    except OSError as e:
+        pytest.skip(f"PostgreSQL is not available: {e}")
@@ -0,0 +1,68 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from src.sessions.answer_buffer import AnswerWriteBuffer
+
+
+def _buffer(journal_path: str) -> AnswerWriteBuffer:
+    return AnswerWriteBuffer(
+        enabled=True,
+        journal_path=journal_path,
+        flush_interval=1,
+        max_rows=100,
+        max_pending=1000,
+        session_cache_size=10,
+    )
+
+
+def _answer():
+    return (*(uuid.uuid4() for _ in range(4)), datetime.now(timezone.utc))
+
+
+def test_recovery_leaves_live_journals_alone(tmp_path):
+    journal_path = str(tmp_path / "answers")
+    live = _buffer(journal_path)
+    live._recover()
+    live.add(_answer())
+
+    other = _buffer(journal_path)
+    other._recover()
+    assert other.pending == 0
+    assert os.path.exists(live._sealed[0])
+
+
+def test_recovery_adopts_journals_of_dead_processes(tmp_path):
+    journal_path = str(tmp_path / "answers")
+    dead = _buffer(journal_path)
+    dead._recover()
+    answer = _answer()
+    dead.add(answer)
+    dead._close_segment()
+    os.close(dead._owner_fd)  # what the process exiting does
+
+    survivor = _buffer(journal_path)
+    survivor._recover()
+    assert survivor.pending == 1
+    assert survivor._pending[answer[1]][answer[2]] == answer
+    assert not os.path.exists(dead._lock_path(dead._owner))
+    assert all(survivor._owner in path for path in survivor._sealed)
+
+
+def test_only_one_process_buffers(database, tmp_path):
+    async def run():
+        first = _buffer(str(tmp_path / "first"))
+        second = _buffer(str(tmp_path / "second"))
+        await first._claim_writer()
+        try:
+            with pytest.raises(RuntimeError):
+                await second._claim_writer()
+        finally:
+            await first.stop()
+        await second._claim_writer()
+        await second.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,30 @@
+import asyncio
+
+from src.idempotency import IdempotencyStore
+
+
+def test_eviction_skips_requests_still_in_flight():
+    async def run():
+        store = IdempotencyStore(ttl=60, max_entries=2)
+        slow = store.reserve(b"slow", b"")
+        for key in (b"a", b"b"):
+            store.complete(key, store.reserve(key, b""), keep=True)
+        store.reserve(b"c", b"")
+        assert store.get(b"slow") is slow
+        assert store.get(b"a") is None
+        assert store.get(b"b") is not None
+
+    asyncio.run(run())
+
+
+def test_expired_entries_behind_one_in_flight_are_evicted():
+    async def run():
+        store = IdempotencyStore(ttl=0, max_entries=100)
+        slow = store.reserve(b"slow", b"")
+        for key in (b"a", b"b"):
+            store.complete(key, store.reserve(key, b""), keep=True)
+        store.reserve(b"c", b"")
+        assert list(store._entries) == [b"slow", b"c"]
+        assert store.get(b"slow") is slow
+
+    asyncio.run(run())
@@ -0,0 +1,61 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src import interservice
+
+URL = "http://peer.test/ping"
+
+
+def _half_open_breaker() -> interservice.CircuitBreaker:
+    breaker = interservice.breakers["peer.test"] = interservice.CircuitBreaker(
+        failure_threshold=1, reset_timeout=0
+    )
+    breaker.record_failure()
+    assert breaker.state == "open"
+    return breaker
+
+
+async def _request_with(handler) -> httpx.Response:
+    interservice._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    try:
+        return await interservice.request("POST", URL, "peer")
+    finally:
+        await interservice.close_client()
+
+
+@pytest.fixture(autouse=True)
+def _reset_breakers():
+    yield
+    interservice.breakers.clear()
+
+
+def test_cancelled_half_open_probe_releases_its_slot():
+    breaker = _half_open_breaker()
+    started = asyncio.Event()
+
+    async def hang(request):
+        started.set()
+        await asyncio.sleep(3600)
+
+    async def run():
+        probe = asyncio.create_task(_request_with(hang))
+        await started.wait()
+        assert breaker.state == "half_open"
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        response = await _request_with(lambda request: httpx.Response(200))
+        assert response.status_code == 200
+
+    asyncio.run(run())
+    assert breaker.state == "closed"
+
+
+def test_half_open_probe_failure_reopens():
+    breaker = _half_open_breaker()
+    response = asyncio.run(_request_with(lambda request: httpx.Response(503)))
+    assert response.status_code == 503
+    assert breaker.state == "open"
@@ -0,0 +1,37 @@
+import asyncio
+import uuid
+
+from sqlalchemy import delete
+
+from src.database import async_session
+from src.sessions.percentiles import ScoreSketches
+from src.templates.models import TestTemplate as Template
+
+
+def test_persist_picks_up_templates_only_other_workers_finished(database):
+    async def run():
+        async with async_session() as db:
+            template = Template(title=f"sketches-{uuid.uuid4().hex[:8]}")
+            db.add(template)
+            await db.commit()
+            template_id = template.id
+        try:
+            idle, busy = ScoreSketches(interval=60), ScoreSketches(interval=60)
+            await idle.load()
+            await busy.load()
+            assert idle.percentile(template_id, 50.0) is None
+
+            busy.add(template_id, 20.0)
+            busy.add(template_id, 80.0)
+            await busy.persist()
+            await idle.persist()
+            assert idle.percentile(template_id, 50.0) == 50.0
+            assert idle.percentile(template_id, 80.0) == busy.percentile(
+                template_id, 80.0
+            )
+        finally:
+            async with async_session() as db:
+                await db.execute(delete(Template).where(Template.id == template_id))
+                await db.commit()
+
+    asyncio.run(run())
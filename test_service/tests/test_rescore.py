@@ -0,0 +1,127 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+from sqlalchemy import delete, select, update
+
+from src import interservice
+from src.answers.schemas import AnswerOptionCreate
+from src.answers.service import AnswerOptionService
+from src.database import async_session
+from src.questions.schemas import QuestionCreate
+from src.questions.service import QuestionService
+from src.sessions.models import TestSession as Session
+from src.sessions.schemas import SessionAnswerCreate, SessionCreate
+from src.sessions.service import SessionService
+from src.templates.models import TestTemplate as Template
+from src.templates.rescore import RescoreJob, _run
+
+
+@pytest.fixture(autouse=True)
+def _reset_interservice():
+    yield
+    interservice.breakers.clear()
+
+
+async def _rescore_with(answer, check):
+    """Rescore a template whose two finished sessions were scored zero; the
+    result of the first was delivered, the second's is still pending."""
+    async with async_session() as db:
+        template = Template(title=f"rescore-{uuid.uuid4().hex[:8]}")
+        db.add(template)
+        await db.commit()
+        question = await QuestionService(db).create_question(
+            QuestionCreate(template_id=template.id, text="q")
+        )
+        option = await AnswerOptionService(db).create_answer_option(
+            AnswerOptionCreate(question_id=question.id, text="a", correct=True)
+        )
+        service = SessionService(db)
+        session_ids = []
+        for delivered in (True, False):
+            session = await service.create_session(
+                SessionCreate(
+                    application_id=uuid.uuid4(),
+                    template_id=template.id,
+                    candidate_email="rescore@example.com",
+                )
+            )
+            await service.create_answer(
+                SessionAnswerCreate(
+                    session_id=session.id, question_id=question.id, answer_id=option.id
+                )
+            )
+            await db.execute(
+                update(Session)
+                .where(Session.id == session.id)
+                .values(
+                    status="finished",
+                    score=0.0,
+                    max_score=1.0,
+                    score_percent=0.0,
+                    callback_due_at=None if delivered else datetime.now(timezone.utc),
+                )
+            )
+            await db.commit()
+            session_ids.append(session.id)
+        template_id = template.id
+
+    requests = []
+
+    def handle(request):
+        requests.append(request)
+        return httpx.Response(answer(request))
+
+    interservice._client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+    try:
+        job = RescoreJob(template_id)
+        await _run(job)
+        assert job.status == "completed" and job.sessions_changed == 2
+        async with async_session() as db:
+            due = dict(
+                (
+                    await db.execute(
+                        select(Session.id, Session.callback_due_at).where(
+                            Session.id.in_(session_ids)
+                        )
+                    )
+                ).all()
+            )
+        await check(job, requests, [due[session_id] for session_id in session_ids])
+    finally:
+        await interservice.close_client()
+        async with async_session() as db:
+            await db.execute(delete(Session).where(Session.template_id == template_id))
+            await db.execute(delete(Template).where(Template.id == template_id))
+            await db.commit()
+
+
+def test_rescored_results_carry_percentiles_and_are_acknowledged(database):
+    async def check(job, requests, due):
+        bulk = [r for r in requests if r.url.path == "/applications/test-results"]
+        (pushed,) = json.loads(bulk[0].content)["results"]
+        assert pushed["score_percent"] == 100.0
+        assert pushed["score_percentile"] is not None
+        assert len(requests) == 2
+        assert job.results_pushed == 2 and job.push_failures == 0
+        assert due == [None, None]
+
+    asyncio.run(_rescore_with(lambda request: 200, check))
+
+
+def test_unpushed_rescored_results_are_left_for_the_sweeper(database):
+    async def check(job, requests, due):
+        assert job.results_pushed == 1 and job.push_failures == 1
+        assert due[0] is not None and due[1] is None
+
+    asyncio.run(
+        _rescore_with(
+            lambda request: (
+                503 if request.url.path == "/applications/test-results" else 200
+            ),
+            check,
+        )
+    )
@@ -0,0 +1,80 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from sqlalchemy import delete, select, update
+
+from src import interservice
+from src.database import async_session
+from src.sessions.models import TestSession as Session
+from src.sessions.sweeper import sweeper
+from src.templates.models import TestTemplate as Template
+
+
+@pytest.fixture(autouse=True)
+def _reset_interservice():
+    yield
+    interservice.breakers.clear()
+
+
+async def _answering(status_code, check):
+    interservice._client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(status_code))
+    )
+    try:
+        await check()
+    finally:
+        await interservice.close_client()
+
+
+async def _callback_state(session_id):
+    async with async_session() as db:
+        return (
+            await db.execute(
+                select(
+                    Session.status, Session.callback_due_at, Session.callback_attempts
+                ).where(Session.id == session_id)
+            )
+        ).one()
+
+
+def test_expired_result_is_sent_until_acknowledged(database):
+    async def run():
+        async with async_session() as db:
+            template = Template(title=f"callbacks-{uuid.uuid4().hex[:8]}")
+            db.add(template)
+            await db.flush()
+            session = Session(
+                application_id=uuid.uuid4(),
+                template_id=template.id,
+                candidate_email="callbacks@example.com",
+                deadline=datetime.now(timezone.utc) - timedelta(minutes=1),
+            )
+            db.add(session)
+            await db.commit()
+            session_id, template_id = session.id, template.id
+        try:
+            await _answering(503, sweeper.sweep)
+            status, due, attempts = await _callback_state(session_id)
+            assert status == "expired"
+            assert due is not None and attempts == 1
+
+            async with async_session() as db:
+                await db.execute(
+                    update(Session)
+                    .where(Session.id == session_id)
+                    .values(callback_due_at=datetime.now(timezone.utc))
+                )
+                await db.commit()
+            interservice.breakers.clear()
+            await _answering(200, sweeper.retry_callbacks)
+            assert await _callback_state(session_id) == ("expired", None, 0)
+        finally:
+            async with async_session() as db:
+                await db.execute(delete(Session).where(Session.id == session_id))
+                await db.execute(delete(Template).where(Template.id == template_id))
+                await db.commit()
+
+    asyncio.run(run())
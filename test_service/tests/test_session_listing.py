@@ -0,0 +1,61 @@
+import asyncio
+import uuid
+
+from sqlalchemy import delete, func, select
+
+from src.config import settings
+from src.database import async_session
+from src.sessions.models import TestSession as Session
+from src.sessions.service import SessionService
+from src.templates.models import TestTemplate as Template
+
+
+async def _with_sessions(count, check):
+    async with async_session() as db:
+        template = Template(title=f"listing-{uuid.uuid4().hex[:8]}")
+        db.add(template)
+        await db.flush()
+        db.add_all(
+            Session(
+                application_id=uuid.uuid4(),
+                template_id=template.id,
+                candidate_email="listing@example.com",
+            )
+            for _ in range(count)
+        )
+        await db.commit()
+        try:
+            await check(SessionService(db))
+        finally:
+            await db.execute(delete(Session).where(Session.template_id == template.id))
+            await db.execute(delete(Template).where(Template.id == template.id))
+            await db.commit()
+
+
+def test_unfiltered_listing_counts_every_session(database, monkeypatch):
+    monkeypatch.setattr(settings, "SESSION_LIST_EXACT_COUNT_LIMIT", 10**9)
+
+    async def check(service):
+        expected = (
+            await service.db.execute(select(func.count()).select_from(Session))
+        ).scalar_one()
+        first = await service.list_sessions(limit=1)
+        assert first.next_cursor is not None
+        assert (first.total, first.total_is_estimate) == (expected, False)
+        second = await service.list_sessions(cursor=first.next_cursor, limit=1)
+        assert second.items[0].id != first.items[0].id
+        assert (second.total, second.total_is_estimate) == (expected, False)
+
+    asyncio.run(_with_sessions(3, check))
+
+
+def test_offset_still_pages(database, monkeypatch):
+    monkeypatch.setattr(settings, "SESSION_LIST_EXACT_COUNT_LIMIT", 10**9)
+
+    async def check(service):
+        first = await service.list_sessions(limit=2)
+        shifted = await service.list_sessions(limit=1, offset=1)
+        assert shifted.items[0].id == first.items[1].id
+        assert shifted.total == first.total
+
+    asyncio.run(_with_sessions(3, check))
@@ -0,0 +1,20 @@
+from pathlib import Path
+
+import pytest
+
+SHARED_MODULES = ("idempotency", "interservice", "load_shedding", "timing", "tracing")
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+@pytest.mark.parametrize("name", SHARED_MODULES)
+def test_shared_module_copies_are_identical(name):
+    copies = [
+        ROOT / service / "src" / f"{name}.py"
+        for service in ("candidate_service", "test_service")
+    ]
+    if not copies[0].exists():
+        pytest.skip("candidate_service is not checked out alongside")
+    assert (
+        copies[0].read_bytes() == copies[1].read_bytes()
+    ), f"{copies[0]} and {copies[1]} differ; change both copies together"
@@ -0,0 +1,36 @@
+import json
+import uuid
+
+from src.templates.service import _arrange_tree
+
+
+def _tree(adaptive):
+    return {
+        "adaptive": adaptive,
+        "questions_per_session": None,
+        "shuffle_questions": True,
+        "shuffle_options": False,
+        "questions": [
+            {"id": str(uuid.uuid4()), "answers": [{"id": str(uuid.uuid4())}]}
+            for _ in range(5)
+        ],
+    }
+
+
+def test_adaptive_session_lists_only_served_questions_in_served_order():
+    tree = _tree(adaptive=True)
+    ids = [uuid.UUID(question["id"]) for question in tree["questions"]]
+    body = json.dumps(tree).encode()
+
+    assert json.loads(_arrange_tree(body, uuid.uuid4()))["questions"] == []
+    served = [ids[3], ids[0]]
+    arranged = json.loads(_arrange_tree(body, uuid.uuid4(), served))
+    assert [q["id"] for q in arranged["questions"]] == [str(i) for i in served]
+
+
+def test_other_sessions_list_every_question():
+    tree = _tree(adaptive=False)
+    arranged = json.loads(_arrange_tree(json.dumps(tree).encode(), uuid.uuid4()))
+    assert sorted(q["id"] for q in arranged["questions"]) == sorted(
+        q["id"] for q in tree["questions"]
+    )
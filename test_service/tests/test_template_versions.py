@@ -0,0 +1,104 @@
+import asyncio
+import uuid
+
+from sqlalchemy import delete, select, update
+
+from src.answers.models import AnswerOption
+from src.answers.schemas import AnswerOptionCreate
+from src.answers.service import AnswerOptionService
+from src.database import async_session
+from src.questions.schemas import QuestionCreate
+from src.questions.service import QuestionService
+from src.sessions.models import TestSession as Session
+from src.sessions.schemas import SessionAnswerCreate, SessionCreate
+from src.sessions.service import SessionService
+from src.templates.models import TestTemplate as Template
+from src.templates.service import bump_content_version
+
+
+async def _with_template(check):
+    async with async_session() as db:
+        template = Template(title=f"versions-{uuid.uuid4().hex[:8]}")
+        other = Template(title=f"versions-{uuid.uuid4().hex[:8]}")
+        db.add_all([template, other])
+        await db.commit()
+        questions = QuestionService(db)
+        options = AnswerOptionService(db)
+        ids = []
+        for i in range(2):
+            question = await questions.create_question(
+                QuestionCreate(template_id=template.id, text=f"q{i}")
+            )
+            option = await options.create_answer_option(
+                AnswerOptionCreate(question_id=question.id, text="a", correct=True)
+            )
+            ids.append((question.id, option.id))
+        session = await SessionService(db).create_session(
+            SessionCreate(
+                application_id=uuid.uuid4(),
+                template_id=template.id,
+                candidate_email="versions@example.com",
+            )
+        )
+        try:
+            await check(db, template.id, other.id, session.id, ids)
+        finally:
+            await db.rollback()
+            await db.execute(delete(Session).where(Session.template_id == template.id))
+            await db.execute(delete(Template).where(Template.id == template.id))
+            await db.execute(delete(Template).where(Template.id == other.id))
+            await db.commit()
+
+
+def test_answers_follow_the_pinned_versions_drawing_settings(database):
+    async def check(db, template_id, other_id, session_id, ids):
+        await db.execute(
+            update(Template)
+            .where(Template.id == template_id)
+            .values(questions_per_session=1)
+        )
+        await bump_content_version(db, template_id)
+        await db.commit()
+        for question_id, option_id in ids:
+            await SessionService(db).create_answer(
+                SessionAnswerCreate(
+                    session_id=session_id, question_id=question_id, answer_id=option_id
+                )
+            )
+
+    asyncio.run(_with_template(check))
+
+
+def test_moved_rows_are_copied_and_the_originals_still_answerable(database):
+    async def check(db, template_id, other_id, session_id, ids):
+        (first_question, first_option), (second_question, _) = ids
+        moved_option = await AnswerOptionService(db).update_answer_option(
+            first_option,
+            AnswerOptionCreate(question_id=second_question, text="a", correct=True),
+        )
+        moved_question = await QuestionService(db).update_question(
+            second_question, QuestionCreate(template_id=other_id, text="q1")
+        )
+        assert moved_option.id != first_option
+        assert moved_question.id != second_question
+        assert moved_question.template_id == other_id
+
+        copied = (
+            await db.execute(
+                select(AnswerOption.text, AnswerOption.retired_at).where(
+                    AnswerOption.question_id == moved_question.id
+                )
+            )
+        ).all()
+        assert len(copied) == 2 and all(row.retired_at is None for row in copied)
+
+        answer = await SessionService(db).create_answer(
+            SessionAnswerCreate(
+                session_id=session_id,
+                question_id=first_question,
+                answer_id=first_option,
+            )
+        )
+        assert answer.answer_id == first_option
+
+    asyncio.run(_with_template(check))
@@ -0,0 +1,17 @@
+import json
+
+from src.tracing import Span, SpanExporter
+
+
+def test_spans_are_written_to_the_export_file(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    exporter = SpanExporter(max_traces=10, path=str(path))
+    spans = [Span(f"span-{i}", "internal", None, "request") for i in range(3)]
+    for span in spans:
+        span.finish()
+        exporter.export(span)
+    exporter.close()
+
+    written = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [s["span_id"] for s in written] == [s.span_id for s in spans]
+    assert exporter.get_trace(spans[0].trace_id)[0]["name"] == "span-0"